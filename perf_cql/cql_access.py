@@ -1,8 +1,11 @@
+import os, threading
+from functools import partial
 from qgate_perf.run_setup import RunSetup
 from cassandra.auth import PlainTextAuthProvider
-from cassandra.cluster import Cluster, Session
+from cassandra.cluster import Cluster, Session, ExecutionProfile, EXEC_PROFILE_DEFAULT, DefaultConnection
+from cassandra.query import PreparedStatement
 from cassandra import ProtocolVersion
-from cassandra.policies import DCAwareRoundRobinPolicy, RoundRobinPolicy
+from cassandra.policies import DCAwareRoundRobinPolicy, RoundRobinPolicy, TokenAwarePolicy, ConstantSpeculativeExecutionPolicy
 from cql_config import CQLType
 
 
@@ -11,23 +14,128 @@ class Setting:
     MAX_GNR_VALUE = 99999
     TIMEOUT = 30
     TIMEOUT_CREATE_MODEL = 180
+    OPERATION_POOL = 10000
+    LOAD_IN_FLIGHT = 128
 
 class CQLAccess:
 
+    # per-process cache of connections (see 'shared()')
+    _shared = {}
+    _shared_pid = None
+    _shared_lock = threading.Lock()
+
     def __init__(self, run_setup: RunSetup):
         self._run_setup = run_setup
         self._cluster = None
+        self._sessions = []
+        self._next_session = 0
+        self._prepared = {}
+        self._lock = threading.Lock()
 
     @property
     def cluster(self):
         return self._cluster
 
+    @property
+    def session(self) -> Session:
+        """Session shared for all threads (the sessions are created with the first usage). The driver
+        uses one connection per host for each session (protocol V3+), in case of more 'sessions'
+        the sessions are returned round-robin."""
+        with self._lock:
+            if not self._sessions:
+                self._sessions = [self.create_session() for _ in range(max(self._run_setup.param('sessions', 1), 1))]
+            session = self._sessions[self._next_session % len(self._sessions)]
+            self._next_session += 1
+            return session
+
+    @staticmethod
+    def shared(run_setup: RunSetup):
+        """Return opened connection shared in the process, the connection is created only once
+        for the same connection parameters and it is reused by all executors (threads) in the
+        process. The executor processes are new for each step (the reuse is only inside one
+        executor process), the connections of the main process have to be closed before the
+        fork of executors (see 'close_shared()')
+
+        :param run_setup:   setup with connection parameters
+        :return:            shared CQLAccess (do not close it, see 'close_shared()')
+        """
+        key = CQLAccess.connection_key(run_setup)
+        with CQLAccess._shared_lock:
+            if CQLAccess._shared_pid != os.getpid():
+                # new process (e.g. after fork), the inherited connections are not usable
+                CQLAccess._shared = {}
+                CQLAccess._shared_pid = os.getpid()
+
+            cql = CQLAccess._shared.get(key, None)
+            if cql is None:
+                cql = CQLAccess(run_setup)
+                cql.open()
+                CQLAccess._shared[key] = cql
+            return cql
+
+    @staticmethod
+    def close_shared():
+        """Close all shared connections in the process"""
+        with CQLAccess._shared_lock:
+            if CQLAccess._shared_pid == os.getpid():
+                for cql in CQLAccess._shared.values():
+                    cql.close()
+            CQLAccess._shared = {}
+
+    @staticmethod
+    def connection_key(run_setup: RunSetup):
+        """Return key based on connection parameters"""
+        return (str(run_setup['cql']),
+                tuple(run_setup['ip']) if run_setup['ip'] else None,
+                run_setup['port'],
+                run_setup['secure_connect_bundle'],
+                run_setup['username'],
+                run_setup['password'],
+                run_setup['local_dc'],
+                int(run_setup['replication_factor']) == 1,
+                run_setup.param('driver_metrics', False),
+                CQLAccess._token_aware(run_setup),
+                CQLAccess.tuning_label(run_setup.param))
+
+    @staticmethod
+    def _token_aware(run_setup: RunSetup) -> bool:
+        """Routing to the owning replica (setting 'token_aware', for 'auto' only for grouped
+        batches or single statements)"""
+        token_aware = run_setup.param('token_aware', 'auto')
+        if token_aware != 'auto':
+            return token_aware == 'on'
+        return run_setup['batch_grouping'] not in (None, 'off') or \
+            (run_setup['batch_type'] is None and run_setup['test_type'] != 'r')
+
+    @staticmethod
+    def tuning_label(param) -> str:
+        """Return short description of client tuning (only the changes against default setting)
+        e.g. 'V5-lz4-s4-m1024-spec50ms', it is part of the run label
+
+        :param param:   function for access to the parameters e.g. 'run_setup.param' or 'dict.get'
+        """
+        items = []
+        if param('protocol_version', ProtocolVersion.V4) != ProtocolVersion.V4:
+            items.append(f"V{param('protocol_version', ProtocolVersion.V4)}")
+        if param('compression', None):
+            items.append(param('compression', None))
+        if param('sessions', 1) > 1:
+            items.append(f"s{param('sessions', 1)}")
+        if param('max_requests', 0) > 0:
+            items.append(f"m{param('max_requests', 0)}")
+        if param('token_aware', 'auto') != 'auto':
+            items.append(f"ta-{param('token_aware', 'auto')}")
+        if param('speculative', None):
+            delay, max_attempts = param('speculative', None)
+            items.append(f"spec{round(delay * 1000)}ms" + (f"x{max_attempts}" if max_attempts > 1 else ""))
+        return "-".join(items)
+
     def open(self):
         """Create cluster for connection"""
         auth_provider = None
 
-        # authentication provider
-        if self._run_setup['username']:
+        # authentication provider (the stub server is without authentication)
+        if self._run_setup['username'] and self._run_setup['cql'] != CQLType.Stub:
             auth_provider = PlainTextAuthProvider(username = self._run_setup["username"],
                                                  password = self._run_setup["password"])
 
@@ -37,6 +145,32 @@ class CQLAccess:
         else:
             load_balancing_policy = DCAwareRoundRobinPolicy(local_dc = self._run_setup["local_dc"])
 
+        # routing to the owning replica (for grouped batches or single statements)
+        if CQLAccess._token_aware(self._run_setup):
+            load_balancing_policy = TokenAwarePolicy(load_balancing_policy)
+
+        # speculative execution [delay in seconds, max. attempts] (only for idempotent statements)
+        speculative_execution_policy = None
+        if self._run_setup.param('speculative', None):
+            delay, max_attempts = self._run_setup['speculative']
+            speculative_execution_policy = ConstantSpeculativeExecutionPolicy(delay, max_attempts)
+
+        # the speculative execution is supported only with execution profiles
+        profiles = {EXEC_PROFILE_DEFAULT: ExecutionProfile(load_balancing_policy = load_balancing_policy,
+                                                           speculative_execution_policy = speculative_execution_policy,
+                                                           request_timeout = Setting.TIMEOUT)}
+
+        # max. requests in flight per connection (default in driver is 32768 for protocol V3+)
+        connection_class = DefaultConnection
+        if self._run_setup.param('max_requests', 0) > 0:
+            max_requests = self._run_setup['max_requests']
+            connection_class = type("CQLConnection", (DefaultConnection,),
+                                    {'max_in_flight': max_requests, 'orphaned_threshold': 3 * max_requests // 4})
+
+        # compression 'lz4' or 'snappy' (it requires library 'lz4' or 'python-snappy'), False means without compression
+        compression = self._run_setup.param('compression', None) or False
+        protocol_version = self._run_setup.param('protocol_version', ProtocolVersion.V4)
+
         if self._run_setup["secure_connect_bundle"]:
             # connection with 'secure_connect_bundle' to the cloud
             cloud_config = {
@@ -45,67 +179,94 @@ class CQLAccess:
             }
             self._cluster = Cluster(cloud = cloud_config,
                                     auth_provider = auth_provider,
-                                    load_balancing_policy = load_balancing_policy,
+                                    execution_profiles = profiles,
+                                    connection_class = connection_class,
+                                    compression = compression,
                                     control_connection_timeout = Setting.TIMEOUT,
                                     #idle_heartbeat_interval = Setting.TIMEOUT,
                                     connect_timeout = Setting.TIMEOUT,
-                                    protocol_version = ProtocolVersion.V4)
+                                    metrics_enabled = self._run_setup.param('driver_metrics', False),
+                                    protocol_version = protocol_version)
         else:
             # connection with 'ip' and 'port'
             self._cluster = Cluster(contact_points = self._run_setup['ip'],
                                     port = self._run_setup['port'],
                                     auth_provider = auth_provider,
-                                    load_balancing_policy = load_balancing_policy,
+                                    execution_profiles = profiles,
+                                    connection_class = connection_class,
+                                    compression = compression,
                                     control_connection_timeout = Setting.TIMEOUT,
                                     #idle_heartbeat_interval = Setting.TIMEOUT,
                                     connect_timeout = Setting.TIMEOUT,
-                                    protocol_version = ProtocolVersion.V4)
-                                    # issue with 'CRC mismatch on header ...', not use protocol V5
-                                    # protocol_version = ProtocolVersion.V5)
-
-    def create_session(self, timeout = Setting.TIMEOUT) -> Session:
-        """Create new session"""
-        session = self._cluster.connect()
-        session.default_timeout = timeout
-        return session
-
-    def create_model(self):
-        """Create new NoSQL model (create keyspace and table)"""
+                                    metrics_enabled = self._run_setup.param('driver_metrics', False),
+                                    # issue with 'CRC mismatch on header ...' for protocol V5, default is V4
+                                    protocol_version = protocol_version)
+
+    def create_session(self) -> Session:
+        """Create new session (the timeout is based on default execution profile)"""
+        return self._cluster.connect()
+
+    def prepare(self, query, keyspace = None) -> PreparedStatement:
+        """Prepare statement on shared session, the prepared statements are cached"""
+        with self._lock:
+            statement = self._prepared.get((query, keyspace), None)
+        if statement is None:
+            # the keyspace for prepare is supported since protocol V5 (the queries are with keyspace)
+            session = self.session
+            statement = session.prepare(query,
+                                        keyspace = keyspace if ProtocolVersion.uses_keyspace_flag(self._cluster.protocol_version) else None)
+            # the speculative execution is only for idempotent statements (insert and select are idempotent)
+            statement.is_idempotent = bool(self._run_setup.param('speculative', None))
+            with self._lock:
+                self._prepared[(query, keyspace)] = statement
+        return statement
+
+    def create_model(self, run_setup: RunSetup = None):
+        """Create new NoSQL model (create keyspace and table)
+
+        :param run_setup:   setup for model (default is setup from init of CQLAccess)
+        """
         session = None
         try:
-            session = self.create_session(Setting.TIMEOUT_CREATE_MODEL)
-            if self._run_setup["cql"] != CQLType.AstraDB:
-                if self._run_setup['replication_factor']:
+            run_setup = run_setup if run_setup else self._run_setup
+            session = self.create_session()
+            execute = partial(session.execute, timeout = Setting.TIMEOUT_CREATE_MODEL)
+            if run_setup["cql"] != CQLType.AstraDB:
+                if run_setup['replication_factor']:
                     # Drop key space
-                    session.execute(f"DROP KEYSPACE IF EXISTS {self._run_setup['keyspace']};")
+                    execute(f"DROP KEYSPACE IF EXISTS {run_setup['keyspace']};")
 
                     # Create key space
-                    session.execute(f"CREATE KEYSPACE IF NOT EXISTS {self._run_setup['keyspace']}" +
-                                    " WITH replication = {" +
-                                    f"'class':'{self._run_setup['replication_class']}', 'replication_factor' : {self._run_setup['replication_factor']}" +
-                                    "};")
+                    execute(f"CREATE KEYSPACE IF NOT EXISTS {run_setup['keyspace']}" +
+                            " WITH replication = {" +
+                            f"'class':'{run_setup['replication_class']}', 'replication_factor' : {run_setup['replication_factor']}" +
+                            "};")
 
             # use LTW atomic command with IF
-            session.execute(f"DROP TABLE IF EXISTS {self._run_setup['keyspace']}.{Setting.TABLE_NAME};")
+            execute(f"DROP TABLE IF EXISTS {run_setup['keyspace']}.{Setting.TABLE_NAME};")
 
             # prepare insert statement for batch
             columns = ""
-            for i in range(0, self._run_setup.bulk_col):
+            for i in range(0, run_setup.bulk_col):
                 columns += f"fn{i} int,"
 
             # complex primary key (partition key 'fn0' and cluster key 'fn1')
-            create_tbl = f"CREATE TABLE IF NOT EXISTS {self._run_setup['keyspace']}.{Setting.TABLE_NAME} ({columns[:-1]}, PRIMARY KEY (fn0, fn1))"
+            create_tbl = f"CREATE TABLE IF NOT EXISTS {run_setup['keyspace']}.{Setting.TABLE_NAME} ({columns[:-1]}, PRIMARY KEY (fn0, fn1))"
 
             # add compaction setting
-            if self._run_setup['compaction']:
-                compaction_params = f", {self._run_setup['compaction_params']}" if self._run_setup['compaction_params'] else ""
+            if run_setup['compaction']:
+                compaction_params = f", {run_setup['compaction_params']}" if run_setup['compaction_params'] else ""
                 compaction = " WITH compaction = {" \
-                f"'class': '{self._run_setup['compaction']}'{compaction_params}" \
+                f"'class': '{run_setup['compaction']}'{compaction_params}" \
                 "};"
                 create_tbl += compaction
 
             # create table
-            session.execute(create_tbl)
+            execute(create_tbl)
+
+            # the prepared statements for the previous model are not valid
+            with self._lock:
+                self._prepared = {}
 
         finally:
             if session:
@@ -113,6 +274,8 @@ class CQLAccess:
 
     def close(self):
         """Close cluster connection and all sessions"""
+        self._sessions = []
+        self._prepared = {}
         if self._cluster:
             self._cluster.shutdown()
             self._cluster = None
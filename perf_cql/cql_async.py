@@ -0,0 +1,110 @@
+import threading
+import time
+from cassandra import OperationTimedOut, ReadTimeout, WriteTimeout
+from cassandra.cluster import Session, EXEC_PROFILE_DEFAULT
+
+# errors of request, which are counted as failed requests (the measurement continues),
+# other errors stop the execution
+TIMEOUT_ERRORS = (OperationTimedOut, ReadTimeout, WriteTimeout)
+
+
+class CQLAsyncWindow:
+    """Bounded window of outstanding requests, driven via 'session.execute_async()'.
+    The completions are collected from driver callbacks and processed in the executor thread."""
+
+    def __init__(self, session: Session, in_flight = 1, timeout = None, count_timeouts = False):
+        """
+        :param session:         session for execution of requests
+        :param in_flight:       max. amount of outstanding requests
+        :param timeout:         timeout for the request (default is timeout from default execution profile)
+        :param count_timeouts:  the request with timeout (see 'TIMEOUT_ERRORS') is completed with error,
+                                otherwise the timeout is raised as other errors (default)
+        """
+        self._session = session
+        self._in_flight = in_flight if in_flight > 0 else 1
+        self._timeout = timeout if timeout else session.get_execution_profile(EXEC_PROFILE_DEFAULT).request_timeout
+        self._count_timeouts = count_timeouts
+        self._slots = threading.BoundedSemaphore(self._in_flight)
+        self._lock = threading.Lock()
+        self._completed = []
+        self._exception = None
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def submit(self, statement, start_time = None, operation = None):
+        """Submit new request, the call is blocked in case of full window
+
+        :param statement:   statement for execution or list of statements (executed concurrently,
+                            the request is completed after completion of all statements)
+        :param start_time:  time for latency measurement (default is time of submit)
+        :param operation:   name of operation (e.g. 'read', 'write'), it is returned with completion
+        """
+        self._slots.acquire()
+        if self._exception:
+            self._slots.release()
+            raise self._exception
+
+        if start_time is None:
+            start_time = time.time()
+        statements = statement if isinstance(statement, list) else [statement]
+        request = [start_time, len(statements), operation, None]
+        try:
+            for item in statements:
+                future = self._session.execute_async(item, timeout = self._timeout)
+                future.add_callbacks(self._on_success, self._on_error,
+                                     callback_args = (request, future),
+                                     errback_args = (request, ))
+        except Exception:
+            self._slots.release()
+            raise
+
+    def completed(self) -> list:
+        """Return list of completed requests in format [(start_time, stop_time, operation, host, error), ...],
+        where host is coordinator of the request (for more statements, the coordinator of the last one)
+        and error is None or timeout of the request (see 'count_timeouts') (the list is returned only once)"""
+        if self._exception:
+            raise self._exception
+
+        with self._lock:
+            completed, self._completed = self._completed, []
+        return completed
+
+    def drain(self):
+        """Wait for all outstanding requests (without processing of their completions)"""
+        acquired = 0
+        try:
+            for _ in range(self._in_flight):
+                if not self._slots.acquire(timeout = self._timeout):
+                    break
+                acquired += 1
+        finally:
+            for _ in range(acquired):
+                self._slots.release()
+
+    def _on_success(self, rows, request, future):
+        stop_time = time.time()
+        with self._lock:
+            # request in format [start_time, amount of outstanding statements, operation, error]
+            request[1] -= 1
+            if request[1] > 0:
+                return
+            self._completed.append((request[0], stop_time, request[2],
+                                    None if request[3] else future.coordinator_host, request[3]))
+        self._slots.release()
+
+    def _on_error(self, exception, request):
+        stop_time = time.time()
+        with self._lock:
+            if self._count_timeouts and isinstance(exception, TIMEOUT_ERRORS):
+                # failed request, it is completed with error
+                request[3] = exception
+            elif not self._exception:
+                self._exception = exception
+            request[1] -= 1
+            if request[1] > 0:
+                return
+            if request[3]:
+                self._completed.append((request[0], stop_time, request[2], None, request[3]))
+        self._slots.release()
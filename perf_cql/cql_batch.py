@@ -0,0 +1,82 @@
+from enum import Enum
+from cassandra.cluster import Cluster
+from cassandra.query import BatchStatement, PreparedStatement
+
+
+class BatchGrouping(Enum):
+    off = 1             # all rows in one batch (rows can be from many partitions)
+    partition = 2       # one batch for each partition
+    replica = 3         # one batch for each set of replicas (based on token metadata)
+
+class CQLBatchBuilder:
+    """Build statements for one bulk of rows, based on batch type and grouping of rows.
+    The grouped batches are routed to the owning replica (it expects 'TokenAwarePolicy')."""
+
+    def __init__(self, insert_statement: PreparedStatement, consistency_level, batch_type,
+                 grouping = BatchGrouping.off, cluster: Cluster = None, keyspace = None, local_dc = None):
+        """
+        :param insert_statement:    prepared statement for insert of one row
+        :param consistency_level:   consistency level for statements
+        :param batch_type:          type of batch (LOGGED, UNLOGGED, COUNTER) or None for execution
+                                    of single statements (without batch)
+        :param grouping:            grouping of rows to batches
+        :param cluster:             cluster with token metadata (relevant for grouping 'replica')
+        :param keyspace:            keyspace (relevant for grouping 'replica')
+        :param local_dc:            local data center, replicas in this data center are preferred
+        """
+        self._insert_statement = insert_statement
+        self._consistency_level = consistency_level
+        self._batch_type = batch_type
+        self._grouping = grouping
+        self._cluster = cluster
+        self._keyspace = keyspace
+        self._local_dc = local_dc
+        self._replicas = {}
+
+    def build(self, rows):
+        """Return one statement or list of statements (executed concurrently) for the rows"""
+
+        if self._batch_type is None:
+            # single statements, without batch
+            return [self._bind(row) for row in rows]
+
+        if self._grouping == BatchGrouping.off:
+            batch = self._batch()
+            for row in rows:
+                batch.add(self._insert_statement, row)
+            return batch
+
+        # grouping of rows to batches
+        batches = {}
+        for row in rows:
+            bound = self._bind(row)
+            if self._grouping == BatchGrouping.partition:
+                key = bound.routing_key
+            else:
+                key = self._replica_key(bound.routing_key)
+            batch = batches.get(key, None)
+            if batch is None:
+                batch = batches[key] = self._batch()
+            batch.add(bound)
+        return list(batches.values())
+
+    def _bind(self, row):
+        bound = self._insert_statement.bind(row)
+        bound.consistency_level = self._consistency_level
+        return bound
+
+    def _batch(self):
+        batch = BatchStatement(batch_type = self._batch_type, consistency_level = self._consistency_level)
+        # batch of inserts is idempotent as the insert itself (relevant for speculative execution)
+        batch.is_idempotent = self._insert_statement.is_idempotent
+        return batch
+
+    def _replica_key(self, routing_key):
+        """Return key of replicas for partition (with cache)"""
+        key = self._replicas.get(routing_key, None)
+        if key is None:
+            replicas = self._cluster.metadata.get_replicas(self._keyspace, routing_key)
+            local_replicas = [host.address for host in replicas if host.datacenter == self._local_dc]
+            key = tuple(sorted(local_replicas if local_replicas else [host.address for host in replicas]))
+            self._replicas[routing_key] = key
+        return key
@@ -0,0 +1,193 @@
+import io, json, os.path, re, struct, time
+from prettytable import PrettyTable
+from colorama import Fore, Style
+from cassandra import ProtocolVersion
+from cassandra.cluster import ExecutionProfile
+from cassandra.cqltypes import Int32Type
+from cassandra.protocol import ResultMessage, ColumnMetadata
+from cassandra.query import PreparedStatement, named_tuple_factory
+
+
+class OfflineAccess:
+    """Replacement of 'CQLAccess' without cluster for client benchmark, the statements
+    are prepared locally (all bind markers and columns are with type 'int' and the first
+    bind marker is partition key)"""
+
+    _SELECT = re.compile(r"^\s*SELECT\s+(.+?)\s+FROM\s+(\w+)\.(\w+)", re.IGNORECASE | re.DOTALL)
+
+    def __init__(self):
+        self.cluster = None
+
+    def prepare(self, query, keyspace = None) -> PreparedStatement:
+        select = OfflineAccess._SELECT.match(query)
+        keyspace, table = (select.group(2), select.group(3)) if select else (keyspace, "t01")
+        binds = [ColumnMetadata(keyspace, table, f"p{index}", Int32Type) for index in range(query.count("?"))]
+        columns = [ColumnMetadata(keyspace, table, name.strip(), Int32Type) for name in select.group(1).split(",")] if select else None
+        return PreparedStatement.from_message(b"offline", binds, [0], None, query, keyspace,
+                                              ProtocolVersion.V4, columns, None)
+
+    @staticmethod
+    def result(statement: PreparedStatement, rows) -> bytes:
+        """Return body of result message (rows) for prepared select, see 'materialize'"""
+        columns = statement.result_metadata
+        output = struct.pack(">iii", 0x0002, 0x0001, len(columns))
+        output += OfflineAccess._string(columns[0].keyspace_name) + OfflineAccess._string(columns[0].table_name)
+        output += b"".join([OfflineAccess._string(column.name) + b"\x00\x09" for column in columns])
+        output += struct.pack(">i", rows)
+        value = struct.pack(">ii", 4, 0)
+        output += value * (rows * len(columns))
+        return output
+
+    @staticmethod
+    def materialize(body: bytes) -> list:
+        """Decode result message and create rows (in the same way as driver for session)"""
+        message = ResultMessage.recv_body(io.BytesIO(body), ProtocolVersion.V4, {}, None, None)
+        return named_tuple_factory(message.column_names, message.parsed_rows)
+
+    @staticmethod
+    def _string(value: str) -> bytes:
+        value = value.encode("utf-8")
+        return struct.pack(">H", len(value)) + value
+
+class OfflineFuture:
+    """Replacement of 'ResponseFuture' for 'OfflineSession', the request is already completed
+    (the callbacks are called immediately in the caller thread, in the same way as in driver
+    for completed future)"""
+
+    def __init__(self, rows):
+        self.coordinator_host = None
+        self._rows = rows
+
+    def add_callbacks(self, callback, errback, callback_args = (), callback_kwargs = None,
+                      errback_args = (), errback_kwargs = None):
+        callback(self._rows, *callback_args, **(callback_kwargs or {}))
+
+    def result(self):
+        return self._rows
+
+class OfflineSession:
+    """Replacement of session without cluster for client benchmark, the requests via
+    'execute_async' are completed immediately with the same rows (the measurement of harness
+    overhead e.g. window of requests, callbacks and probe)"""
+
+    def __init__(self, rows = None):
+        """
+        :param rows:    rows in result of each request (default is without rows)
+        """
+        self.cluster = None
+        self._rows = rows if rows else []
+        self._profile = ExecutionProfile()
+
+    def get_execution_profile(self, name) -> ExecutionProfile:
+        return self._profile
+
+    def execute_async(self, statement, timeout = None) -> OfflineFuture:
+        return OfflineFuture(self._rows)
+
+class ClientBenchmark:
+    """Benchmark of client side (the hot loops of workload without database), each stage
+    is measured as min. time per call from more repeats (in style of 'timeit'). The times
+    can be stored as baseline and compared with the next runs (regression of harness).
+
+        example::
+
+            bench = ClientBenchmark("bench-baseline.json", threshold = 0.2)
+            bench.measure("read.bind", [200, 10], lambda: bind(data))
+            regressions = bench.compare()
+            bench.print_table()
+    """
+
+    REPEAT = 5          # amount of repeats for each stage
+    MIN_TIME = 0.05     # min. time of one repeat in seconds (the amount of calls is calibrated)
+
+    def __init__(self, baseline_file = None, threshold = 0.2):
+        """
+        :param baseline_file:   file with baseline (JSON), it can be missing
+        :param threshold:       relative slowdown for regression (e.g. 0.2 = 20%)
+        """
+        self._baseline_file = baseline_file
+        self._threshold = threshold
+        self._baseline = {}
+        self._stages = []
+        if baseline_file and os.path.exists(baseline_file):
+            with open(baseline_file, "r") as f:
+                self._baseline = json.load(f)
+
+    @property
+    def stages(self) -> list:
+        return self._stages
+
+    def measure(self, name, bulk, func) -> float:
+        """Measure one stage
+
+        :param name:    name of stage e.g. 'read.bind'
+        :param bulk:    bulk in format [rows, columns]
+        :param func:    function for one call of stage
+        :return:        min. time per call in seconds
+        """
+        # calibration of amount of calls for one repeat
+        calls = 1
+        while True:
+            duration = self._run(func, calls)
+            if duration >= ClientBenchmark.MIN_TIME or calls >= 1000000:
+                break
+            calls *= 10 if duration < ClientBenchmark.MIN_TIME / 10 else 2
+
+        best = duration / calls
+        for _ in range(ClientBenchmark.REPEAT - 1):
+            best = min(best, self._run(func, calls) / calls)
+
+        self._stages.append({'name': name, 'bulk': bulk, 'time': best, 'state': "OK",
+                             'baseline': self._baseline.get(self._key(name, bulk), None)})
+        return best
+
+    @staticmethod
+    def _run(func, calls) -> float:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return time.perf_counter() - start
+
+    @staticmethod
+    def _key(name, bulk):
+        return f"{name}:{bulk[0]}x{bulk[1]}"
+
+    def compare(self) -> int:
+        """Compare stages with baseline, return amount of regressions"""
+        regressions = 0
+        for stage in self._stages:
+            if stage['baseline'] and stage['time'] > stage['baseline'] * (1 + self._threshold):
+                stage['state'] = "Regression"
+                regressions += 1
+        return regressions
+
+    def save(self):
+        """Save measured stages as baseline (the other stages in baseline are kept)"""
+        for stage in self._stages:
+            self._baseline[self._key(stage['name'], stage['bulk'])] = stage['time']
+        directory = os.path.dirname(self._baseline_file)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        with open(self._baseline_file, "w") as f:
+            json.dump(self._baseline, f, indent = 1)
+
+    def print_table(self):
+        table = PrettyTable()
+        table.border = True
+        table.header = True
+        table.padding_width = 1
+        table.field_names = ["Stage", "Bulk", "Time/call [us]", "Time/row [us]", "Baseline [us]", "Delta", "State"]
+        table.align = "r"
+        table.align["Stage"] = "l"
+
+        for stage in self._stages:
+            baseline = stage['baseline']
+            state = stage['state'] if stage['state'] == "OK" else Fore.LIGHTRED_EX + stage['state'] + Style.RESET_ALL
+            table.add_row([stage['name'],
+                           f"{stage['bulk'][0]}/{stage['bulk'][1]}",
+                           round(stage['time'] * 1000000, 2),
+                           round(stage['time'] * 1000000 / stage['bulk'][0], 3),
+                           round(baseline * 1000000, 2) if baseline else "",
+                           f"{round((stage['time'] - baseline) / baseline * 100, 1)}%" if baseline else "",
+                           state])
+        print(table)
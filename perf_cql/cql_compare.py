@@ -0,0 +1,173 @@
+import math
+import numpy as np
+from prettytable import PrettyTable
+from colorama import Fore, Style
+from cql_results import CQLResults
+
+
+def _betacf(a, b, x):
+    """Continued fraction for incomplete beta function (modified Lentz's method)"""
+    tiny = 1e-30
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1.0)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 200):
+        m2 = 2 * m
+        for aa in (m * (b - m) * x / ((a + m2 - 1.0) * (a + m2)),
+                   -(a + m) * (a + b + m) * x / ((a + m2) * (a + m2 + 1.0))):
+            d = 1.0 + aa * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + aa / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1.0) < 3e-12:
+            break
+    return h
+
+def _betai(a, b, x):
+    """Regularized incomplete beta function I_x(a, b)"""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    front = math.exp(math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x))
+    if x < (a + 1.0) / (a + b + 2.0):
+        return front * _betacf(a, b, x) / a
+    return 1.0 - front * _betacf(b, a, 1.0 - x) / b
+
+def welch_test(a, b) -> float:
+    """Two-sided p-value of Welch's t-test (the means of samples with different variance)
+
+    :param a:   first samples
+    :param b:   second samples
+    :return:    p-value, in case of less than two samples None (without test)
+    """
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    if len(a) < 2 or len(b) < 2:
+        return None
+    var_a, var_b = a.var(ddof=1) / len(a), b.var(ddof=1) / len(b)
+    if var_a + var_b == 0:
+        return 1.0 if a.mean() == b.mean() else 0.0
+    t = (a.mean() - b.mean()) / math.sqrt(var_a + var_b)
+    df = (var_a + var_b) ** 2 / (var_a ** 2 / (len(a) - 1) + var_b ** 2 / (len(b) - 1))
+    return _betai(df / 2.0, 0.5, df / (df + t * t))
+
+class ResultsComparison:
+    """Comparison of results from more runs (see 'CQLResults'), the first result set is baseline.
+    The steps are matched by name of test, bulk and executors. The step is regression, when the
+    throughput decreases (or p99 latency increases) more than threshold and the change is
+    statistically significant (Welch's t-test for throughput and p99 in intervals of time series,
+    see 'TIMESERIES_INTERVAL'). The step with less than two intervals is evaluated only based
+    on threshold (without p-value).
+
+        example::
+
+            comparison = ResultsComparison(["res_cassandra-W-2024-09-04-072428", "res_cassandra-W-2024-09-11-071502"])
+            regressions = comparison.compare()
+            comparison.print_table()
+    """
+
+    def __init__(self, directories: list, threshold = 0.05, alpha = 0.05):
+        """
+        :param directories:     directories with results, the first one is baseline
+        :param threshold:       relative change for regression (e.g. 0.05 = 5%)
+        :param alpha:           significance level for statistical test
+        """
+        self._directories = directories
+        self._threshold = threshold
+        self._alpha = alpha
+        self._rows = []
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def _steps(self, directory) -> dict:
+        """Return steps from result set in format {key: (throughput, p99, throughput samples, p99 samples)}"""
+        meta, tables = CQLResults.load(directory)
+        steps, timeseries = tables['steps'], tables['timeseries']
+        groups = meta.get('groups', [])
+        name = meta.get('name', meta.get('label', ""))
+
+        output = {}
+        for step in steps:
+            key = (name,
+                   f"{step['bulk_row']}/{step['bulk_col']}",
+                   f"{step['processes']}x{step['threads']}",
+                   groups[step['group']] if step['group'] < len(groups) else "")
+            if key in output:
+                continue
+
+            # samples from intervals of time series (the same statistics as for threshold, throughput
+            # and p99), without the first and the last interval (the intervals are only partial)
+            samples = timeseries[timeseries['step'] == step['step']][1:-1]
+            throughputs = samples['call_per_sec']
+            latencies = samples['p99'][samples['calls'] > 0]
+            output[key] = (float(step['total_call_per_sec']), float(step['p99']), throughputs, latencies)
+        return output
+
+    def compare(self) -> int:
+        """Compare all result sets with baseline, return amount of regressions"""
+        self._rows = []
+        regressions = 0
+        baseline = self._steps(self._directories[0])
+
+        for directory in self._directories[1:]:
+            for key, current in self._steps(directory).items():
+                base = baseline.get(key, None)
+                if base is None:
+                    continue
+
+                delta_calls = (current[0] - base[0]) / base[0] if base[0] > 0 else 0
+                delta_p99 = (current[1] - base[1]) / base[1] if base[1] > 0 else 0
+                p_calls = welch_test(base[2], current[2])
+                p_latency = welch_test(base[3], current[3])
+
+                # without p-value (less than two intervals), the regression is only based on threshold
+                state = "OK"
+                if delta_calls < -self._threshold and (p_calls is None or p_calls < self._alpha):
+                    state = "Throughput"
+                elif delta_p99 > self._threshold and (p_latency is None or p_latency < self._alpha):
+                    state = "Latency"
+                if state != "OK":
+                    regressions += 1
+
+                self._rows.append({'directory': directory,
+                                   'key': key,
+                                   'base_calls': base[0],
+                                   'calls': current[0],
+                                   'delta_calls': delta_calls,
+                                   'p_calls': p_calls,
+                                   'base_p99': base[1],
+                                   'p99': current[1],
+                                   'delta_p99': delta_p99,
+                                   'p_latency': p_latency,
+                                   'state': state})
+        return regressions
+
+    def print_table(self):
+        table = PrettyTable()
+        table.border = True
+        table.header = True
+        table.padding_width = 1
+        table.field_names = ["Test", "Bulk", "Executors", "Group", "Calls/sec", "Delta", "p-value",
+                             "p99 [sec]", "Delta p99", "p-value p99", "State"]
+        table.align = "r"
+        table.align["Test"] = "l"
+
+        threshold_only = False
+        for row in self._rows:
+            state = row['state'] if row['state'] == "OK" else Fore.LIGHTRED_EX + row['state'] + Style.RESET_ALL
+            if row['p_calls'] is None or row['p_latency'] is None:
+                threshold_only = True
+            table.add_row([row['key'][0], row['key'][1], row['key'][2], row['key'][3],
+                           f"{round(row['base_calls'], 1)} > {round(row['calls'], 1)}",
+                           f"{round(row['delta_calls'] * 100, 1)}%",
+                           "n/a" if row['p_calls'] is None else round(row['p_calls'], 4),
+                           f"{round(row['base_p99'], 6)} > {round(row['p99'], 6)}",
+                           f"{round(row['delta_p99'] * 100, 1)}%",
+                           "n/a" if row['p_latency'] is None else round(row['p_latency'], 4),
+                           state])
+        print(table)
+        if threshold_only:
+            print("p-value 'n/a' means threshold only (less than two intervals in time series, see 'TIMESERIES_INTERVAL')")
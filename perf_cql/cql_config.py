@@ -1,7 +1,8 @@
 from cassandra import ConsistencyLevel
+from cassandra.query import BatchType
 from ast import literal_eval
 from enum import Enum
-from os import path
+from os import path, environ
 import cql_helper
 
 
@@ -10,6 +11,7 @@ class CQLType(Enum):
     Cassandra = 2
     AstraDB = 3
     CosmosDB = 4
+    Stub = 5
 
 class ConsistencyHelper:
     name_to_value = {
@@ -26,10 +28,18 @@ class ConsistencyHelper:
     'SERIAL': ConsistencyLevel.SERIAL,
     }
 
+class BatchHelper:
+    name_to_value = {
+    'LOGGED': BatchType.LOGGED,
+    'UNLOGGED': BatchType.UNLOGGED,
+    'NONE': None,
+    }
+
 class CQLConfigSetting:
 
     # The key parameters
     EXECUTOR_DURATION = "5"
+    WARMUP_SECONDS = "0"
     BULK_LIST = "[[200, 10]]"
     BULK_LIST_W = "[[200, 10]]"
     BULK_LIST_R = "[[1, 10]]"
@@ -40,10 +50,29 @@ class CQLConfigSetting:
     DETAIL_OUTPUT = "True"
     GENERATE_GRAPH = "Perf"
     CLUSTER_DIAGNOSE = "Short"
+    CLUSTER_DIAGNOSE_TTL = "60"
+    HEALTH_INTERVAL = "10"
+    TIMESERIES_INTERVAL = "1"
+    PROFILE = "Off"
+    DRIVER_METRICS = "On"
+    RESULTS_STORE = "On"
     MULTIPLE_ENV_DELAY = "0"
+    WORKERS = ""
+    WORKER_KEY = ""
+
+    # The saturation search
+    SEARCH_MODE = "executors"
+    SEARCH_START = "1"
+    SEARCH_MAX = "128"
+    SEARCH_MIN_GAIN = "0.1"
+    SEARCH_SLA_P99 = "0"
+    SEARCH_STEPS = "10"
 
     KEYSPACE = "prftest"
     TEST_TYPE = "W"
+    RW_RATIO = "50:50"
+    PREFILL_ROWS = "[0, 0]"
+    KEY_DISTRIBUTION = "uniform"
     REPLICATION_CLASS = "NetworkTopologyStrategy"
     REPLICATION_FACTOR = "3"
     CONSISTENCY_LEVEL = "LOCAL_QUORUM"
@@ -53,6 +82,19 @@ class CQLConfigSetting:
     PORT = "9042"
     IP = "localhost"
     LABEL = "local"
+    IN_FLIGHT = "1"
+    TARGET_RATE = "0"
+    DATA_POOL = "100000"
+    BATCH_TYPE = "LOGGED"
+    BATCH_GROUPING = "Off"
+    PROTOCOL_VERSION = "4"
+    COMPRESSION = "Off"
+    SESSIONS = "1"
+    MAX_REQUESTS = "0"
+    TOKEN_AWARE = "Auto"
+    SPECULATIVE = "Off"
+    STUB_LATENCY = "0"
+    STUB_ROWS = "1"
 
 class CQLConfig:
 
@@ -102,13 +144,40 @@ class CQLConfig:
             global_param['detail_output'] = cql_helper.str2bool(self._config.get('DETAIL_OUTPUT', CQLConfigSetting.DETAIL_OUTPUT))
             global_param['generate_graph'] = self._config.get('GENERATE_GRAPH', CQLConfigSetting.GENERATE_GRAPH)
             global_param['executor_duration'] = int(self._config.get('EXECUTOR_DURATION', CQLConfigSetting.EXECUTOR_DURATION))
+            global_param['warmup_seconds'] = float(self._config.get('WARMUP_SECONDS', CQLConfigSetting.WARMUP_SECONDS))
             global_param['executor_start_delay'] = int(self._config.get('EXECUTOR_START_DELAY', CQLConfigSetting.EXECUTOR_START_DELAY))
             global_param['cluster_diagnose'] = self._config.get("CLUSTER_DIAGNOSE", CQLConfigSetting.CLUSTER_DIAGNOSE)
+            global_param['cluster_diagnose_ttl'] = int(self._config.get("CLUSTER_DIAGNOSE_TTL", CQLConfigSetting.CLUSTER_DIAGNOSE_TTL))
+            global_param['health_interval'] = float(self._config.get("HEALTH_INTERVAL", CQLConfigSetting.HEALTH_INTERVAL))
+            global_param['timeseries_interval'] = float(self._config.get("TIMESERIES_INTERVAL", CQLConfigSetting.TIMESERIES_INTERVAL))
+            global_param['profile'] = self._config.get("PROFILE", CQLConfigSetting.PROFILE).lower()
+            global_param['driver_metrics'] = cql_helper.str2bool(self._config.get("DRIVER_METRICS", CQLConfigSetting.DRIVER_METRICS))
+            global_param['results_store'] = cql_helper.str2bool(self._config.get("RESULTS_STORE", CQLConfigSetting.RESULTS_STORE))
             global_param['cluster_diagnose_only'] = False
             global_param['keyspace'] = self._config.get("KEYSPACE", CQLConfigSetting.KEYSPACE)
             global_param['bulk_list_r'] = literal_eval(self._config.get("BULK_LIST_R", CQLConfigSetting.BULK_LIST_R))
             global_param['bulk_list_w'] = literal_eval(self._config.get("BULK_LIST_W", CQLConfigSetting.BULK_LIST_W))
             global_param['multiple_env_delay'] = int(self._config.get('MULTIPLE_ENV_DELAY', CQLConfigSetting.MULTIPLE_ENV_DELAY))
+
+            # distributed run on workers in format 'host:port, host:port' (see command 'worker')
+            global_param['workers'] = [worker.strip() for worker in self._config.get('WORKERS', CQLConfigSetting.WORKERS).split(",") if worker.strip()]
+            # shared key with workers, without default (from ENV file or from environment variable)
+            global_param['worker_key'] = self._config.get('WORKER_KEY', environ.get('WORKER_KEY', CQLConfigSetting.WORKER_KEY))
+
+            # load of data set (see command 'load')
+            global_param['load'] = False
+
+            # size of keyspaces (see command 'size')
+            global_param['size'] = None
+
+            # saturation search (see command 'search')
+            global_param['search'] = False
+            global_param['search_mode'] = self._config.get('SEARCH_MODE', CQLConfigSetting.SEARCH_MODE).lower()
+            global_param['search_start'] = literal_eval(self._config.get('SEARCH_START', CQLConfigSetting.SEARCH_START))
+            global_param['search_max'] = literal_eval(self._config.get('SEARCH_MAX', CQLConfigSetting.SEARCH_MAX))
+            global_param['search_min_gain'] = float(self._config.get('SEARCH_MIN_GAIN', CQLConfigSetting.SEARCH_MIN_GAIN))
+            global_param['search_sla_p99'] = float(self._config.get('SEARCH_SLA_P99', CQLConfigSetting.SEARCH_SLA_P99))
+            global_param['search_steps'] = int(self._config.get('SEARCH_STEPS', CQLConfigSetting.SEARCH_STEPS))
             return global_param
         else:
             return None
@@ -123,8 +192,21 @@ class CQLConfig:
                 param['bulk_list'] = self._inherit_param_eval("BULK_LIST", global_param,'bulk_list_r', CQLConfigSetting.BULK_LIST_R)
             else:
                 param['bulk_list'] = self._inherit_param_eval("BULK_LIST", global_param,'bulk_list_w', CQLConfigSetting.BULK_LIST_W)
+                if param['test_type'] in ("rw", "wr"):
+                    # the read operations in mixed workload have own bulk
+                    param['read_bulk_list'] = self._inherit_param_eval("BULK_LIST_R", global_param,'bulk_list_r', CQLConfigSetting.BULK_LIST_R)
             param['keyspace'] = self._inherit_param("KEYSPACE", global_param, "keyspace", CQLConfigSetting.KEYSPACE)
 
+            # ratio of read:write operations for mixed workload (as fraction of reads)
+            ratio = [float(value) for value in self._config.get("RW_RATIO", CQLConfigSetting.RW_RATIO).split(":")]
+            param['rw_ratio'] = ratio[0] / (ratio[0] + ratio[1])
+
+            # prefilled data set in format [partitions, clustering rows] (see command 'load')
+            param['prefill_rows'] = literal_eval(self._config.get("PREFILL_ROWS", CQLConfigSetting.PREFILL_ROWS))
+
+            # distribution of keys for read and write (e.g. 'uniform', 'zipf:0.99', 'hotspot:0.2:0.8')
+            param['key_distribution'] = self._config.get("KEY_DISTRIBUTION", CQLConfigSetting.KEY_DISTRIBUTION)
+
             # connection setting
             param["ip"] = self._config.get(f"{adapter}_IP", CQLConfigSetting.IP).split(",")
             param["port"] = self._config.get(f"{adapter}_PORT", CQLConfigSetting.PORT)
@@ -158,6 +240,37 @@ class CQLConfig:
             # label
             param['label'] = self._config.get(f"{adapter}_LABEL", CQLConfigSetting.LABEL)
 
+            # amount of asynchronous requests in flight (per executor)
+            param['in_flight'] = int(self._config.get(f"{adapter}_IN_FLIGHT", CQLConfigSetting.IN_FLIGHT))
+
+            # open loop with constant rate (rows/second for all executors, request is bulk of rows), zero means closed loop
+            param['target_rate'] = float(self._config.get(f"{adapter}_TARGET_RATE", CQLConfigSetting.TARGET_RATE))
+
+            # amount of pre-generated rows in data pool (per executor)
+            param['data_pool'] = int(self._config.get(f"{adapter}_DATA_POOL", CQLConfigSetting.DATA_POOL))
+
+            # batch type for write (LOGGED, UNLOGGED or NONE) and grouping of rows to batches (Off, Partition, Replica)
+            param['batch_type'] = BatchHelper.name_to_value[self._config.get(f"{adapter}_BATCH_TYPE",
+                                                                             CQLConfigSetting.BATCH_TYPE).upper()]
+            param['batch_grouping'] = self._config.get(f"{adapter}_BATCH_GROUPING", CQLConfigSetting.BATCH_GROUPING).lower()
+
+            # client tuning, protocol version, compression (Off, LZ4, Snappy), sessions (connection per host for each),
+            # max. requests per connection (zero means default), routing to the owning replica (Auto, On, Off)
+            # and speculative execution in format [delay in seconds, max. attempts] (or Off)
+            param['protocol_version'] = int(self._config.get(f"{adapter}_PROTOCOL_VERSION", CQLConfigSetting.PROTOCOL_VERSION))
+            compression = self._config.get(f"{adapter}_COMPRESSION", CQLConfigSetting.COMPRESSION).lower()
+            param['compression'] = None if compression == "off" else compression
+            param['sessions'] = int(self._config.get(f"{adapter}_SESSIONS", CQLConfigSetting.SESSIONS))
+            param['max_requests'] = int(self._config.get(f"{adapter}_MAX_REQUESTS", CQLConfigSetting.MAX_REQUESTS))
+            param['token_aware'] = self._config.get(f"{adapter}_TOKEN_AWARE", CQLConfigSetting.TOKEN_AWARE).lower()
+            speculative = self._config.get(f"{adapter}_SPECULATIVE", CQLConfigSetting.SPECULATIVE)
+            param['speculative'] = None if speculative.lower() == "off" else literal_eval(speculative)
+
+            # stub server without database, artificial latency in seconds and rows in result of select
+            if adapter == "STUB":
+                param['stub_latency'] = float(self._config.get("STUB_LATENCY", CQLConfigSetting.STUB_LATENCY))
+                param['stub_rows'] = int(self._config.get("STUB_ROWS", CQLConfigSetting.STUB_ROWS))
+
             return param
         else:
             return None
\ No newline at end of file
@@ -0,0 +1,56 @@
+import numpy as np
+from numpy import random
+from cql_helper import get_rng_generator
+from cql_distribution import KeyDistribution, DistributionType
+
+
+class DataPool:
+    """Ring of pre-generated synthetic data blocks (the data are generated before the measurement).
+    Each call 'next()' returns zero-copy view to the next block. The key columns are regenerated
+    in one vectorized call after each round of the ring (it avoids repeated writes of the same keys)."""
+
+    def __init__(self, block_shape, max_value, pool_rows = 0, key_columns = None, generator: random._generator.Generator = None,
+                 distribution: KeyDistribution = None):
+        """
+        :param block_shape:     shape of one block e.g. (rows, columns) or (keys, )
+        :param max_value:       max. generated value (exclusive), it can be also array with max. value
+                                for each item in the last dimension of block
+        :param pool_rows:       amount of pre-generated rows (first dimension of block) in the ring,
+                                value 0 means only one block (regenerated for each call)
+        :param key_columns:     amount of key columns (in the last dimension), which will be regenerated
+                                after each round of the ring, None means all columns
+        :param generator:       generator for usage, in case of None the new generator will be created
+        :param distribution:    distribution of keys, in case of None the uniform distribution is used
+        """
+        self._generator = generator if generator else get_rng_generator()
+        self._max_value = np.asarray(max_value)
+        self._key_columns = key_columns
+        self._distribution = distribution if distribution else KeyDistribution()
+        blocks = max(1, pool_rows // block_shape[0])
+        self._ring = self._generator.integers(max_value, size=(blocks, *block_shape), dtype=np.int32)
+        if self._distribution.type != DistributionType.uniform:
+            self._refresh_keys()
+        self._index = 0
+
+    @property
+    def size(self):
+        """Amount of blocks in the ring"""
+        return self._ring.shape[0]
+
+    def next(self) -> np.ndarray:
+        """Return view to the next block"""
+        if self._index >= self._ring.shape[0]:
+            self._refresh_keys()
+            self._index = 0
+        block = self._ring[self._index]
+        self._index += 1
+        return block
+
+    def _refresh_keys(self):
+        """Regenerate key columns for the whole ring"""
+        if self._key_columns is None:
+            self._ring[...] = self._distribution.sample(self._generator, self._max_value, self._ring.shape)
+        else:
+            keys = self._ring[..., :self._key_columns]
+            max_value = self._max_value if self._max_value.ndim == 0 else self._max_value[:self._key_columns]
+            keys[...] = self._distribution.sample(self._generator, max_value, keys.shape)
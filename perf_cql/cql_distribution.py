@@ -0,0 +1,105 @@
+import math
+import numpy as np
+from numpy import random
+from enum import Enum
+
+
+class DistributionType(Enum):
+    uniform = 1         # all keys with the same probability
+    zipf = 2            # zipfian, the key with rank k has probability 1/k^theta
+    hotspot = 3         # part of accesses goes to the small hot set of keys
+    sequential = 4      # rows in sequence 0, 1, 2, ... (with wrap)
+    latest = 5          # zipfian, skewed to the latest rows of sequence
+
+class KeyDistribution:
+    """Generator of keys with specific access distribution. The keys are generated in vectorized
+    calls for the whole block of data (the cost of generator is negligible in comparison with request).
+    The last dimension of block are key columns of one row e.g. (fn0, fn1), the sequential and latest
+    distributions advance the sequence per row (fn0 = index // clustering, fn1 = index % clustering).
+
+        example::
+
+            distribution = KeyDistribution("zipf:0.99")
+            keys = distribution.sample(generator, 99999, (1000, 2))
+    """
+
+    MAX_LATEST = 100000     # max. distance from the latest row for 'latest' (size of zipfian CDF)
+
+    def __init__(self, definition = "uniform"):
+        """
+        :param definition:  definition in format 'type[:param[:param]]' e.g. 'uniform',
+                            'zipf:0.99' (theta), 'hotspot:0.2:0.8' (hot set, hot access),
+                            'sequential', 'latest:0.99' (theta)
+        """
+        items = [item.strip() for item in definition.lower().split(":")]
+        params = [float(item) for item in items[1:]]
+
+        self._type = DistributionType[items[0]]
+        self._theta = params[0] if len(params) > 0 else 0.99
+        self._hot_set = params[0] if len(params) > 0 else 0.2
+        self._hot_access = params[1] if len(params) > 1 else 0.8
+        self._position = 0
+        self._cdf = {}
+
+    @property
+    def type(self):
+        return self._type
+
+    def sample(self, generator: random._generator.Generator, max_value, shape) -> np.ndarray:
+        """Return keys in range <0, max_value)
+
+        :param generator:   generator of random values
+        :param max_value:   max. value (exclusive), it can be also array with max. value
+                            for each item in the last dimension of shape (key columns)
+        :param shape:       shape of generated keys in format (..., rows, key columns)
+        """
+        max_value = np.asarray(max_value)
+        if self._type in (DistributionType.sequential, DistributionType.latest):
+            return self._sequence(generator, np.broadcast_to(max_value, shape[-1:]), shape)
+        if max_value.ndim == 0:
+            return self._sample(generator, int(max_value), shape)
+
+        # different max. values for items in the last dimension
+        keys = np.empty(shape, dtype=np.int32)
+        for value in np.unique(max_value):
+            mask = max_value == value
+            keys[..., mask] = self._sample(generator, int(value), keys[..., mask].shape)
+        return keys
+
+    def _sample(self, generator: random._generator.Generator, max_value, shape) -> np.ndarray:
+        if self._type == DistributionType.uniform or max_value <= 1:
+            return generator.integers(max_value, size=shape, dtype=np.int32)
+
+        if self._type == DistributionType.zipf:
+            return self._zipf(generator, max_value, shape)
+
+        # hotspot
+        hot = max(1, min(int(max_value * self._hot_set), max_value - 1))
+        hot_keys = generator.integers(hot, size=shape, dtype=np.int32)
+        cold_keys = generator.integers(hot, max_value, size=shape, dtype=np.int32)
+        return np.where(generator.random(shape) < self._hot_access, hot_keys, cold_keys)
+
+    def _sequence(self, generator: random._generator.Generator, max_values, shape) -> np.ndarray:
+        """Keys based on position of row in sequence, the index of row is split to the key columns
+        (the last column changes the fastest, e.g. fn0 = index // clustering, fn1 = index % clustering)"""
+        rows = shape[:-1]
+        index = self._position + np.arange(math.prod(rows), dtype=np.int64).reshape(rows)
+        self._position += index.size
+        if self._type == DistributionType.latest:
+            total = math.prod([int(value) for value in max_values])
+            index -= self._zipf(generator, min(total, KeyDistribution.MAX_LATEST), rows)
+
+        keys = np.empty(shape, dtype=np.int32)
+        for column in reversed(range(shape[-1])):
+            index, keys[..., column] = np.divmod(index, int(max_values[column]))
+        return keys
+
+    def _zipf(self, generator: random._generator.Generator, max_value, shape) -> np.ndarray:
+        """Zipfian ranks (rank 0 is the most frequent) via inverse CDF, the CDF is cached"""
+        cdf = self._cdf.get(max_value, None)
+        if cdf is None:
+            cdf = np.cumsum(np.arange(1, max_value + 1, dtype=np.float64) ** -self._theta)
+            cdf /= cdf[-1]
+            self._cdf[max_value] = cdf
+        keys = np.searchsorted(cdf, generator.random(shape), side='right')
+        return np.minimum(keys, max_value - 1).astype(np.int32)
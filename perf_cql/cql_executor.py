@@ -0,0 +1,486 @@
+import datetime
+import json
+import os.path
+from qgate_perf.parallel_executor import ParallelExecutor
+from qgate_perf.parallel_probe import ParallelProbe
+from qgate_perf.file_format import FileFormat
+from qgate_perf.executor_helper import GraphScope
+from qgate_perf.run_setup import RunSetup
+from cql_file_format import CQLFileFormat
+from cql_histogram import LatencyHistogram
+from cql_results import CQLResults
+from cql_timeseries import TimeSeries
+from cql_profiler import CQLProfiler, ProfileMode
+from cql_metrics import CQLDriverMetrics
+from cql_worker import CQLCoordinator
+
+
+class CQLExecutor(ParallelExecutor):
+    """Parallel executor with support of CQLProbe (e.g. executors with more requests in flight)"""
+
+    def __init__(self,
+                 func,
+                 label = None,
+                 detail_output = True,
+                 output_file = None,
+                 init_each_bulk = False,
+                 parameters: dict = None):
+        """
+        :param parameters:  parameters of run setup (the same dict as for 'RunSetup'), the amount
+                            of executors for each step is added as parameter 'executors'
+        """
+        super().__init__(func, label, detail_output, output_file, init_each_bulk)
+        self._parameters = parameters
+        self._last_result = None
+        self._related_files = {}
+        self._results = None
+        self._coordinator = None
+
+    @property
+    def label(self):
+        return self._label
+
+    @property
+    def output_file(self):
+        return self._output_file
+
+    @property
+    def results(self) -> CQLResults:
+        """Columnar results of all steps (None means without collection of results)"""
+        return self._results
+
+    @results.setter
+    def results(self, results: CQLResults):
+        self._results = results
+
+    @property
+    def coordinator(self) -> CQLCoordinator:
+        """Coordinator for distributed run on workers (None means local run)"""
+        return self._coordinator
+
+    @coordinator.setter
+    def coordinator(self, coordinator: CQLCoordinator):
+        self._coordinator = coordinator
+
+    @property
+    def last_result(self) -> dict:
+        """Summary of the last executed step in format {'total_call_per_sec': value, 'percentiles': {...}}"""
+        return self._last_result
+
+    def write_record(self, out: dict):
+        """Write additional record (e.g. size of keyspace) to the performance output file,
+        the output directory is created, if it does not exist"""
+        if self._output_file is None:
+            return
+        with self._open_output() as file:
+            file.write(json.dumps(out) + "\n")
+
+    def run_executor(self, executor_list, run_setup: RunSetup = None):
+        self._last_result = None
+        try:
+            return super().run_executor(executor_list, run_setup)
+        finally:
+            self._close_related_files()
+
+    def _executeCore(self, run_setup: RunSetup, return_dict, processes=2, threads=2):
+        # amount of executors (for all workers), it is useful e.g. for split of target rate across executors
+        if self._parameters is not None:
+            self._parameters['executors'] = processes * threads * (self._coordinator.count if self._coordinator else 1)
+        if self._coordinator:
+            # distributed run, the same step on all workers
+            self._coordinator.execute(self._func.__name__, run_setup, self._parameters if self._parameters else {},
+                                      return_dict, processes, threads)
+        else:
+            super()._executeCore(run_setup, return_dict, processes, threads)
+
+    def _print_detail(self, file, run_setup: RunSetup, return_dict, processes, threads, group=''):
+        """
+        Print detail from executors
+
+        :param file:            Output stream for print
+        :param run_setup:       Setting for executors
+        :param return_dict:     Return values from executors
+        :param processes:       Number of processes
+        :param threads:         Number of threads
+        :param group:           Name of group
+        """
+        if self._coordinator:
+            # distributed run, the processes from all workers
+            processes = processes * self._coordinator.count
+
+        sum_time = 0
+        sum_deviation = 0
+        sum_call = 0
+        sum_call_per_sec = 0
+        count = 0
+        errors = 0
+        pipelined = False
+        operation_rows = False
+        total_call_per_sec = 0
+        histogram = LatencyHistogram()
+        operations = {}
+        hosts = {}
+        timeseries = []
+        profiles = []
+        metrics = []
+        probes = []
+
+        for return_key in return_dict:
+            parallel_ret = return_dict[return_key]
+            if parallel_ret:
+                # failed requests (e.g. timeouts), also from executors without successful request
+                errors += getattr(parallel_ret, "errors", 0)
+                for name, stats in getattr(parallel_ret, "operations", {}).items():
+                    operations.setdefault(name, CQLExecutor._operation())['errors'] += stats.errors
+
+                if parallel_ret.counter > 0:
+                    sum_time = sum_time + (parallel_ret.total_duration / parallel_ret.counter)
+                    sum_deviation += parallel_ret.standard_deviation
+                    sum_call += parallel_ret.counter
+                    count += 1
+                    probes.append(parallel_ret)
+
+                    # executor with more requests in flight (or open loop), the throughput
+                    # is based on real elapsed time
+                    if getattr(parallel_ret, "pipelined", False):
+                        pipelined = True
+                    elapsed = getattr(parallel_ret, "elapsed", 0)
+                    if elapsed > 0:
+                        sum_call_per_sec += parallel_ret.counter / elapsed
+
+                    # merge latency histograms from all executors
+                    histogram.merge(getattr(parallel_ret, "histogram", None))
+
+                    # merge statistics for operations (e.g. read and write in mixed workload),
+                    # the operations can have different amount of rows
+                    rows = getattr(parallel_ret, "operation_rows", {})
+                    if rows:
+                        operation_rows = True
+                    for name, stats in getattr(parallel_ret, "operations", {}).items():
+                        operation = operations.setdefault(name, CQLExecutor._operation())
+                        operation['histogram'].merge(stats.histogram)
+                        if elapsed > 0:
+                            operation['call_per_sec'] += stats.counter / elapsed * rows.get(name, run_setup.bulk_row)
+
+                    # merge statistics for coordinator hosts
+                    for address, stats in getattr(parallel_ret, "hosts", {}).items():
+                        host = hosts.setdefault(address, {'dc': parallel_ret.host_dc.get(address, ""),
+                                                          'histogram': LatencyHistogram(),
+                                                          'call_per_sec': 0})
+                        host['histogram'].merge(stats.histogram)
+                        if elapsed > 0:
+                            host['call_per_sec'] += stats.counter / elapsed * run_setup.bulk_row
+
+                    timeseries.append(getattr(parallel_ret, "timeseries", None))
+
+                # profile from executor (the sampled stacks from process are only in one of executors)
+                profiles.append(getattr(parallel_ret, "profile", None))
+                metrics.append(getattr(parallel_ret, "driver_metrics", None))
+            if self._detail_output:
+                self._print(file, f"     {str(parallel_ret) if parallel_ret else ParallelProbe.dump_error('SYSTEM overloaded')}")
+
+        if count > 0:
+            if operation_rows:
+                # rows of all operations (e.g. read and write with own bulk)
+                total_call_per_sec = sum([operation['call_per_sec'] for operation in operations.values()])
+            elif pipelined:
+                total_call_per_sec = sum_call_per_sec * run_setup.bulk_row
+            else:
+                total_call_per_sec = 0 if (sum_time / count) == 0 else (1 / (sum_time / count)) * count * run_setup.bulk_row
+        out = {
+            FileFormat.PRF_TYPE: FileFormat.PRF_CORE_TYPE,
+            FileFormat.PRF_CORE_PLAN_EXECUTOR_ALL: processes * threads,
+            FileFormat.PRF_CORE_PLAN_EXECUTOR: [processes, threads],
+            FileFormat.PRF_CORE_REAL_EXECUTOR: count,
+            FileFormat.PRF_CORE_GROUP: group,
+            FileFormat.PRF_CORE_TOTAL_CALL: sum_call,
+            FileFormat.PRF_CORE_TOTAL_CALL_PER_SEC: total_call_per_sec,
+            FileFormat.PRF_CORE_AVRG_TIME: 0 if count == 0 else sum_time / count,
+            FileFormat.PRF_CORE_STD_DEVIATION: 0 if count == 0 else sum_deviation / count,
+            FileFormat.PRF_CORE_TIME_END: datetime.datetime.utcnow().isoformat(' ')
+        }
+        self._print(file, f"  {json.dumps(out)}")
+
+        self._last_result = {
+            FileFormat.PRF_CORE_TOTAL_CALL_PER_SEC: total_call_per_sec,
+            CQLFileFormat.PRF_PCT_PERCENTILES: histogram.percentiles()
+        }
+
+        self._print_percentile(file, run_setup, histogram, processes, threads, count, group, errors = errors)
+        for name, operation in operations.items():
+            self._print_percentile(file, run_setup, operation['histogram'], processes, threads, count, group,
+                                   name, operation['call_per_sec'], operation['errors'])
+        self._print_metrics(file, CQLDriverMetrics.merge(metrics), processes, threads, count, group, total_call_per_sec,
+                            sum_call, errors)
+        self._print_hosts(run_setup, hosts, processes, threads, count, group)
+        timeseries = TimeSeries.merge(timeseries)
+        self._print_timeseries(run_setup, timeseries, processes, threads, count, group)
+        self._print_profile(run_setup, CQLProfiler.merge(profiles), processes, threads, group)
+
+        if self._results is not None:
+            self._results.add_step(run_setup, processes, threads, group, probes,
+                                   {'total_calls': sum_call,
+                                    'total_call_per_sec': total_call_per_sec,
+                                    'avrg': out[FileFormat.PRF_CORE_AVRG_TIME],
+                                    'std': out[FileFormat.PRF_CORE_STD_DEVIATION],
+                                    'errors': errors},
+                                   histogram,
+                                   timeseries)
+
+    def _print_metrics(self, file, metrics: dict, processes, threads, count, group='', call_per_sec=0, calls=0, failed=0):
+        """
+        Print failed requests (e.g. timeouts) and driver metrics (errors, timeouts and retries) from executors
+
+        :param file:            Output stream for print
+        :param metrics:         Merged driver metrics (see 'CQLDriverMetrics.merge'), default is without driver metrics
+        :param processes:       Number of processes
+        :param threads:         Number of threads
+        :param count:           Number of real executors
+        :param group:           Name of group
+        :param call_per_sec:    Total throughput of step
+        :param calls:           Number of successful requests
+        :param failed:          Number of failed requests
+        """
+        if calls + failed == 0 and not metrics:
+            return
+
+        out = {
+            FileFormat.PRF_TYPE: CQLFileFormat.PRF_MTR_TYPE,
+            CQLFileFormat.PRF_PCT_PLAN_EXECUTOR: [processes, threads],
+            CQLFileFormat.PRF_PCT_REAL_EXECUTOR: count,
+            CQLFileFormat.PRF_PCT_GROUP: group,
+            CQLFileFormat.PRF_PCT_TOTAL_CALL_PER_SEC: call_per_sec,
+            CQLFileFormat.PRF_MTR_FAILED: failed,
+            CQLFileFormat.PRF_MTR_FAILED_RATE: failed / (calls + failed) if calls + failed > 0 else 0
+        }
+        if metrics:
+            requests = metrics['requests']
+            errors = sum([metrics[name] for name in CQLDriverMetrics.ERRORS])
+            out[CQLFileFormat.PRF_MTR_REQUESTS] = requests
+            out[CQLFileFormat.PRF_MTR_ERRORS] = errors
+            out[CQLFileFormat.PRF_MTR_ERROR_RATE] = errors / requests if requests > 0 else 0
+            out[CQLFileFormat.PRF_MTR_RETRY_RATE] = metrics['retries'] / requests if requests > 0 else 0
+            out[CQLFileFormat.PRF_MTR_COUNTERS] = metrics
+        self._print(file, f"  {json.dumps(out)}")
+
+    def _print_hosts(self, run_setup: RunSetup, hosts: dict, processes, threads, count, group=''):
+        """
+        Print throughput and percentiles for each coordinator host and data center
+        to the separate output file 'hst_*.txt'
+
+        :param run_setup:       Setting for executors
+        :param hosts:           Merged statistics for hosts in format {address: {'dc', 'histogram', 'call_per_sec'}}
+        :param processes:       Number of processes
+        :param threads:         Number of threads
+        :param count:           Number of real executors
+        :param group:           Name of group
+        """
+        if not hosts or self._output_file is None:
+            return
+
+        # merge hosts to the data centers
+        data_centers = {}
+        for host in hosts.values():
+            data_center = data_centers.setdefault(host['dc'], {'histogram': LatencyHistogram(), 'call_per_sec': 0})
+            data_center['histogram'].merge(host['histogram'])
+            data_center['call_per_sec'] += host['call_per_sec']
+
+        file = self._open_related_file(run_setup, CQLFileFormat.HST_FILE_PREFIX)
+        items = [(CQLFileFormat.HST_DC_TYPE, "", name, data_center) for name, data_center in sorted(data_centers.items())]
+        items += [(CQLFileFormat.HST_TYPE, address, host['dc'], host) for address, host in sorted(hosts.items())]
+        for record_type, address, data_center, stats in items:
+            out = {
+                FileFormat.PRF_TYPE: record_type,
+                CQLFileFormat.PRF_PCT_PLAN_EXECUTOR: [processes, threads],
+                CQLFileFormat.PRF_PCT_REAL_EXECUTOR: count,
+                CQLFileFormat.PRF_PCT_GROUP: group,
+                CQLFileFormat.HST_HOST: address,
+                CQLFileFormat.HST_DC: data_center,
+                CQLFileFormat.PRF_PCT_COUNT: stats['histogram'].total,
+                CQLFileFormat.PRF_PCT_TOTAL_CALL_PER_SEC: stats['call_per_sec'],
+                CQLFileFormat.PRF_PCT_PERCENTILES: stats['histogram'].percentiles(),
+                CQLFileFormat.PRF_PCT_HISTOGRAM: stats['histogram'].to_dict()
+            }
+            file.write(f"  {json.dumps(out)}\n")
+        file.flush()
+
+    def _print_timeseries(self, run_setup: RunSetup, merged: dict, processes, threads, count, group=''):
+        """
+        Print throughput and latency in intervals to the separate output file 'tms_*.txt'
+
+        :param run_setup:       Setting for executors
+        :param merged:          Merged time series from executors (see 'TimeSeries.merge')
+        :param processes:       Number of processes
+        :param threads:         Number of threads
+        :param count:           Number of real executors
+        :param group:           Name of group
+        """
+        if merged is None or self._output_file is None:
+            return
+
+        p50, p99 = TimeSeries.percentiles(merged, 50), TimeSeries.percentiles(merged, 99)
+        out = {
+            FileFormat.PRF_TYPE: CQLFileFormat.TMS_TYPE,
+            CQLFileFormat.PRF_PCT_PLAN_EXECUTOR: [processes, threads],
+            CQLFileFormat.PRF_PCT_REAL_EXECUTOR: count,
+            CQLFileFormat.PRF_PCT_GROUP: group,
+            CQLFileFormat.TMS_INTERVAL: merged['interval'],
+            CQLFileFormat.TMS_START: datetime.datetime.utcfromtimestamp(merged['start']).isoformat(' '),
+            CQLFileFormat.TMS_CALLS: merged['calls'].tolist(),
+            CQLFileFormat.TMS_CALL_PER_SEC: (merged['calls'] / merged['interval'] * run_setup.bulk_row).tolist(),
+            CQLFileFormat.TMS_AVRG: merged['avrg'].tolist(),
+            CQLFileFormat.TMS_ERRORS: merged['errors'].tolist(),
+            CQLFileFormat.TMS_P50: p50,
+            CQLFileFormat.TMS_P99: p99
+        }
+        file = self._open_related_file(run_setup, CQLFileFormat.TMS_FILE_PREFIX)
+        file.write(f"  {json.dumps(out)}\n")
+        file.flush()
+
+    def _print_profile(self, run_setup: RunSetup, stacks: dict, processes, threads, group=''):
+        """
+        Print merged profile of executors (collapsed stacks, flamegraph ready) to the separate
+        output file 'pfl_*-bulk-RxC-plan-PxT.txt' for each step, the profile from 'cProfile' (pairs
+        'caller;function' in microseconds) is in output file 'pfc_*' with header
+
+        :param run_setup:       Setting for executors
+        :param stacks:          Merged collapsed stacks from executors (see 'CQLProfiler.merge')
+        :param processes:       Number of processes
+        :param threads:         Number of threads
+        :param group:           Name of group
+        """
+        if not stacks or self._output_file is None:
+            return
+
+        mode = ProfileMode[run_setup.param('profile', 'off')]
+        prefix = CQLFileFormat.PFC_FILE_PREFIX if mode == ProfileMode.on else CQLFileFormat.PFL_FILE_PREFIX
+        output_file, ext = os.path.splitext(CQLFileFormat.related_file(self._output_file, prefix))
+        start = getattr(self, "_start_tasks", datetime.datetime.utcnow())
+        group = f"-{group}" if group else ""
+        CQLProfiler.save(f"{output_file}-{start.strftime('%H%M%S')}-bulk-{run_setup.bulk_row}x{run_setup.bulk_col}"
+                         f"-plan-{processes}x{threads}{group.replace(' ', '_')}{ext}", stacks, CQLProfiler.header(mode))
+
+    @staticmethod
+    def _operation() -> dict:
+        """Empty merged statistics for operation"""
+        return {'histogram': LatencyHistogram(), 'call_per_sec': 0, 'errors': 0}
+
+    def _open_related_file(self, run_setup: RunSetup, prefix):
+        """Open related output file e.g. 'hst_*.txt' with header (the same header as in performance output file)"""
+        file = self._related_files.get(prefix, None)
+        if file is None:
+            file = self._related_files[prefix] = open(CQLFileFormat.related_file(self._output_file, prefix), "a")
+            # the same start time as in header of performance output file
+            now = getattr(self, "_start_tasks", datetime.datetime.utcnow()).isoformat(' ')
+            out = {
+                FileFormat.PRF_TYPE: FileFormat.PRF_HDR_TYPE,
+                FileFormat.PRF_HDR_LABEL: self._label if self._label is not None else "Noname",
+                FileFormat.PRF_HDR_BULK: [run_setup.bulk_row, run_setup.bulk_col],
+                FileFormat.PRF_HDR_DURATION: run_setup.duration_second,
+                FileFormat.PRF_HDR_NOW: now
+            }
+            file.write(f"############### {now} ###############\n")
+            file.write(json.dumps(out) + "\n")
+        return file
+
+    def _close_related_files(self):
+        for file in self._related_files.values():
+            file.write("###############\n")
+            file.close()
+        self._related_files = {}
+
+    def _print_percentile(self, file, run_setup: RunSetup, histogram: LatencyHistogram, processes, threads, count,
+                          group='', operation=None, call_per_sec=None, errors=0):
+        """
+        Print percentiles from merged histogram (with failed requests)
+
+        :param file:            Output stream for print
+        :param run_setup:       Setting for executors
+        :param histogram:       Merged histogram from executors
+        :param processes:       Number of processes
+        :param threads:         Number of threads
+        :param count:           Number of real executors
+        :param group:           Name of group
+        :param operation:       Name of operation (e.g. 'read', 'write'), default is for all operations
+        :param call_per_sec:    Throughput of operation
+        :param errors:          Number of failed requests (e.g. timeouts)
+        """
+        if histogram.total == 0 and errors == 0:
+            return
+
+        out = {
+            FileFormat.PRF_TYPE: CQLFileFormat.PRF_PCT_TYPE,
+            CQLFileFormat.PRF_PCT_PLAN_EXECUTOR: [processes, threads],
+            CQLFileFormat.PRF_PCT_REAL_EXECUTOR: count,
+            CQLFileFormat.PRF_PCT_GROUP: group,
+            CQLFileFormat.PRF_PCT_COUNT: histogram.total,
+            CQLFileFormat.PRF_PCT_ERRORS: errors,
+            CQLFileFormat.PRF_PCT_ERROR_RATE: errors / (histogram.total + errors),
+            CQLFileFormat.PRF_PCT_PERCENTILES: histogram.percentiles(),
+            CQLFileFormat.PRF_PCT_HISTOGRAM: histogram.to_dict()
+        }
+        if operation:
+            out[CQLFileFormat.PRF_PCT_OPERATION] = operation
+            out[CQLFileFormat.PRF_PCT_TOTAL_CALL_PER_SEC] = call_per_sec
+        if run_setup.param('target_rate', 0) > 0:
+            out[CQLFileFormat.PRF_PCT_TARGET_RATE] = run_setup['target_rate']
+        self._print(file, f"  {json.dumps(out)}")
+
+    @staticmethod
+    def create_graph_static(input_file, output_graph_dir="output", scope: GraphScope = GraphScope.all, picture_dpi=100, suppress_error = False) -> list[str]:
+        """
+        Generate graph(s) based on output from performance tests, the standard graphs
+        are extended about graph of percentiles, driver errors, coordinators and time series (as part of performance scope)
+
+        :param input_file:          source file with detail of outputs from performance tests
+        :param output_graph_dir:    directory for graph outputs (with subdirectory 'graph-perf' and 'graph-exec')
+        :param scope:               definition of scope generation (default ExecutorGraph.all)
+        :param picture_dpi:         quality of picture (default is 100 DPI)
+        :param suppress_error:      suppress error (default is False)
+        :return:                    list of generated files
+        """
+        output_file = ParallelExecutor.create_graph_static(input_file, output_graph_dir, scope, picture_dpi, suppress_error)
+
+        if GraphScope.perf in scope:
+            from cql_graph import GraphPercentile, GraphHost, GraphTimeSeries, GraphMetrics
+
+            graph = GraphPercentile(picture_dpi)
+            for file in graph.generate_from_file(input_file, os.path.join(output_graph_dir, "graph-perf"), suppress_error):
+                output_file.append(file)
+
+            # throughput with error rates from driver metrics
+            graph = GraphMetrics(picture_dpi)
+            for file in graph.generate_from_file(input_file, os.path.join(output_graph_dir, "graph-perf"), suppress_error):
+                output_file.append(file)
+
+            # coordinator hosts and data centers (from related output file)
+            host_file = CQLFileFormat.related_file(input_file, CQLFileFormat.HST_FILE_PREFIX)
+            if os.path.exists(host_file):
+                graph = GraphHost(picture_dpi)
+                for file in graph.generate_from_file(host_file, os.path.join(output_graph_dir, "graph-perf"), suppress_error):
+                    output_file.append(file)
+
+            # throughput and latency in time (from related output file)
+            timeseries_file = CQLFileFormat.related_file(input_file, CQLFileFormat.TMS_FILE_PREFIX)
+            if os.path.exists(timeseries_file):
+                graph = GraphTimeSeries(picture_dpi)
+                for file in graph.generate_from_file(timeseries_file, os.path.join(output_graph_dir, "graph-perf"), suppress_error):
+                    output_file.append(file)
+
+        return output_file
+
+    def create_graph_perf(self, output_graph_dir="output", picture_dpi=100, suppress_error = False) -> list[str]:
+        """
+        Generate performance graph(s) based on output from performance tests.
+        The outputs will be in subdirectory 'graph-perf'.
+
+        :param output_graph_dir:    directory for graph outputs (with subdirectory 'graph-perf')
+        :param picture_dpi:         quality of picture (default is 100 DPI)
+        :param suppress_error:      suppress error (default is False)
+        :return:                    list of generated files
+        """
+        return CQLExecutor.create_graph_static(self._output_file,
+                                               os.path.join(output_graph_dir, "graph-perf"),
+                                               GraphScope.perf,
+                                               picture_dpi,
+                                               suppress_error)
@@ -0,0 +1,93 @@
+import os.path
+
+
+class CQLFileFormat:
+    """Extension of output format (see 'qgate_perf.file_format'), the records are
+    stored in the same output file and they are ignored by standard graphs"""
+
+    # prefix of related output files (beside the performance output file 'prf_*.txt')
+    PRF_FILE_PREFIX = "prf_"
+    HLT_FILE_PREFIX = "hlt_"
+    HST_FILE_PREFIX = "hst_"
+    RES_FILE_PREFIX = "res_"
+    TMS_FILE_PREFIX = "tms_"
+    PFL_FILE_PREFIX = "pfl_"
+    PFC_FILE_PREFIX = "pfc_"    # profile from 'cProfile' (pairs 'caller;function' in microseconds)
+
+    # percentiles (merged latency histogram from all executors)
+    PRF_PCT_TYPE = "percentile"
+    PRF_PCT_PLAN_EXECUTOR = "plan_executors_detail"
+    PRF_PCT_REAL_EXECUTOR = "real_executors"
+    PRF_PCT_GROUP = "group"
+    PRF_PCT_COUNT = "count"
+    PRF_PCT_ERRORS = "errors"
+    PRF_PCT_ERROR_RATE = "error_rate"
+    PRF_PCT_PERCENTILES = "percentiles"
+    PRF_PCT_HISTOGRAM = "histogram"
+    PRF_PCT_TARGET_RATE = "target_rate"
+    PRF_PCT_OPERATION = "operation"
+    PRF_PCT_TOTAL_CALL_PER_SEC = "total_call_per_sec"
+
+    # failed requests (e.g. timeouts) and driver metrics (errors and retries from driver,
+    # the counters are for each attempt)
+    PRF_MTR_TYPE = "metrics"
+    PRF_MTR_FAILED = "failed"
+    PRF_MTR_FAILED_RATE = "failed_rate"
+    PRF_MTR_REQUESTS = "requests"
+    PRF_MTR_ERRORS = "errors"
+    PRF_MTR_ERROR_RATE = "error_rate"
+    PRF_MTR_RETRY_RATE = "retry_rate"
+    PRF_MTR_COUNTERS = "counters"
+
+    # size of keyspace (before and after the run, based on 'system.size_estimates')
+    PRF_SIZE_TYPE = "size"
+    PRF_SIZE_PHASE = "phase"
+    PRF_SIZE_KEYSPACE = "keyspace"
+    PRF_SIZE_TABLES = "tables"
+    PRF_SIZE_PARTITIONS = "partitions"
+    PRF_SIZE_MEAN_PARTITION = "mean_partition_size"
+    PRF_SIZE_MB = "size_mb"
+    PRF_SIZE_NOW = "now"
+
+    # coordinator hosts and data centers (separate output file 'hst_*.txt')
+    HST_TYPE = "host"
+    HST_DC_TYPE = "datacenter"
+    HST_HOST = "host"
+    HST_DC = "dc"
+
+    # time series of throughput and latency in intervals (separate output file 'tms_*.txt')
+    TMS_TYPE = "timeseries"
+    TMS_INTERVAL = "interval"
+    TMS_START = "start"
+    TMS_CALLS = "calls"
+    TMS_CALL_PER_SEC = "call_per_sec"
+    TMS_AVRG = "avrg"
+    TMS_ERRORS = "errors"
+    TMS_P50 = "p50"
+    TMS_P99 = "p99"
+
+    # health monitor (separate output file 'hlt_*.txt', see 'CQLHealthMonitor')
+    HLT_TYPE = "type"
+    HLT_NOW = "now"
+    HLT_HDR_TYPE = "headr"
+    HLT_HDR_LABEL = "label"
+    HLT_HDR_INTERVAL = "interval"
+    HLT_SAMPLE_TYPE = "health"
+    HLT_SAMPLE_NODES = "nodes"
+    HLT_SAMPLE_DOWN = "down"
+    HLT_SAMPLE_GOSSIP_DOWN = "gossip_down"
+    HLT_SAMPLE_SCHEMAS = "schema_versions"
+    HLT_SAMPLE_SCHEMA_AGREEMENT = "schema_agreement"
+    HLT_SAMPLE_ERROR = "error"
+    HLT_EVENT_TYPE = "event"
+    HLT_EVENT = "event"
+    HLT_EVENT_HOST = "host"
+    HLT_EVENT_LOCATION = "location"
+
+    @staticmethod
+    def related_file(output_file, prefix):
+        """Return name of related output file e.g. 'hst_*.txt' for 'prf_*.txt'"""
+        output_dir, output_name = os.path.split(output_file)
+        if output_name.startswith(CQLFileFormat.PRF_FILE_PREFIX):
+            output_name = output_name[len(CQLFileFormat.PRF_FILE_PREFIX):]
+        return os.path.join(output_dir, prefix + output_name)
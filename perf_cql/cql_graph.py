@@ -0,0 +1,486 @@
+from matplotlib import pyplot as plt
+from qgate_graph.graph_base import GraphBase
+from qgate_perf.file_format import FileFormat
+from cql_file_format import CQLFileFormat
+import os.path, os
+import datetime
+import logging
+import json
+import time
+
+
+class GraphIndex:
+    """Index of generated graphs for incremental generation, the graphs for source
+    file are current, when all graphs exist and they are newer than the source file
+    (and its related files e.g. 'hst_*.txt')"""
+
+    INDEX_FILE = ".graph-index.json"
+
+    def __init__(self, output_dir):
+        self._index_file = os.path.join(output_dir, GraphIndex.INDEX_FILE)
+        self._index = {}
+        if os.path.exists(self._index_file):
+            try:
+                with open(self._index_file, "r") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+
+    def is_current(self, source_file, scope, related_files = None) -> bool:
+        """Return True, if the graphs for source file are newer than source file"""
+        item = self._index.get(self._key(source_file, scope), None)
+        if item is None:
+            return False
+
+        generated = item['time']
+        for output in item['outputs']:
+            if not os.path.exists(output):
+                return False
+            generated = min(generated, os.path.getmtime(output))
+
+        for file in [source_file] + (related_files if related_files else []):
+            if os.path.exists(file) and os.path.getmtime(file) >= generated:
+                return False
+        return True
+
+    def update(self, source_file, scope, outputs: list):
+        self._index[self._key(source_file, scope)] = {'time': time.time(), 'outputs': outputs}
+
+    def save(self):
+        with open(self._index_file, "w") as f:
+            json.dump(self._index, f, indent = 1)
+
+    def _key(self, source_file, scope):
+        return f"{scope}:{os.path.abspath(source_file)}"
+
+class GraphCQLBase(GraphBase):
+    """Shared part of graphs for extended output records (see 'CQLFileFormat')"""
+
+    def __init__(self, dpi=100):
+        super().__init__(dpi)
+
+    def _load_json(self, line, types):
+        """Return record from line, only for relevant types of records (the decoding
+        of other records e.g. with histograms is skipped)"""
+        for record_type in types:
+            if f'"{FileFormat.PRF_TYPE}": "{record_type}"' in line:
+                return GraphBase.load_json(line)
+        return None
+
+    def _header(self, input_dict, prefix, output_dir):
+        """Return file name, title and output directory based on header record
+
+        :param input_dict:  header record
+        :param prefix:      prefix of graph file name e.g. 'PCT'
+        :param output_dir:  output directory
+        :return:            (file_name, title, output_dir_target)
+        """
+        start_date = input_dict[FileFormat.PRF_HDR_NOW]
+        report_date = datetime.datetime.fromisoformat(start_date).strftime("%Y-%m-%d %H-%M-%S")
+        label = input_dict[FileFormat.PRF_HDR_LABEL]
+        bulk = input_dict[FileFormat.PRF_HDR_BULK]
+        duration = input_dict.get(FileFormat.PRF_HDR_DURATION, -1)
+        output_dir_target = output_dir
+        if duration >= 0:
+            # the same subdirectory as for performance graph (e.g. 5 sec/2024-09-04)
+            output_dir_target = os.path.join(output_dir,
+                                             self._readable_duration(duration),
+                                             datetime.datetime.fromisoformat(start_date).strftime("%Y-%m-%d"))
+        if not os.path.exists(output_dir_target):
+            os.makedirs(output_dir_target, mode=0o777)
+        file_name = self._unique_file_name(prefix, label, report_date, bulk)
+        title = f"'{label}', {report_date}, bulk {bulk[0]}/{bulk[1]}, duration '{self._readable_duration(duration)}'"
+        return file_name, title, output_dir_target
+
+class GraphPercentile(GraphCQLBase):
+    """
+    Generate graph of latency percentiles (p50, p95, p99, p99.9) based on output
+    from performance tests (records with type 'percentile')
+    """
+
+    def __init__(self, dpi=100):
+        super().__init__(dpi)
+
+    def _show_graph(self, executors, percentiles, title, file_name, output_dir) -> str:
+        plt.style.use("bmh")
+        key_count = len(executors.keys())
+        fig, ax = plt.subplots(1, key_count, sharey=True, squeeze=False, figsize=(15, 6))
+
+        plt.suptitle("Latency percentiles", weight='bold', fontsize=18, ha="center", va="top")
+        fig.text(0.5, 0.92, title, fontsize=14, ha="center", va="top")
+        fig.subplots_adjust(top=0.82)
+
+        for index, key in enumerate(executors.keys()):
+            ax_key = ax[0][index]
+            self._watermark(plt, ax_key)
+            self._reset_marker()
+            self._reset_color()
+
+            for name in percentiles[key].keys():
+                ax_key.plot(executors[key], percentiles[key][name], color=self._next_color(), linestyle="-",
+                            marker=self._next_marker(), label=f"{name} [{round(max(percentiles[key][name]), 4)}]")
+            ax_key.set_title(key, fontsize=12)
+            ax_key.set_xlabel('Executors')
+            ax_key.set_xticks(list(dict.fromkeys(executors[key])))
+            ax_key.set_yscale('log')
+            ax_key.legend()
+            if index == 0:
+                ax_key.set_ylabel('Response [sec]')
+
+        output_file = os.path.join(output_dir, file_name + ".png")
+        plt.savefig(output_file, dpi=self.dpi)
+        logging.info(f"  ... {output_file}")
+        plt.close()
+        return output_file
+
+    def generate_from_file(self, input_file: str, output_dir: str = "output", suppress_error = False) -> list[str]:
+        """
+        Generate graphs based on input file
+
+        :param input_file:      Input file
+        :param output_dir:      Output directory (default "output")
+        :param suppress_error:  Ability to suppress error (default is False)
+        :return:                List of generated files
+        """
+        file_name = None
+        title = None
+        executors = {}
+        percentiles = {}
+        output_list = []
+        output_dir_target = output_dir
+
+        logging.info(f"Processing '{input_file}' ...")
+
+        with open(input_file, "r") as f:
+            for line in f:
+                if line[0] == '#':
+                    if file_name and len(executors) > 0:
+                        try:
+                            output_list.append(self._show_graph(executors, percentiles, title, file_name, output_dir_target))
+                        except Exception as ex:
+                            if not suppress_error:
+                                raise
+                            logging.info(f"  ... Error in '{file_name}', '{type(ex)}'")
+                    file_name = None
+                    executors = {}
+                    percentiles = {}
+                    continue
+                input_dict = self._load_json(line, [FileFormat.PRF_HDR_TYPE, CQLFileFormat.PRF_PCT_TYPE])
+                if not input_dict:
+                    continue
+                if input_dict[FileFormat.PRF_TYPE] == FileFormat.PRF_HDR_TYPE:
+                    # header
+                    file_name, title, output_dir_target = self._header(input_dict, "PCT", output_dir)
+
+                elif input_dict[FileFormat.PRF_TYPE] == CQLFileFormat.PRF_PCT_TYPE:
+                    # percentiles
+                    group = input_dict[CQLFileFormat.PRF_PCT_GROUP]
+                    if input_dict.get(CQLFileFormat.PRF_PCT_OPERATION, None):
+                        # separate view for operation (e.g. read and write in mixed workload)
+                        group = f"{group} ({input_dict[CQLFileFormat.PRF_PCT_OPERATION]})"
+                    if group not in executors:
+                        executors[group] = []
+                        percentiles[group] = {}
+                    executors[group].append(input_dict[CQLFileFormat.PRF_PCT_REAL_EXECUTOR])
+                    for name, value in input_dict[CQLFileFormat.PRF_PCT_PERCENTILES].items():
+                        if name == "max":
+                            continue
+                        percentiles[group].setdefault(name, []).append(value)
+        return output_list
+
+class GraphHost(GraphCQLBase):
+    """
+    Generate graph of throughput and p99 latency for each data center and coordinator
+    host based on output from performance tests (records with type 'datacenter' and 'host')
+    """
+
+    def __init__(self, dpi=100):
+        super().__init__(dpi)
+
+    def _show_graph(self, executors, throughputs, latencies, title, file_name, output_dir) -> str:
+        plt.style.use("bmh")
+        fig, ax = plt.subplots(1, 2, squeeze=False, figsize=(15, 6))
+
+        plt.suptitle("Coordinators", weight='bold', fontsize=18, ha="center", va="top")
+        fig.text(0.5, 0.92, title, fontsize=14, ha="center", va="top")
+        fig.subplots_adjust(top=0.82)
+
+        for index, (values, name, ylabel) in enumerate([(throughputs, "Throughput", "Calls/sec"),
+                                                        (latencies, "Latency p99", "Response [sec]")]):
+            ax_key = ax[0][index]
+            self._watermark(plt, ax_key)
+            self._reset_marker()
+            self._reset_color()
+
+            for key in executors.keys():
+                # data centers are with solid line, hosts are with dashed line
+                ax_key.plot(executors[key], values[key], color=self._next_color(),
+                            linestyle="-" if key.startswith("DC ") else "--",
+                            marker=self._next_marker(), label=f"{key} [{round(max(values[key]), 4)}]")
+            ax_key.set_title(name, fontsize=12)
+            ax_key.set_xlabel('Executors')
+            ax_key.set_ylabel(ylabel)
+            ax_key.set_xticks(sorted(set([value for key in executors.keys() for value in executors[key]])))
+            if index == 1:
+                ax_key.set_yscale('log')
+            ax_key.legend(fontsize=8)
+
+        output_file = os.path.join(output_dir, file_name + ".png")
+        plt.savefig(output_file, dpi=self.dpi)
+        logging.info(f"  ... {output_file}")
+        plt.close()
+        return output_file
+
+    def generate_from_file(self, input_file: str, output_dir: str = "output", suppress_error = False) -> list[str]:
+        """
+        Generate graphs based on input file
+
+        :param input_file:      Input file
+        :param output_dir:      Output directory (default "output")
+        :param suppress_error:  Ability to suppress error (default is False)
+        :return:                List of generated files
+        """
+        file_name = None
+        title = None
+        executors = {}
+        throughputs = {}
+        latencies = {}
+        output_list = []
+        output_dir_target = output_dir
+
+        logging.info(f"Processing '{input_file}' ...")
+
+        with open(input_file, "r") as f:
+            for line in f:
+                if line[0] == '#':
+                    if file_name and len(executors) > 0:
+                        try:
+                            output_list.append(self._show_graph(executors, throughputs, latencies, title, file_name, output_dir_target))
+                        except Exception as ex:
+                            if not suppress_error:
+                                raise
+                            logging.info(f"  ... Error in '{file_name}', '{type(ex)}'")
+                    file_name = None
+                    executors = {}
+                    throughputs = {}
+                    latencies = {}
+                    continue
+                input_dict = self._load_json(line, [FileFormat.PRF_HDR_TYPE, CQLFileFormat.HST_DC_TYPE, CQLFileFormat.HST_TYPE])
+                if not input_dict:
+                    continue
+                if input_dict[FileFormat.PRF_TYPE] == FileFormat.PRF_HDR_TYPE:
+                    # header
+                    file_name, title, output_dir_target = self._header(input_dict, "HST", output_dir)
+
+                elif input_dict[FileFormat.PRF_TYPE] in (CQLFileFormat.HST_DC_TYPE, CQLFileFormat.HST_TYPE):
+                    # data center or host
+                    if input_dict[FileFormat.PRF_TYPE] == CQLFileFormat.HST_DC_TYPE:
+                        key = f"DC {input_dict[CQLFileFormat.HST_DC]}"
+                    else:
+                        key = f"{input_dict[CQLFileFormat.HST_HOST]} ({input_dict[CQLFileFormat.HST_DC]})"
+                    group = input_dict[CQLFileFormat.PRF_PCT_GROUP]
+                    if group:
+                        key = f"{key} {group}"
+                    executors.setdefault(key, []).append(input_dict[CQLFileFormat.PRF_PCT_REAL_EXECUTOR])
+                    throughputs.setdefault(key, []).append(input_dict[CQLFileFormat.PRF_PCT_TOTAL_CALL_PER_SEC])
+                    latencies.setdefault(key, []).append(input_dict[CQLFileFormat.PRF_PCT_PERCENTILES]["p99"])
+        return output_list
+
+class GraphTimeSeries(GraphCQLBase):
+    """
+    Generate graph of throughput and p99 latency in time (in fixed intervals) based on
+    output from performance tests (records with type 'timeseries')
+    """
+
+    def __init__(self, dpi=100):
+        super().__init__(dpi)
+
+    def _show_graph(self, steps, title, file_name, output_dir) -> str:
+        plt.style.use("bmh")
+        fig, ax = plt.subplots(2, 1, sharex=True, squeeze=False, figsize=(15, 8))
+
+        plt.suptitle("Time series", weight='bold', fontsize=18, ha="center", va="top")
+        fig.text(0.5, 0.95, title, fontsize=14, ha="center", va="top")
+        fig.subplots_adjust(top=0.88)
+
+        for index, (name, ylabel) in enumerate([(CQLFileFormat.TMS_CALL_PER_SEC, "Calls/sec"),
+                                                (CQLFileFormat.TMS_P99, "Response p99 [sec]")]):
+            ax_key = ax[index][0]
+            self._watermark(plt, ax_key)
+            self._reset_color()
+
+            for key, times, values in steps:
+                ax_key.plot(times, values[name], color=self._next_color(), linestyle="-",
+                            label=f"{key} [{round(max(values[name]), 4)}]")
+            ax_key.set_ylabel(ylabel)
+            if index == 1:
+                ax_key.set_yscale('log')
+                ax_key.set_xlabel('Time [sec]')
+            ax_key.legend(fontsize=8)
+
+        output_file = os.path.join(output_dir, file_name + ".png")
+        plt.savefig(output_file, dpi=self.dpi)
+        logging.info(f"  ... {output_file}")
+        plt.close()
+        return output_file
+
+    def generate_from_file(self, input_file: str, output_dir: str = "output", suppress_error = False) -> list[str]:
+        """
+        Generate graphs based on input file
+
+        :param input_file:      Input file
+        :param output_dir:      Output directory (default "output")
+        :param suppress_error:  Ability to suppress error (default is False)
+        :return:                List of generated files
+        """
+        file_name = None
+        title = None
+        start = None
+        steps = []
+        output_list = []
+        output_dir_target = output_dir
+
+        logging.info(f"Processing '{input_file}' ...")
+
+        with open(input_file, "r") as f:
+            for line in f:
+                if line[0] == '#':
+                    if file_name and len(steps) > 0:
+                        try:
+                            output_list.append(self._show_graph(steps, title, file_name, output_dir_target))
+                        except Exception as ex:
+                            if not suppress_error:
+                                raise
+                            logging.info(f"  ... Error in '{file_name}', '{type(ex)}'")
+                    file_name = None
+                    steps = []
+                    continue
+                input_dict = self._load_json(line, [FileFormat.PRF_HDR_TYPE, CQLFileFormat.TMS_TYPE])
+                if not input_dict:
+                    continue
+                if input_dict[FileFormat.PRF_TYPE] == FileFormat.PRF_HDR_TYPE:
+                    # header
+                    file_name, title, output_dir_target = self._header(input_dict, "TMS", output_dir)
+                    start = datetime.datetime.fromisoformat(input_dict[FileFormat.PRF_HDR_NOW])
+
+                elif input_dict[FileFormat.PRF_TYPE] == CQLFileFormat.TMS_TYPE:
+                    # intervals of one step, the time is relative to the start of run
+                    interval = input_dict[CQLFileFormat.TMS_INTERVAL]
+                    offset = (datetime.datetime.fromisoformat(input_dict[CQLFileFormat.TMS_START]) - start).total_seconds()
+                    values = {name: input_dict[name] for name in [CQLFileFormat.TMS_CALL_PER_SEC, CQLFileFormat.TMS_P99]}
+                    times = [offset + (index + 0.5) * interval for index in range(len(values[CQLFileFormat.TMS_P99]))]
+                    plan = input_dict[CQLFileFormat.PRF_PCT_PLAN_EXECUTOR]
+                    key = f"{plan[0]}x{plan[1]} {input_dict[CQLFileFormat.PRF_PCT_GROUP]}".strip()
+                    steps.append((key, times, values))
+        return output_list
+
+class GraphMetrics(GraphCQLBase):
+    """
+    Generate graph of throughput with rate of failed requests (e.g. timeouts) and with error
+    and retry rates from driver metrics based on output from performance tests (records with type 'metrics')
+    """
+
+    # rates in graph (the driver rates are only with driver metrics)
+    RATES = [("Failed", CQLFileFormat.PRF_MTR_FAILED_RATE),
+             ("Errors", CQLFileFormat.PRF_MTR_ERROR_RATE),
+             ("Retries", CQLFileFormat.PRF_MTR_RETRY_RATE)]
+
+    def __init__(self, dpi=100):
+        super().__init__(dpi)
+
+    def _show_graph(self, executors, throughputs, rates, title, file_name, output_dir) -> str:
+        plt.style.use("bmh")
+        key_count = len(executors.keys())
+        fig, ax = plt.subplots(1, key_count, squeeze=False, figsize=(15, 6))
+
+        plt.suptitle("Errors", weight='bold', fontsize=18, ha="center", va="top")
+        fig.text(0.5, 0.92, title, fontsize=14, ha="center", va="top")
+        fig.subplots_adjust(top=0.82)
+
+        for index, key in enumerate(executors.keys()):
+            ax_key = ax[0][index]
+            self._watermark(plt, ax_key)
+            self._reset_marker()
+            self._reset_color()
+
+            # throughput (left axis) and rates in percent (right axis)
+            ax_key.plot(executors[key], throughputs[key], color=self._next_color(), linestyle="-",
+                        marker=self._next_marker(), label=f"Throughput [{round(max(throughputs[key]), 1)}]")
+            ax_rate = ax_key.twinx()
+            lines = []
+            top = 0
+            for name, values in rates[key].items():
+                percents = [value * 100 for value in values]
+                top = max([top] + percents)
+                lines += ax_rate.plot(executors[key], percents, color=self._next_color(), linestyle="--",
+                                      marker=self._next_marker(), label=f"{name} [{round(max(percents), 2)}%]")
+            ax_rate.set_ylim(bottom=0, top=max(1, top * 1.1))
+            ax_rate.grid(False)
+
+            ax_key.set_title(key, fontsize=12)
+            ax_key.set_xlabel('Executors')
+            ax_key.set_xticks(list(dict.fromkeys(executors[key])))
+            ax_key.legend(ax_key.get_lines() + lines, [line.get_label() for line in ax_key.get_lines() + lines], fontsize=8)
+            if index == 0:
+                ax_key.set_ylabel('Calls/sec')
+            if index == key_count - 1:
+                ax_rate.set_ylabel('Rate [%]')
+
+        output_file = os.path.join(output_dir, file_name + ".png")
+        plt.savefig(output_file, dpi=self.dpi)
+        logging.info(f"  ... {output_file}")
+        plt.close()
+        return output_file
+
+    def generate_from_file(self, input_file: str, output_dir: str = "output", suppress_error = False) -> list[str]:
+        """
+        Generate graphs based on input file
+
+        :param input_file:      Input file
+        :param output_dir:      Output directory (default "output")
+        :param suppress_error:  Ability to suppress error (default is False)
+        :return:                List of generated files
+        """
+        file_name = None
+        title = None
+        executors = {}
+        throughputs = {}
+        rates = {}
+        output_list = []
+        output_dir_target = output_dir
+
+        logging.info(f"Processing '{input_file}' ...")
+
+        with open(input_file, "r") as f:
+            for line in f:
+                if line[0] == '#':
+                    if file_name and len(executors) > 0:
+                        try:
+                            output_list.append(self._show_graph(executors, throughputs, rates, title, file_name, output_dir_target))
+                        except Exception as ex:
+                            if not suppress_error:
+                                raise
+                            logging.info(f"  ... Error in '{file_name}', '{type(ex)}'")
+                    file_name = None
+                    executors = {}
+                    throughputs = {}
+                    rates = {}
+                    continue
+                input_dict = self._load_json(line, [FileFormat.PRF_HDR_TYPE, CQLFileFormat.PRF_MTR_TYPE])
+                if not input_dict:
+                    continue
+                if input_dict[FileFormat.PRF_TYPE] == FileFormat.PRF_HDR_TYPE:
+                    # header
+                    file_name, title, output_dir_target = self._header(input_dict, "MTR", output_dir)
+
+                elif input_dict[FileFormat.PRF_TYPE] == CQLFileFormat.PRF_MTR_TYPE:
+                    # failed requests and driver metrics (the missing rates in step are zero)
+                    group = input_dict[CQLFileFormat.PRF_PCT_GROUP]
+                    executors.setdefault(group, []).append(input_dict[CQLFileFormat.PRF_PCT_REAL_EXECUTOR])
+                    throughputs.setdefault(group, []).append(input_dict[CQLFileFormat.PRF_PCT_TOTAL_CALL_PER_SEC])
+                    steps = len(executors[group])
+                    group_rates = rates.setdefault(group, {})
+                    for name, rate in GraphMetrics.RATES:
+                        if rate in input_dict or name in group_rates:
+                            group_rates.setdefault(name, [0] * (steps - 1)).append(input_dict.get(rate, 0))
+        return output_list
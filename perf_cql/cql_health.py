@@ -1,4 +1,5 @@
-from cassandra.cluster import Cluster
+import time, threading
+from cassandra.cluster import Cluster, Session
 from prettytable import PrettyTable
 from colorama import Fore, Style
 from enum import Enum
@@ -13,58 +14,155 @@ class CQLDiagnosePrint(Enum):
 
 class CQLHealth:
 
-    def __init__(self, cluster: Cluster):
+    TIMEOUT = 20
+
+    # cache of status across environment switches, in format {key: (time, status)}
+    _status_cache = {}
+    _status_lock = threading.Lock()
+
+    def __init__(self, cluster: Cluster, session: Session = None):
+        """
+        :param cluster:     cluster for diagnostic
+        :param session:     shared session for queries (in case of None, the session is
+                            created only for each query)
+        """
         self._cluster = cluster
+        self._session = session
         self._nodes = None
         self._hosts = None
 
-    def diagnose(self, level = CQLDiagnosePrint.short) -> dict:
-        status=self._get_status()
+    def diagnose(self, level = CQLDiagnosePrint.short, cache_key = None) -> dict:
+        status = self.get_status(cache_key)
+        CQLHealth.print_status(status, level)
+        return status
 
+    def get_status(self, cache_key = None) -> dict:
+        """Return status of all nodes, the status is stored to the cache (see 'cached_status')
+
+        :param cache_key:   key for cache, None means without cache
+        """
+        status = self._get_status()
+        if cache_key is not None:
+            with CQLHealth._status_lock:
+                CQLHealth._status_cache[cache_key] = (time.time(), status)
+        return status
+
+    @staticmethod
+    def cached_status(cache_key, ttl) -> dict:
+        """Return cached status not older than 'ttl' seconds or None"""
+        with CQLHealth._status_lock:
+            item = CQLHealth._status_cache.get(cache_key, None)
+        if item and (time.time() - item[0]) <= ttl:
+            return item[1]
+        return None
+
+    @staticmethod
+    def print_status(status, level = CQLDiagnosePrint.short):
         if level==CQLDiagnosePrint.short:
-            self.print_status_short(status)
+            CQLHealth.print_status_short(status)
         elif level==CQLDiagnosePrint.full:
-            self.print_status_full(status)
+            CQLHealth.print_status_full(status)
         elif level==CQLDiagnosePrint.extra:
-            self.print_status_short(status)
-            self.print_status_full(status)
-        return status
+            CQLHealth.print_status_short(status)
+            CQLHealth.print_status_full(status)
 
     def get_version(self):
         """Return runtime version (4.0, 5.0.0, etc.) for platform such as Cassandra, Scylla, etc."""
 
+        row = self._execute("SELECT release_version FROM system.local;").one()
+        return str(row.release_version) if row else ""
+
+    def get_size(self, keyspace_name) -> int:
+        """Return size of keyspace in Mb. The error indicate value -1."""
+
+        sizes = self.get_sizes([keyspace_name])
+        return int(sizes[keyspace_name]['size_mb']) if sizes.get(keyspace_name, None) else -1
+
+    def get_sizes(self, keyspace_names = None) -> dict:
+        """Return size, partitions count and mean partition size for keyspaces, based on
+        'system.size_estimates' (each node has estimates for its primary ranges, the nodes
+        and keyspaces are queried concurrently)
+
+        :param keyspace_names:  list of keyspaces, None means all keyspaces (without system keyspaces)
+        :return:                sizes in format {keyspace: {'tables', 'partitions', 'mean_partition_size', 'size_mb'}}
+        """
         session = None
         try:
-            session = self._cluster.connect()
-            session.default_timeout = 20
+            session = self._session if self._session else self._cluster.connect()
+
+            if not keyspace_names:
+                keyspace_names = [name for name in self._cluster.metadata.keyspaces.keys()
+                                  if not name.startswith("system")]
+
+            # all requests are in flight together
+            statement = "SELECT table_name, partitions_count, mean_partition_size " \
+                        "FROM system.size_estimates WHERE keyspace_name = %s;"
+            futures = []
+            for keyspace_name in keyspace_names:
+                for host in self._cluster.metadata.all_hosts():
+                    if host.is_up:
+                        futures.append((keyspace_name, session.execute_async(statement,
+                                                                             [keyspace_name],
+                                                                             timeout = CQLHealth.TIMEOUT,
+                                                                             host = host)))
+
+            sizes = {}
+            for keyspace_name in keyspace_names:
+                sizes[keyspace_name] = {'tables': set(), 'partitions': 0, 'size': 0}
+            for keyspace_name, future in futures:
+                size = sizes[keyspace_name]
+                for row in future.result():
+                    size['tables'].add(row.table_name)
+                    size['partitions'] += row.partitions_count
+                    size['size'] += row.partitions_count * row.mean_partition_size
+
+            for keyspace_name, size in sizes.items():
+                sizes[keyspace_name] = {
+                    'tables': len(size['tables']),
+                    'partitions': size['partitions'],
+                    'mean_partition_size': round(size['size'] / size['partitions']) if size['partitions'] > 0 else 0,
+                    'size_mb': round(size['size'] / 1048576, 2),
+                }
+            return sizes
 
-            row = session.execute("SELECT release_version FROM system.local;").one()
-            return str(row.release_version) if row else ""
         finally:
-            if session:
+            if session and session is not self._session:
                 session.shutdown()
 
-    def get_size(self, keyspace_name) -> int:
-        """Return size of keyspace in Mb. The error indicate value -1."""
+    @staticmethod
+    def print_sizes(sizes: dict):
+        table = PrettyTable()
+
+        table.border = True
+        table.header = True
+        table.padding_width = 1
+
+        table.field_names = ["Keyspace", "Tables", "Partitions", "Mean partition [B]", "Size [MB]"]
+        table.align = "r"
+        table.align["Keyspace"] = "l"
+
+        for keyspace_name, size in sizes.items():
+            table.add_row([keyspace_name, size['tables'], size['partitions'], size['mean_partition_size'], size['size_mb']])
+        table.sortby = "Keyspace"
+        print(table)
+
+    def _execute(self, query):
+        """Execute query on shared session (or on the new session)"""
+        if self._session:
+            return self._session.execute(query, timeout = CQLHealth.TIMEOUT)
 
         session = None
         try:
             session = self._cluster.connect()
-            session.default_timeout = 20
-
-            row = session.execute("SELECT SUM(mean_partition_size * partitions_count) / 1048576 AS size_mb "
-                                   "FROM system.size_estimates "
-                                   f"WHERE keyspace_name = '{keyspace_name}' "
-                                   "GROUP BY keyspace_name;").one()
-            return int(row.size_mb) if row else -1
-
+            return session.execute(query, timeout = CQLHealth.TIMEOUT)
         finally:
             if session:
                 session.shutdown()
 
     #region DIAGNOSE private functions
 
-    def print_status_short(self, status, prefix_output = " "):
+    @staticmethod
+    def print_status_short(status, prefix_output = " "):
 
         node_down = []
         node_peer_down = []
@@ -108,7 +206,8 @@ class CQLHealth:
               f" Not-synch: {'0x' if missing_schemas == 0 else Fore.CYAN + str(missing_schemas) + 'x' + Style.RESET_ALL},"
               f" Ver: {release_versions}")
 
-    def print_status_full(self, status):
+    @staticmethod
+    def print_status_full(status):
         table = PrettyTable()
 
         table.border = False
@@ -120,7 +219,7 @@ class CQLHealth:
         table.align["Root"] = "c"
 
         # use short schema version
-        shorter_schema = self._build_shorter_schema_version(status)
+        shorter_schema = CQLHealth._build_shorter_schema_version(status)
 
         # create output
         for ip in status.keys():
@@ -155,7 +254,8 @@ class CQLHealth:
         table.sortby = "Location"
         print(table)
 
-    def _build_shorter_schema_version(self, status):
+    @staticmethod
+    def _build_shorter_schema_version(status):
         """Generate shorter schema version for better visualization
         (in terminal 80 columns and 40 rows)"""
 
@@ -177,28 +277,34 @@ class CQLHealth:
         session = None
 
         try:
-            session = self._cluster.connect()
-            session.default_timeout = 20
+            session = self._session if self._session else self._cluster.connect()
 
+            # all requests are in flight together
             nodes = self._get_nodes(session)
-            node_status = self._get_node_status(session)
+            peers_future = session.execute_async("SELECT peer, rpc_address FROM system.peers;",
+                                                 timeout = CQLHealth.TIMEOUT)
+            local_futures = self._get_local_futures(session)
+
+            node_status = self._get_node_status(peers_future)
+            local_status = self._get_local_status(local_futures)
 
             for key in nodes.keys():
                 node = nodes[key]
                 state = node_status.get(key, None)
+                local = local_status.get(key, None)
 
                 final_status_info = {
                     'status': "UP" if node['is_up'] else "DOWN",
                     'peer_status': state['status'] if state else "DOWN",
                     'location': f"{node['data_center']}/{node['rack']}",
-                    'schema_version': state["schema_version"] if state else "n/a",
-                    'release_version': node["release_version"],
+                    'schema_version': local["schema_version"] if local else "n/a",
+                    'release_version': local["release_version"] if local else node["release_version"],
                     'root': state['root'] if state else "",
                 }
                 final_status[key] = final_status_info
 
         finally:
-            if session:
+            if session and session is not self._session:
                 session.shutdown()
         return final_status
 
@@ -218,39 +324,57 @@ class CQLHealth:
             hosts[host.address]=host_info
         return hosts
 
-    def _get_node_status(self, session) -> dict:
-        """Return states of all live nodes"""
+    def _get_local_futures(self, session) -> dict:
+        """Send query to 'system.local' for each live node (asynchronous requests)"""
+        futures = {}
+        for host in self._cluster.metadata.all_hosts():
+            if host.is_up:
+                futures[host.address] = session.execute_async("SELECT schema_version, release_version FROM system.local;",
+                                                              timeout = CQLHealth.TIMEOUT,
+                                                              host = host)
+        return futures
+
+    def _get_local_status(self, futures: dict) -> dict:
+        """Return schema and release version from 'system.local' of each node"""
         nodes = {}
+        for address, future in futures.items():
+            try:
+                row = future.result().one()
+            except Exception:
+                # node without response
+                continue
+            if row:
+                nodes[address] = {
+                    'schema_version': row.schema_version,
+                    'release_version': row.release_version,
+                }
+        return nodes
 
-        # Execute a query to get node status information from system.peers
-        query = "SELECT peer, schema_version, release_version, rpc_address FROM system.peers;"
-        rows = session.execute(query)
+    def _get_node_status(self, peers_future) -> dict:
+        """Return gossip states of all nodes (from the view of root node)"""
+        nodes = {}
 
-        # Process the results
+        # node status information from system.peers
+        rows = peers_future.result()
         for row in rows:
             node_info = {
                 'status': 'UP' if row.rpc_address else 'DOWN',
                 #'status': 'UP' if row.peer else 'DOWN',
-                'schema_version': row.schema_version,
-                'release_version': row.release_version,
                 'peer': row.peer,
                 'rpc_address': row.rpc_address,
                 'root': "",
             }
             nodes[node_info['peer']]=node_info
 
-        # Include the local node information
-        local_query = "SELECT schema_version, rpc_address, release_version FROM system.local;"
-        local_row = session.execute(local_query).one()
-        local_node_info = {
-            'status': 'UP' if local_row.rpc_address else 'DOWN',
-            'schema_version': local_row.schema_version,
-            'release_version' : local_row.release_version,
-            'peer': '127.0.0.1',  # Local node IP
-            'rpc_address': local_row.rpc_address,
-            'root': "x",
-        }
-        nodes[local_node_info['rpc_address']] = local_node_info
+        # include the local (root) node, which answered the query
+        root = peers_future.coordinator_host
+        if root:
+            nodes[root.address] = {
+                'status': 'UP',
+                'peer': root.address,
+                'rpc_address': root.address,
+                'root': "x",
+            }
         return nodes
 
     #endregion
\ No newline at end of file
@@ -0,0 +1,107 @@
+import numpy as np
+
+
+class LatencyHistogram:
+    """Latency histogram with fixed memory and logarithmic buckets (in style of HDR histogram).
+    Each power of two is split to the linear sub-buckets, it means the same relative precision
+    for all values (e.g. 7 bits = 128 sub-buckets = relative error under 0.8%).
+    The histograms from different executors can be merged."""
+
+    UNIT = 1000000          # recorded values in microseconds
+    PERCENTILES = [50, 95, 99, 99.9]
+
+    def __init__(self, sub_bucket_bits = 7, max_seconds = 3600):
+        """
+        :param sub_bucket_bits:     amount of bits for sub-buckets (precision of histogram)
+        :param max_seconds:         max. recorded value in seconds (higher values are saturated)
+        """
+        self._sub_bits = sub_bucket_bits
+        self._sub_count = 1 << sub_bucket_bits
+        self._max_value = int(max_seconds * LatencyHistogram.UNIT)
+        self._counts = np.zeros(self._index(self._max_value) + 1, dtype=np.int64)
+        self.total = 0
+        self.max = 0
+
+    @property
+    def sub_bucket_bits(self):
+        return self._sub_bits
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Counts in buckets"""
+        return self._counts
+
+    def _index(self, value: int) -> int:
+        """Bucket index for value in microseconds"""
+        if value < self._sub_count:
+            return value
+        shift = value.bit_length() - self._sub_bits - 1
+        return ((shift + 1) << self._sub_bits) + (value >> shift) - self._sub_count
+
+    def _value(self, index: int) -> float:
+        """Middle value of bucket in microseconds"""
+        if index < self._sub_count:
+            return float(index)
+        shift = (index >> self._sub_bits) - 1
+        lower = ((index & (self._sub_count - 1)) + self._sub_count) << shift
+        return lower + ((1 << shift) - 1) / 2
+
+    def bucket(self, duration) -> int:
+        """Bucket index for duration (in seconds), the values out of range are saturated"""
+        value = int(duration * LatencyHistogram.UNIT)
+        if value < 0:
+            value = 0
+        elif value > self._max_value:
+            value = self._max_value
+        return self._index(value)
+
+    def record(self, duration):
+        """Record one duration (in seconds)"""
+        self._counts[self.bucket(duration)] += 1
+        self.total += 1
+        if duration > self.max:
+            self.max = duration
+
+    def merge(self, histogram):
+        """Merge other histogram (with the same precision) to this histogram"""
+        if histogram is None or histogram.total == 0:
+            return
+        self._counts += histogram._counts
+        self.total += histogram.total
+        if histogram.max > self.max:
+            self.max = histogram.max
+
+    def percentile(self, percentile) -> float:
+        """Return value for percentile (in seconds), e.g. 99 or 99.9"""
+        if self.total == 0:
+            return 0
+        limit = max(1, int(np.ceil(self.total * percentile / 100)))
+        index = int(np.searchsorted(np.cumsum(self._counts), limit))
+        return min(self._value(index) / LatencyHistogram.UNIT, self.max)
+
+    def percentiles(self) -> dict:
+        """Return key percentiles in format {'p50': value, ..., 'p99.9': value, 'max': value}"""
+        output = {}
+        for percentile in LatencyHistogram.PERCENTILES:
+            output[f"p{percentile}"] = self.percentile(percentile)
+        output["max"] = self.max
+        return output
+
+    def to_dict(self) -> dict:
+        """Compact form of histogram (only not empty buckets)"""
+        indexes = np.nonzero(self._counts)[0]
+        return {
+            "bits": self._sub_bits,
+            "max": self.max,
+            "buckets": {int(index): int(self._counts[index]) for index in indexes}
+        }
+
+    @staticmethod
+    def from_dict(value: dict):
+        """Create histogram from compact form, see 'to_dict'"""
+        histogram = LatencyHistogram(value.get("bits", 7))
+        for index, count in value.get("buckets", {}).items():
+            histogram._counts[int(index)] += count
+            histogram.total += count
+        histogram.max = value.get("max", 0)
+        return histogram
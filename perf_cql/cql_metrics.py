@@ -0,0 +1,88 @@
+import threading
+
+try:
+    # the driver metrics require library 'scales' (see requirements.txt)
+    import cassandra.metrics
+    METRICS_SUPPORTED = True
+except ImportError:
+    METRICS_SUPPORTED = False
+
+
+class CQLDriverMetrics:
+    """Driver metrics (see 'cassandra.metrics') for executors, the counters are
+    shared for all executors (threads) in the process and the difference between
+    the first attach and the last detach is returned to the last detached executor.
+
+        example::
+
+            metrics = CQLDriverMetrics.attach(session.cluster)
+            ...
+            probe.driver_metrics = metrics.detach()
+    """
+
+    # counters of errors (each attempt, the request can be retried)
+    ERRORS = ["connection_errors", "read_timeouts", "write_timeouts", "unavailables", "other_errors"]
+    # counters of retry policy decisions
+    DECISIONS = ["retries", "ignores"]
+
+    # metrics shared in process (see 'attach()')
+    _lock = threading.Lock()
+    _attached = 0
+    _start = None
+
+    def __init__(self, cluster):
+        self._metrics = getattr(cluster, "metrics", None)
+
+    @staticmethod
+    def attach(cluster):
+        """Start measurement for executor
+
+        :param cluster:     cluster with enabled metrics ('metrics_enabled'), otherwise without measurement
+        :return:            metrics for detach
+        """
+        metrics = CQLDriverMetrics(cluster)
+        if metrics._metrics is not None:
+            with CQLDriverMetrics._lock:
+                if CQLDriverMetrics._attached == 0:
+                    CQLDriverMetrics._start = metrics._snapshot()
+                CQLDriverMetrics._attached += 1
+        return metrics
+
+    def detach(self) -> dict:
+        """Stop measurement for executor
+
+        :return:    difference of counters in format {'requests': value, 'connection_errors': value, ...}
+                    (only for the last executor in process, otherwise None)
+        """
+        if self._metrics is None:
+            return None
+
+        with CQLDriverMetrics._lock:
+            CQLDriverMetrics._attached -= 1
+            if CQLDriverMetrics._attached > 0:
+                return None
+            start = CQLDriverMetrics._start
+        end = self._snapshot()
+        output = {name: end[name] - start[name] for name in end.keys()}
+        output['open_connections'] = end['open_connections']
+        return output
+
+    def _snapshot(self) -> dict:
+        stats = self._metrics.stats
+        output = {name: int(getattr(stats, name)) for name in CQLDriverMetrics.ERRORS + CQLDriverMetrics.DECISIONS}
+        output['requests'] = int(self._metrics.request_timer['count'])
+        # the gauge is function (evaluated on access to the value)
+        open_connections = stats.open_connections
+        output['open_connections'] = int(open_connections() if callable(open_connections) else open_connections)
+        return output
+
+    @staticmethod
+    def merge(metrics: list) -> dict:
+        """Merge metrics from more executors (processes), return None for empty metrics"""
+        output = None
+        for item in metrics:
+            if item:
+                output = output if output else {}
+                for name, value in item.items():
+                    output[name] = output.get(name, 0) + value
+        return output
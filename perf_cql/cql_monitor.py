@@ -0,0 +1,138 @@
+import datetime, json, threading, os
+from cassandra.cluster import Cluster, Session
+from cassandra.policies import HostStateListener
+from cql_health import CQLHealth
+from cql_file_format import CQLFileFormat
+
+
+class CQLHealthMonitor(HostStateListener):
+    """Background sampling of cluster health (node state, gossip state and schema agreement)
+    during the run. The sampling is in separate thread of the main process (the executors are
+    in other processes) and the host up/down events from the driver are recorded immediately.
+
+        example::
+
+            with CQLHealthMonitor(cluster, session, "hlt_cassandra.txt", label = "Cassandra-W", interval = 10):
+                generator.run_bulk_executor(...)
+    """
+
+    def __init__(self, cluster: Cluster, session: Session, output_file, label = "Noname", interval = 10):
+        """
+        :param cluster:         cluster for monitoring
+        :param session:         shared session for queries
+        :param output_file:     output file for health records (the file is appended)
+        :param label:           label of the run
+        :param interval:        interval of sampling in seconds
+        """
+        self._cluster = cluster
+        self._health = CQLHealth(cluster, session)
+        self._output_file = output_file
+        self._label = label
+        self._interval = interval
+        self._file = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """Start background sampling and listening of host events"""
+        # the monitor starts before the executors (the output directory does not have to exist)
+        dirname = os.path.dirname(self._output_file)
+        if dirname:
+            os.makedirs(dirname, mode=0o777, exist_ok=True)
+        self._file = open(self._output_file, "a")
+        self._start_time = datetime.datetime.utcnow()
+        self._write_line(f"############### {self._start_time.isoformat(' ')} ###############")
+        self._write({CQLFileFormat.HLT_TYPE: CQLFileFormat.HLT_HDR_TYPE,
+                     CQLFileFormat.HLT_HDR_LABEL: self._label,
+                     CQLFileFormat.HLT_HDR_INTERVAL: self._interval,
+                     CQLFileFormat.HLT_NOW: self._start_time.isoformat(' ')})
+
+        self._cluster.register_listener(self)
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sampling, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop background sampling (with the last sample)"""
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._cluster.unregister_listener(self)
+
+        self._write_line(f"############### Duration: "
+                         f"{round((datetime.datetime.utcnow() - self._start_time).total_seconds(), 1)}"
+                         f" seconds ###############")
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+    def _sampling(self):
+        while True:
+            self._sample()
+            if self._stop_event.wait(self._interval):
+                break
+        self._sample()
+
+    def _sample(self):
+        """One sample of cluster status"""
+        now = datetime.datetime.utcnow()
+        try:
+            status = self._health.get_status()
+        except Exception as ex:
+            self._write({CQLFileFormat.HLT_TYPE: CQLFileFormat.HLT_SAMPLE_TYPE,
+                         CQLFileFormat.HLT_SAMPLE_ERROR: f"{type(ex).__name__}: {str(ex)}",
+                         CQLFileFormat.HLT_NOW: now.isoformat(' ')})
+            return
+
+        schemas = set([node['schema_version'] for node in status.values() if node['schema_version'] != "n/a"])
+        self._write({CQLFileFormat.HLT_TYPE: CQLFileFormat.HLT_SAMPLE_TYPE,
+                     CQLFileFormat.HLT_SAMPLE_NODES: len(status),
+                     CQLFileFormat.HLT_SAMPLE_DOWN: [ip for ip, node in status.items() if node['status'] == "DOWN"],
+                     CQLFileFormat.HLT_SAMPLE_GOSSIP_DOWN: [ip for ip, node in status.items() if node['peer_status'] == "DOWN"],
+                     CQLFileFormat.HLT_SAMPLE_SCHEMAS: len(schemas),
+                     CQLFileFormat.HLT_SAMPLE_SCHEMA_AGREEMENT: len(schemas) <= 1,
+                     CQLFileFormat.HLT_NOW: now.isoformat(' ')})
+
+    def _event(self, event, host):
+        self._write({CQLFileFormat.HLT_TYPE: CQLFileFormat.HLT_EVENT_TYPE,
+                     CQLFileFormat.HLT_EVENT: event,
+                     CQLFileFormat.HLT_EVENT_HOST: host.address,
+                     CQLFileFormat.HLT_EVENT_LOCATION: f"{host.datacenter}/{host.rack}",
+                     CQLFileFormat.HLT_NOW: datetime.datetime.utcnow().isoformat(' ')})
+
+    def _write(self, out: dict):
+        self._write_line(json.dumps(out))
+
+    def _write_line(self, out: str):
+        with self._lock:
+            if self._file:
+                self._file.write(out + "\n")
+                self._file.flush()
+
+    #region HostStateListener
+
+    def on_up(self, host):
+        self._event("up", host)
+
+    def on_down(self, host):
+        self._event("down", host)
+
+    def on_add(self, host):
+        self._event("add", host)
+
+    def on_remove(self, host):
+        self._event("remove", host)
+
+    #endregion
@@ -0,0 +1,169 @@
+import datetime
+import json
+import time
+from qgate_perf.parallel_probe import ParallelProbe
+from qgate_perf.run_setup import RunSetup
+from cql_histogram import LatencyHistogram
+from cql_timeseries import TimeSeries
+
+
+class OperationStats:
+    """Statistics for one type of operation (e.g. read or write in mixed workload)
+    or for one coordinator host"""
+
+    def __init__(self):
+        self.counter = 0
+        self.errors = 0
+        self.total_duration = 0
+        self.histogram = LatencyHistogram()
+
+    def include(self, duration):
+        self.counter += 1
+        self.total_duration += duration
+        self.histogram.record(duration)
+
+    def to_dict(self) -> dict:
+        return {"calls": self.counter,
+                "errors": self.errors,
+                "avrg": 0 if self.counter == 0 else self.total_duration / self.counter}
+
+class CQLProbe(ParallelProbe):
+    """Probe with ability to include measurements of asynchronous requests
+    (the request is not measured only via start() and stop()). The measurement
+    can start after warm-up ('warmup_seconds'), the requests started during
+    warm-up are executed, but they are not part of statistics. The failed requests
+    (e.g. timeouts) are counted separately, see 'error()'."""
+
+    def __init__(self, run_setup: RunSetup, exception = None):
+        super().__init__(run_setup, exception)
+        self.in_flight = 1
+        self.pipelined = False
+        self.elapsed = 0
+        self.errors = 0
+        self.histogram = None
+        self.operations = {}
+        self.hosts = {}
+        self.host_dc = {}
+        self.operation_rows = {}
+        self.timeseries = None
+        self.profile = None
+        self.driver_metrics = None
+        if exception is None and run_setup:
+            self.in_flight = run_setup.param('in_flight', 1)
+            self.pipelined = self.in_flight > 1 or run_setup.param('target_rate', 0) > 0
+            self.histogram = LatencyHistogram()
+
+            # warm-up, the measurement (and duration of test) starts after warm-up
+            warmup = run_setup.param('warmup_seconds', 0)
+            if warmup > 0:
+                self.init_time += warmup
+                self.track_start += datetime.timedelta(seconds=warmup)
+
+            # throughput and latency in fixed intervals
+            interval = run_setup.param('timeseries_interval', 0)
+            if interval > 0:
+                self.timeseries = TimeSeries(interval, self.duration_second)
+
+    def stop(self, operation = None, host = None) -> bool:
+        """ Test, if it is possible to stop whole execution
+
+        :param operation:   name of operation (e.g. 'read', 'write'), default is without operation
+        :param host:        coordinator host of request (from driver), default is without host
+        :return:            True - stop execution, False - continue in execution
+        """
+        return self.include(self.start_time_one_shot, time.time(), operation, host)
+
+    def include(self, start_time, stop_time, operation = None, host = None) -> bool:
+        """ Include one measurement and test, if it is possible to stop whole execution
+
+        :param start_time:  start of request
+        :param stop_time:   end of request
+        :param operation:   name of operation (e.g. 'read', 'write'), default is without operation
+        :param host:        coordinator host of request (from driver), default is without host
+        :return:            True - stop execution, False - continue in execution
+        """
+        # request started during warm-up (without measurement)
+        if start_time < self.init_time:
+            return False
+
+        self.stop_time_one_shot = stop_time
+        duration_one_shot = stop_time - start_time
+
+        self.counter += 1
+        self.total_duration += duration_one_shot
+
+        # calc standard deviation incrementally and latency histogram
+        self.stddev.include(duration_one_shot)
+        self.histogram.record(duration_one_shot)
+        if self.timeseries:
+            self.timeseries.record(stop_time, duration_one_shot)
+
+        # separate statistics for operation
+        if operation:
+            stats = self.operations.get(operation, None)
+            if stats is None:
+                stats = self.operations[operation] = OperationStats()
+            stats.include(duration_one_shot)
+
+        # separate statistics for coordinator host
+        if host:
+            stats = self.hosts.get(host.address, None)
+            if stats is None:
+                stats = self.hosts[host.address] = OperationStats()
+                self.host_dc[host.address] = host.datacenter
+            stats.include(duration_one_shot)
+
+        # setup new min/max
+        if duration_one_shot < self.min_duration:
+            self.min_duration = duration_one_shot
+        if duration_one_shot > self.max_duration:
+            self.max_duration = duration_one_shot
+
+        return self._is_end(stop_time)
+
+    def error(self, start_time, stop_time, operation = None) -> bool:
+        """ Include one failed request (e.g. timeout) and test, if it is possible to stop whole execution,
+        the failed request is only counted (without latency)
+
+        :param start_time:  start of request
+        :param stop_time:   end of request
+        :param operation:   name of operation (e.g. 'read', 'write'), default is without operation
+        :return:            True - stop execution, False - continue in execution
+        """
+        # request started during warm-up (without measurement)
+        if start_time < self.init_time:
+            return False
+
+        self.errors += 1
+        if self.timeseries:
+            self.timeseries.record_error(stop_time)
+        if operation:
+            stats = self.operations.get(operation, None)
+            if stats is None:
+                stats = self.operations[operation] = OperationStats()
+            stats.errors += 1
+
+        return self._is_end(stop_time)
+
+    def _is_end(self, stop_time) -> bool:
+        # Is it possible to end performance testing?
+        if (stop_time - self.init_time) >= self.duration_second:
+            self.elapsed = stop_time - self.init_time
+            self.track_end = datetime.datetime.utcnow()
+            self.standard_deviation = self.stddev.std
+            del self.stddev
+            if self.timeseries:
+                self.timeseries.compact()
+            return True
+        return False
+
+    def __str__(self):
+        """ Provider view to return value (extended about operations) """
+        output = super().__str__()
+        if self.exception is None and (self.operations or self.errors):
+            detail = json.loads(output)
+            detail["errors"] = self.errors
+            if self.operations:
+                detail["operations"] = {name: stats.to_dict() for name, stats in self.operations.items()}
+            return json.dumps(detail)
+        return output
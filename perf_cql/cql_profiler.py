@@ -0,0 +1,150 @@
+import cProfile, os.path, pstats, sys, threading
+from enum import Enum
+
+
+class ProfileMode(Enum):
+    off = 1             # without profiler
+    sample = 2          # sampling of stacks for all threads in process (low overhead)
+    on = 3              # deterministic profiler 'cProfile' for executor thread (higher overhead)
+
+class CQLProfiler:
+    """Profiler for executors, the output is in collapsed stack format (flamegraph ready)
+    in format {'frame;frame;frame': count}. The sampling is shared for all executors (threads)
+    in the process and the stacks are returned to the last detached executor (it includes also
+    threads of the driver e.g. event loop). The 'cProfile' measures only executor thread and the
+    stacks are pairs 'caller;function' with own time in microseconds (not the full stacks, see 'header()').
+
+        example::
+
+            profiler = CQLProfiler.attach(ProfileMode.sample)
+            ...
+            probe.profile = profiler.detach()
+    """
+
+    INTERVAL = 0.01     # interval of sampling in seconds
+
+    # description of values in output file for the mode (see 'save()')
+    HEADERS = {ProfileMode.on: "cProfile of executor thread, lines 'caller;function' (not full stacks) "
+                               "with own time in microseconds"}
+
+    # sampling shared in process (see 'attach()')
+    _lock = threading.Lock()
+    _attached = 0
+    _thread = None
+    _stop_event = None
+    _stacks = {}
+
+    def __init__(self, mode: ProfileMode):
+        self._mode = mode
+        self._profile = None
+
+    @staticmethod
+    def attach(mode: ProfileMode):
+        """Start profiler for executor
+
+        :param mode:    mode of profiler
+        :return:        profiler for detach
+        """
+        profiler = CQLProfiler(mode)
+        if mode == ProfileMode.on:
+            profiler._profile = cProfile.Profile()
+            profiler._profile.enable()
+        elif mode == ProfileMode.sample:
+            with CQLProfiler._lock:
+                if CQLProfiler._attached == 0:
+                    CQLProfiler._stacks = {}
+                    CQLProfiler._stop_event = threading.Event()
+                    CQLProfiler._thread = threading.Thread(target=CQLProfiler._sampling,
+                                                           args=(CQLProfiler._stop_event,), daemon=True)
+                    CQLProfiler._thread.start()
+                CQLProfiler._attached += 1
+        return profiler
+
+    def detach(self) -> dict:
+        """Stop profiler for executor
+
+        :return:    collapsed stacks (the sampled stacks only for the last executor in process)
+        """
+        if self._mode == ProfileMode.on:
+            self._profile.disable()
+            return CQLProfiler._collapse(pstats.Stats(self._profile).stats)
+
+        if self._mode == ProfileMode.sample:
+            with CQLProfiler._lock:
+                CQLProfiler._attached -= 1
+                if CQLProfiler._attached > 0:
+                    return None
+                thread, CQLProfiler._thread = CQLProfiler._thread, None
+            CQLProfiler._stop_event.set()
+            thread.join()
+            return CQLProfiler._stacks
+        return None
+
+    @staticmethod
+    def _sampling(stop_event: threading.Event):
+        own = threading.get_ident()
+        labels = {}
+        while not stop_event.wait(CQLProfiler.INTERVAL):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    label = labels.get(code, None)
+                    if label is None:
+                        label = labels[code] = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                    stack.append(label)
+                    frame = frame.f_back
+                stack.append(names.get(ident, "thread"))
+                key = ";".join(reversed(stack))
+                CQLProfiler._stacks[key] = CQLProfiler._stacks.get(key, 0) + 1
+
+    @staticmethod
+    def _label(function) -> str:
+        file_name, line, name = function
+        if file_name == "~":
+            return name
+        return f"{name} ({os.path.basename(file_name)}:{line})"
+
+    @staticmethod
+    def _collapse(stats: dict) -> dict:
+        """Convert statistics from 'cProfile' to the pairs 'caller;function' with own time in microseconds"""
+        stacks = {}
+        for function, (_, _, own_time, _, callers) in stats.items():
+            if not callers:
+                stacks[CQLProfiler._label(function)] = int(own_time * 1000000)
+                continue
+            for caller, values in callers.items():
+                key = f"{CQLProfiler._label(caller)};{CQLProfiler._label(function)}"
+                stacks[key] = stacks.get(key, 0) + int(values[2] * 1000000)
+        return {key: value for key, value in stacks.items() if value > 0}
+
+    @staticmethod
+    def merge(profiles: list) -> dict:
+        """Merge collapsed stacks from more executors"""
+        stacks = {}
+        for profile in profiles:
+            for key, value in (profile if profile else {}).items():
+                stacks[key] = stacks.get(key, 0) + value
+        return stacks
+
+    @staticmethod
+    def header(mode: ProfileMode) -> str:
+        """Return description of values for the mode (None for samples of full stacks)"""
+        return CQLProfiler.HEADERS.get(mode, None)
+
+    @staticmethod
+    def save(output_file, stacks: dict, header = None):
+        """Save collapsed stacks (one line 'frame;frame;frame count' for each stack)
+
+        :param output_file: output file
+        :param stacks:      collapsed stacks
+        :param header:      description of values, it is the first line with '#' (ignored by flamegraph.pl)
+        """
+        with open(output_file, "w") as f:
+            if header:
+                f.write(f"# {header}\n")
+            for key, value in sorted(stacks.items(), key=lambda item: item[1], reverse=True):
+                f.write(f"{key} {value}\n")
@@ -0,0 +1,208 @@
+import json, os.path, os, datetime
+import numpy as np
+from qgate_perf.run_setup import RunSetup
+from cql_histogram import LatencyHistogram
+from cql_timeseries import TimeSeries
+
+
+class CQLResults:
+    """Columnar store of results for one run (beside the text output 'prf_*.txt'). The results
+    are in directory with NumPy arrays (one file for each table) and metadata in JSON,
+    the arrays can be memory-mapped (the analysis across many runs does not need all data in RAM).
+
+        tables::
+
+            steps.npy       one row for each step (bulk, executors, throughput, percentiles, ...)
+            executors.npy   one row for each executor in step (calls, durations, ...)
+            histograms.npy  latency histogram buckets for each step (row is the same as in steps)
+            timeseries.npy  throughput and latency in intervals for each step (see 'TIMESERIES_INTERVAL')
+            meta.json       metadata (env, label, bulks, executors, cluster version, ...)
+
+        example::
+
+            meta, tables = CQLResults.load("../output/res_cassandra-W-2024-09-04-072428")
+            p99 = tables['steps']['p99']
+    """
+
+    META_FILE = "meta.json"
+
+    STEP_DTYPE = np.dtype([('step', np.int32),
+                           ('group', np.int32),
+                           ('bulk_row', np.int32),
+                           ('bulk_col', np.int32),
+                           ('processes', np.int32),
+                           ('threads', np.int32),
+                           ('real_executors', np.int32),
+                           ('total_calls', np.int64),
+                           ('total_call_per_sec', np.float64),
+                           ('avrg', np.float64),
+                           ('std', np.float64),
+                           ('p50', np.float64),
+                           ('p95', np.float64),
+                           ('p99', np.float64),
+                           ('p99_9', np.float64),
+                           ('max', np.float64),
+                           ('target_rate', np.float64),
+                           ('start', np.float64),
+                           ('end', np.float64),
+                           ('errors', np.int64)])
+
+    EXECUTOR_DTYPE = np.dtype([('step', np.int32),
+                               ('pid', np.int32),
+                               ('calls', np.int64),
+                               ('total_duration', np.float64),
+                               ('min', np.float64),
+                               ('max', np.float64),
+                               ('std', np.float64),
+                               ('elapsed', np.float64),
+                               ('start', np.float64),
+                               ('end', np.float64)])
+
+    TIMESERIES_DTYPE = np.dtype([('step', np.int32),
+                                 ('start', np.float64),
+                                 ('calls', np.int64),
+                                 ('call_per_sec', np.float64),
+                                 ('avrg', np.float64),
+                                 ('p99', np.float64),
+                                 ('errors', np.int64)])
+
+    def __init__(self, meta: dict = None):
+        """
+        :param meta:    metadata for the run (e.g. env, label, cluster version)
+        """
+        self._meta = dict(meta) if meta else {}
+        self._groups = []
+        self._steps = []
+        self._executors = []
+        self._histograms = []
+        self._timeseries = []
+
+    @property
+    def meta(self) -> dict:
+        return self._meta
+
+    @property
+    def steps(self) -> int:
+        return len(self._steps)
+
+    def add_step(self, run_setup: RunSetup, processes, threads, group, probes: list, summary: dict, histogram: LatencyHistogram,
+                 timeseries: dict = None):
+        """Add results of one step (one executor configuration)
+
+        :param run_setup:   setup for the step
+        :param processes:   amount of processes
+        :param threads:     amount of threads
+        :param group:       name of group
+        :param probes:      probes from executors (without errors)
+        :param summary:     summary of step in format {'total_calls', 'total_call_per_sec', 'avrg', 'std', 'errors'}
+        :param histogram:   merged latency histogram
+        :param timeseries:  merged time series (see 'TimeSeries.merge'), default is without time series
+        """
+        step = len(self._steps)
+        if group not in self._groups:
+            self._groups.append(group)
+        percentiles = histogram.percentiles()
+        starts = [CQLResults._timestamp(probe.track_start) for probe in probes]
+        ends = [CQLResults._timestamp(probe.track_end) for probe in probes]
+
+        self._steps.append((step,
+                            self._groups.index(group),
+                            run_setup.bulk_row,
+                            run_setup.bulk_col,
+                            processes,
+                            threads,
+                            len(probes),
+                            summary['total_calls'],
+                            summary['total_call_per_sec'],
+                            summary['avrg'],
+                            summary['std'],
+                            percentiles['p50'],
+                            percentiles['p95'],
+                            percentiles['p99'],
+                            percentiles['p99.9'],
+                            percentiles['max'],
+                            run_setup.param('target_rate', 0),
+                            min(starts) if starts else 0,
+                            max(ends) if ends else 0,
+                            summary.get('errors', 0)))
+
+        for probe in probes:
+            self._executors.append((step,
+                                    probe.pid,
+                                    probe.counter,
+                                    probe.total_duration,
+                                    probe.min_duration,
+                                    probe.max_duration,
+                                    probe.standard_deviation,
+                                    getattr(probe, "elapsed", 0),
+                                    CQLResults._timestamp(probe.track_start),
+                                    CQLResults._timestamp(probe.track_end)))
+
+        self._histograms.append(histogram.counts.copy())
+        self._meta['histogram_bits'] = histogram.sub_bucket_bits
+
+        if timeseries:
+            p99 = TimeSeries.percentiles(timeseries, 99)
+            for index in range(len(timeseries['calls'])):
+                calls = timeseries['calls'][index]
+                self._timeseries.append((step,
+                                         timeseries['start'] + index * timeseries['interval'],
+                                         calls,
+                                         calls / timeseries['interval'] * run_setup.bulk_row,
+                                         timeseries['avrg'][index],
+                                         p99[index],
+                                         timeseries['errors'][index]))
+
+    @staticmethod
+    def _timestamp(value: datetime.datetime) -> float:
+        """Timestamp for time in UTC (the probes use 'utcnow')"""
+        return value.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+    def save(self, directory):
+        """Save results to the directory (the directory will be created)"""
+        if not os.path.exists(directory):
+            os.makedirs(directory, mode=0o777)
+
+        np.save(os.path.join(directory, "steps.npy"), np.array(self._steps, dtype=CQLResults.STEP_DTYPE))
+        np.save(os.path.join(directory, "executors.npy"), np.array(self._executors, dtype=CQLResults.EXECUTOR_DTYPE))
+        if self._histograms:
+            np.save(os.path.join(directory, "histograms.npy"), np.stack(self._histograms))
+        else:
+            np.save(os.path.join(directory, "histograms.npy"), np.zeros((0, 0), dtype=np.int64))
+        np.save(os.path.join(directory, "timeseries.npy"), np.array(self._timeseries, dtype=CQLResults.TIMESERIES_DTYPE))
+
+        meta = dict(self._meta)
+        meta['groups'] = self._groups
+        with open(os.path.join(directory, CQLResults.META_FILE), "w") as f:
+            json.dump(meta, f, indent = 1)
+
+    @staticmethod
+    def load(directory, mmap = True):
+        """Load results from directory
+
+        :param directory:   directory with results
+        :param mmap:        memory-mapped arrays (without load to RAM)
+        :return:            (meta, tables) where tables in format {'steps', 'executors', 'histograms', 'timeseries'}
+        """
+        with open(os.path.join(directory, CQLResults.META_FILE), "r") as f:
+            meta = json.load(f)
+
+        tables = {}
+        for name in ["steps", "executors", "histograms"]:
+            tables[name] = np.load(os.path.join(directory, f"{name}.npy"), mmap_mode = "r" if mmap else None)
+
+        # the time series are optional (e.g. results from older version)
+        file = os.path.join(directory, "timeseries.npy")
+        tables['timeseries'] = np.load(file, mmap_mode = "r" if mmap else None) if os.path.exists(file) \
+            else np.zeros(0, dtype=CQLResults.TIMESERIES_DTYPE)
+        return meta, tables
+
+    @staticmethod
+    def histogram(tables: dict, step, meta: dict = None) -> LatencyHistogram:
+        """Return latency histogram for step (e.g. for calculation of other percentiles)"""
+        histogram = LatencyHistogram(meta.get('histogram_bits', 7) if meta else 7)
+        counts = np.asarray(tables['histograms'][step])
+        histogram.counts[:len(counts)] += counts
+        histogram.total = int(counts.sum())
+        histogram.max = float(tables['steps'][step]['max'])
+        return histogram
@@ -0,0 +1,108 @@
+from prettytable import PrettyTable
+from colorama import Fore, Style
+from enum import Enum
+
+
+class SearchMode(Enum):
+    executors = 1       # ramp amount of executors (processes)
+    rate = 2            # ramp target rate (open loop)
+
+class SaturationSearch:
+    """Adaptive search of max. sustainable throughput. The load is doubled till the knee
+    (throughput stops growing or p99 crosses SLA) and after that the knee is bisected.
+
+        example::
+
+            search = SaturationSearch(run_step, start = 1, max_value = 128)
+            best = search.search()
+    """
+
+    def __init__(self, run_step, start = 1, max_value = 128, min_gain = 0.1, sla_p99 = 0, max_steps = 10, resolution = 1):
+        """
+        :param run_step:    function for one step in format 'run_step(value) -> (throughput, p99)'
+        :param start:       start value of load (amount of executors or target rate)
+        :param max_value:   max. value of load
+        :param min_gain:    min. relative growth of throughput for double load (e.g. 0.1 = 10%),
+                            for smaller load change is the growth proportional
+        :param sla_p99:     max. acceptable p99 latency in seconds (zero means without SLA)
+        :param max_steps:   max. amount of steps (runs)
+        :param resolution:  min. difference between values for bisection
+        """
+        self._run_step = run_step
+        self._start = start
+        self._max_value = max_value
+        self._min_gain = min_gain
+        self._sla_p99 = sla_p99
+        self._max_steps = max_steps
+        self._resolution = resolution
+        self._steps = []
+
+    @property
+    def steps(self):
+        return self._steps
+
+    def _step(self, value, best):
+        """Run one step and evaluate, if throughput still grows (in comparison with best step)"""
+        throughput, p99 = self._run_step(value)
+        sla_ok = self._sla_p99 <= 0 or p99 <= self._sla_p99
+        growing = True
+        if best:
+            growing = throughput >= best['throughput'] * (1 + self._min_gain * (value / best['value'] - 1))
+        step = {'value': value,
+                'throughput': throughput,
+                'p99': p99,
+                'ok': sla_ok and growing,
+                'reason': "" if sla_ok and growing else ("SLA p99" if not sla_ok else "saturation")}
+        self._steps.append(step)
+        return step
+
+    def _next(self, value):
+        return value * 2 if isinstance(value, int) else value * 2.0
+
+    def search(self) -> dict:
+        """Search the knee, return the best step (with max. sustainable throughput) or None"""
+        best, worse = None, None
+
+        # ramp phase, double load till the knee
+        value = self._start
+        while value <= self._max_value and len(self._steps) < self._max_steps:
+            step = self._step(value, best)
+            if not step['ok']:
+                worse = step
+                break
+            best = step
+            value = self._next(value)
+
+        # bisect phase, between the best and the worse step
+        while best and worse and len(self._steps) < self._max_steps:
+            value = (best['value'] + worse['value']) / 2
+            if isinstance(self._start, int):
+                value = int(value)
+            if abs(value - best['value']) < self._resolution or abs(worse['value'] - value) < self._resolution:
+                break
+            step = self._step(value, best)
+            if step['ok']:
+                best = step
+            else:
+                worse = step
+        return best
+
+    def print_steps(self, best: dict, value_name = "Value"):
+        """Print all steps and the best step"""
+        table = PrettyTable()
+        table.border = True
+        table.header = True
+        table.padding_width = 1
+        table.field_names = ["Step", value_name, "Throughput [calls/sec]", "p99 [sec]", "State"]
+        table.align = "r"
+
+        for count, step in enumerate(self._steps, start = 1):
+            state = "OK" if step['ok'] else Fore.LIGHTRED_EX + step['reason'] + Style.RESET_ALL
+            table.add_row([count, round(step['value'], 2), round(step['throughput'], 2), round(step['p99'], 6), state])
+        print(table)
+
+        if best:
+            print(Fore.LIGHTGREEN_EX + f"Max. sustainable throughput: {round(best['throughput'], 2)} calls/sec "
+                  f"({value_name.lower()} {round(best['value'], 2)}, p99 {round(best['p99'], 6)} sec)" + Style.RESET_ALL)
+        else:
+            print(Fore.LIGHTRED_EX + "Max. sustainable throughput was not found (check start value and SLA)" + Style.RESET_ALL)
@@ -0,0 +1,288 @@
+import asyncio, hashlib, multiprocessing, re, socket, struct, uuid
+
+
+class Opcode:
+    ERROR = 0x00
+    STARTUP = 0x01
+    READY = 0x02
+    OPTIONS = 0x05
+    SUPPORTED = 0x06
+    QUERY = 0x07
+    RESULT = 0x08
+    PREPARE = 0x09
+    EXECUTE = 0x0A
+    REGISTER = 0x0B
+    BATCH = 0x0D
+
+class ResultKind:
+    VOID = 0x0001
+    ROWS = 0x0002
+    PREPARED = 0x0004
+
+class DataType:
+    INT = b"\x00\x09"
+    UUID = b"\x00\x0c"
+    VARCHAR = b"\x00\x0d"
+    INET = b"\x00\x10"
+    SET_VARCHAR = b"\x00\x22\x00\x0d"
+
+class CQLStubServer:
+    """Minimal CQL native protocol v4 server without database, for measurement of client side
+    (the overhead ceiling of harness) and for run without database (e.g. CI). The server answers
+    PREPARE, EXECUTE, QUERY and BATCH with canned results after artificial latency, the system
+    tables describe one node cluster (enough for driver and its control connection).
+
+        example::
+
+            with CQLStubServer("localhost", 9042, latency = 0.001):
+                perf_test(CQLType.Stub, ...)
+    """
+
+    PROTOCOL_VERSION = 0x04
+    RELEASE_VERSION = "3.11.16"
+    CQL_VERSION = "3.4.4"
+
+    # errors (see native protocol v4)
+    ERROR_PROTOCOL = 0x000A
+    ERROR_INVALID = 0x2200
+    ERROR_UNPREPARED = 0x2500
+
+    _SELECT = re.compile(r"^\s*SELECT\s+(.+?)\s+FROM\s+\"?(\w+)\"?(?:\.\"?(\w+)\"?)?", re.IGNORECASE | re.DOTALL)
+    _INSERT = re.compile(r"^\s*INSERT\s+INTO\s+\"?(\w+)\"?(?:\.\"?(\w+)\"?)?\s*\((.+?)\)", re.IGNORECASE | re.DOTALL)
+
+    def __init__(self, host = "localhost", port = 9042, latency = 0, rows = 1, datacenter = "datacenter1"):
+        """
+        :param host:        address for listening
+        :param port:        port for listening
+        :param latency:     artificial latency of request in seconds (for QUERY, EXECUTE and BATCH)
+        :param rows:        amount of rows in result of select
+        :param datacenter:  name of data center (relevant for load balancing policy of driver)
+        """
+        self._host = host
+        self._port = int(port)
+        self._latency = latency
+        self._rows = rows
+        self._datacenter = datacenter
+        self._prepared = {}
+        self._process = None
+        self._local = self._local_row()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        """Start server in separate process (the server does not compete with executors
+        in the main process), it waits till the server is ready for connection"""
+        ready = multiprocessing.Event()
+        self._process = multiprocessing.Process(target=self.serve, args=(ready,), daemon=True)
+        self._process.start()
+        if not ready.wait(10):
+            self.stop()
+            raise TimeoutError(f"Stub server '{self._host}:{self._port}' is not ready")
+
+    def stop(self):
+        if self._process:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def serve(self, ready = None):
+        """Run server (blocking call)
+
+        :param ready:   event, which is set when the server is ready for connection
+        """
+        asyncio.run(self._serve(ready))
+
+    async def _serve(self, ready):
+        server = await asyncio.start_server(self._connection, self._host, self._port)
+        if ready:
+            ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        sock = writer.get_extra_info("socket")
+        if sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                version, flags, stream, opcode, length = struct.unpack(">BBhBi", await reader.readexactly(9))
+                body = await reader.readexactly(length) if length > 0 else b""
+
+                if version & 0x7F != CQLStubServer.PROTOCOL_VERSION:
+                    writer.write(self._frame(stream, Opcode.ERROR,
+                                             self._error(CQLStubServer.ERROR_PROTOCOL,
+                                                         f"Invalid or unsupported protocol version ({version & 0x7F}); "
+                                                         f"supported versions are (4/v4)")))
+                    continue
+
+                if self._latency > 0 and opcode in (Opcode.QUERY, Opcode.EXECUTE, Opcode.BATCH):
+                    # responses with latency are independent (more requests in flight)
+                    asyncio.get_running_loop().create_task(self._delayed(writer, stream, opcode, body))
+                else:
+                    writer.write(self._response(stream, opcode, body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _delayed(self, writer: asyncio.StreamWriter, stream, opcode, body):
+        await asyncio.sleep(self._latency)
+        if not writer.is_closing():
+            writer.write(self._response(stream, opcode, body))
+
+    def _response(self, stream, opcode, body) -> bytes:
+        """Return response frame for request"""
+        if opcode == Opcode.OPTIONS:
+            return self._frame(stream, Opcode.SUPPORTED, self._string_multimap({"CQL_VERSION": [CQLStubServer.CQL_VERSION],
+                                                                                 "COMPRESSION": []}))
+        if opcode in (Opcode.STARTUP, Opcode.REGISTER):
+            return self._frame(stream, Opcode.READY, b"")
+        if opcode == Opcode.QUERY:
+            return self._query(stream, self._read_long_string(body))
+        if opcode == Opcode.PREPARE:
+            return self._frame(stream, Opcode.RESULT, self._prepare(self._read_long_string(body)))
+        if opcode == Opcode.EXECUTE:
+            prepared_id = body[2:2 + struct.unpack(">H", body[:2])[0]]
+            prepared = self._prepared.get(prepared_id, None)
+            if prepared is None:
+                return self._frame(stream, Opcode.ERROR, self._error(CQLStubServer.ERROR_UNPREPARED, "Unprepared statement")
+                                   + self._short_bytes(prepared_id))
+            if not prepared[2]:
+                # without columns in result (e.g. insert)
+                return self._frame(stream, Opcode.RESULT, struct.pack(">i", ResultKind.VOID))
+            return self._frame(stream, Opcode.RESULT, self._rows_result(*prepared))
+        if opcode == Opcode.BATCH:
+            return self._frame(stream, Opcode.RESULT, struct.pack(">i", ResultKind.VOID))
+        return self._frame(stream, Opcode.ERROR, self._error(CQLStubServer.ERROR_PROTOCOL, f"Unsupported opcode {opcode}"))
+
+    def _query(self, stream, query) -> bytes:
+        """Result for simple query, the system tables describe one node and other selects are empty"""
+        select = CQLStubServer._SELECT.match(query)
+        if select is None:
+            # DDL, DML, USE, etc.
+            return self._frame(stream, Opcode.RESULT, struct.pack(">i", ResultKind.VOID))
+
+        columns, keyspace, table = select.group(1), select.group(2).lower(), (select.group(3) or "").lower()
+        names = [column.strip().strip('"') for column in columns.split(",")]
+        if keyspace == "system" and table == "peers_v2":
+            # the driver switches to 'system.peers' (protocol v4)
+            return self._frame(stream, Opcode.ERROR, self._error(CQLStubServer.ERROR_INVALID, "unconfigured table peers_v2"))
+        if keyspace == "system" and table in ("local", "peers"):
+            specs = list(self._local.items()) if names == ["*"] else \
+                [(name, self._local.get(name, (DataType.VARCHAR, None))) for name in names]
+            columns = [(name, data_type) for name, (data_type, _) in specs]
+            rows = [[value for _, (_, value) in specs]] if table == "local" else []
+            return self._frame(stream, Opcode.RESULT, self._rows_result(keyspace, table, columns, rows))
+
+        # empty result (the driver expects at least one column in metadata)
+        columns = [("key", DataType.VARCHAR)] if names == ["*"] else [(name, DataType.VARCHAR) for name in names]
+        return self._frame(stream, Opcode.RESULT, self._rows_result(keyspace, table, columns, []))
+
+    def _prepare(self, query) -> bytes:
+        """Prepare statement, all bind markers and columns in result are with type 'int'"""
+        prepared_id = hashlib.md5(query.encode("utf-8")).digest()
+        markers = query.count("?")
+        keyspace, table, binds, pk_indexes, columns = "stub", "stub", [], [], []
+
+        insert = CQLStubServer._INSERT.match(query)
+        select = CQLStubServer._SELECT.match(query)
+        if insert:
+            keyspace, table = (insert.group(1), insert.group(2)) if insert.group(2) else ("stub", insert.group(1))
+            binds = [column.strip().strip('"') for column in insert.group(3).split(",")]
+            pk_indexes = [0]
+        elif select:
+            keyspace, table = (select.group(2), select.group(3)) if select.group(3) else ("stub", select.group(2))
+            columns = [column.strip().strip('"') for column in select.group(1).split(",")]
+            columns = [] if columns == ["*"] else columns
+        binds = binds[:markers] + [f"p{index}" for index in range(len(binds), markers)]
+
+        columns = [(name, DataType.INT) for name in columns]
+        self._prepared[prepared_id] = (keyspace, table, columns, self._canned_rows(columns))
+
+        # bind markers metadata (with partition key indexes) and result metadata
+        output = struct.pack(">i", ResultKind.PREPARED) + self._short_bytes(prepared_id)
+        output += struct.pack(">iii", 0x0001, len(binds), len(pk_indexes))
+        output += b"".join([struct.pack(">H", index) for index in pk_indexes])
+        output += self._string(keyspace) + self._string(table)
+        output += b"".join([self._string(name) + DataType.INT for name in binds])
+        output += self._metadata(keyspace, table, columns) if columns else struct.pack(">ii", 0x0004, 0)
+        return output
+
+    def _canned_rows(self, columns) -> list:
+        return [[struct.pack(">i", row) for _ in columns] for row in range(self._rows)] if columns else []
+
+    def _rows_result(self, keyspace, table, columns, rows) -> bytes:
+        output = struct.pack(">i", ResultKind.ROWS) + self._metadata(keyspace, table, columns)
+        output += struct.pack(">i", len(rows))
+        for row in rows:
+            output += b"".join([self._bytes(value) for value in row])
+        return output
+
+    def _metadata(self, keyspace, table, columns) -> bytes:
+        output = struct.pack(">ii", 0x0001, len(columns)) + self._string(keyspace) + self._string(table)
+        return output + b"".join([self._string(name) + data_type for name, data_type in columns])
+
+    def _local_row(self) -> dict:
+        """Columns of 'system.local' in format {name: (type, value)}"""
+        address = socket.inet_aton(socket.gethostbyname(self._host))
+        return {
+            "key": (DataType.VARCHAR, b"local"),
+            "bootstrapped": (DataType.VARCHAR, b"COMPLETED"),
+            "broadcast_address": (DataType.INET, address),
+            "cluster_name": (DataType.VARCHAR, b"Stub Cluster"),
+            "cql_version": (DataType.VARCHAR, CQLStubServer.CQL_VERSION.encode("utf-8")),
+            "data_center": (DataType.VARCHAR, self._datacenter.encode("utf-8")),
+            "host_id": (DataType.UUID, uuid.uuid5(uuid.NAMESPACE_DNS, f"{self._host}:{self._port}").bytes),
+            "listen_address": (DataType.INET, address),
+            "native_protocol_version": (DataType.VARCHAR, b"4"),
+            "partitioner": (DataType.VARCHAR, b"org.apache.cassandra.dht.Murmur3Partitioner"),
+            "rack": (DataType.VARCHAR, b"rack1"),
+            "release_version": (DataType.VARCHAR, CQLStubServer.RELEASE_VERSION.encode("utf-8")),
+            "rpc_address": (DataType.INET, address),
+            "schema_version": (DataType.UUID, uuid.uuid5(uuid.NAMESPACE_DNS, "schema").bytes),
+            "tokens": (DataType.SET_VARCHAR, struct.pack(">i", 1) + self._bytes(b"0"))
+        }
+
+    #region Encoding
+
+    def _frame(self, stream, opcode, body) -> bytes:
+        return struct.pack(">BBhBi", 0x80 | CQLStubServer.PROTOCOL_VERSION, 0, stream, opcode, len(body)) + body
+
+    def _error(self, code, message) -> bytes:
+        return struct.pack(">i", code) + self._string(message)
+
+    @staticmethod
+    def _read_long_string(body) -> str:
+        length = struct.unpack(">i", body[:4])[0]
+        return body[4:4 + length].decode("utf-8")
+
+    @staticmethod
+    def _string(value: str) -> bytes:
+        value = value.encode("utf-8")
+        return struct.pack(">H", len(value)) + value
+
+    @staticmethod
+    def _short_bytes(value: bytes) -> bytes:
+        return struct.pack(">H", len(value)) + value
+
+    @staticmethod
+    def _bytes(value: bytes) -> bytes:
+        if value is None:
+            return struct.pack(">i", -1)
+        return struct.pack(">i", len(value)) + value
+
+    @staticmethod
+    def _string_multimap(values: dict) -> bytes:
+        output = struct.pack(">H", len(values))
+        for key, items in values.items():
+            output += CQLStubServer._string(key) + struct.pack(">H", len(items))
+            output += b"".join([CQLStubServer._string(item) for item in items])
+        return output
+
+    #endregion
@@ -0,0 +1,178 @@
+import math
+import numpy as np
+from cql_histogram import LatencyHistogram
+
+
+class TimeSeries:
+    """Throughput and latency in fixed intervals (e.g. 1 second) during the run, the values
+    are in ring buffer with coarse latency histograms (fixed memory for each executor).
+    The intervals are aligned to the wall clock, it means the time series from different
+    executors (processes) can be merged.
+
+        example::
+
+            series = TimeSeries(interval = 1, duration = 300)
+            series.record(stop_time, duration)
+            series.record_error(stop_time)
+            ...
+            merged = TimeSeries.merge([series, ...])
+    """
+
+    MAX_SLOTS = 3600            # max. amount of intervals in ring buffer (the older are overwritten)
+    HISTOGRAM_BITS = 4          # precision of histograms in intervals (relative error under 6.25%)
+    HISTOGRAM_MAX_SECONDS = 60  # max. latency in histograms of intervals
+
+    def __init__(self, interval = 1, duration = 0):
+        """
+        :param interval:    length of interval in seconds
+        :param duration:    expected duration of run in seconds (for size of ring buffer)
+        """
+        self._interval = interval
+        self._template = TimeSeries.histogram()
+        self._slots = min(TimeSeries.MAX_SLOTS, max(2, math.ceil(duration / interval) + 2))
+        self._counts = np.zeros(self._slots, dtype=np.int64)
+        self._durations = np.zeros(self._slots, dtype=np.float64)
+        self._errors = np.zeros(self._slots, dtype=np.int64)
+        self._histograms = np.zeros((self._slots, len(self._template.counts)), dtype=np.int32)
+        self._first = None          # the first interval (number of interval from epoch)
+        self._last = None           # the last interval
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @staticmethod
+    def histogram() -> LatencyHistogram:
+        """Empty histogram with precision for intervals"""
+        return LatencyHistogram(TimeSeries.HISTOGRAM_BITS, TimeSeries.HISTOGRAM_MAX_SECONDS)
+
+    def record(self, stop_time, duration):
+        """Record one request to the interval based on end of request
+
+        :param stop_time:   end of request (timestamp)
+        :param duration:    duration of request in seconds
+        """
+        slot = self._slot(stop_time)
+        if slot is None:
+            return
+        self._counts[slot] += 1
+        self._durations[slot] += duration
+        self._histograms[slot, self._template.bucket(duration)] += 1
+
+    def record_error(self, stop_time):
+        """Record one failed request (e.g. timeout) to the interval based on end of request
+
+        :param stop_time:   end of request (timestamp)
+        """
+        slot = self._slot(stop_time)
+        if slot is None:
+            return
+        self._errors[slot] += 1
+
+    def _slot(self, stop_time):
+        """Return slot in ring buffer for the time (None for too old time)"""
+        number = int(stop_time // self._interval)
+        if self._last is None:
+            self._first = self._last = number
+        elif number > self._last:
+            # clean intervals for reuse in ring buffer
+            for item in range(self._last + 1, min(number, self._last + self._slots) + 1):
+                self._clean(item % self._slots)
+            self._last = number
+            self._first = max(self._first, number - self._slots + 1)
+        elif number < self._first:
+            # too old request (out of ring buffer)
+            return None
+        return number % self._slots
+
+    def _clean(self, slot):
+        self._counts[slot] = 0
+        self._durations[slot] = 0
+        self._errors[slot] = 0
+        self._histograms[slot] = 0
+
+    def compact(self):
+        """Reorder ring buffer to the time order and release unused intervals (smaller
+        size for transfer of probe between processes)"""
+        if self._last is None:
+            self._slots = 0
+            self._counts = self._counts[:0]
+            self._durations = self._durations[:0]
+            self._errors = self._errors[:0]
+            self._histograms = self._histograms[:0]
+            return
+
+        # ring buffer with size based on used intervals
+        numbers = np.arange(self._first, self._last + 1)
+        source, target = numbers % self._slots, numbers % len(numbers)
+        self._counts = self._move(self._counts, source, target)
+        self._durations = self._move(self._durations, source, target)
+        self._errors = self._move(self._errors, source, target)
+        self._histograms = self._move(self._histograms, source, target)
+        self._slots = len(numbers)
+
+    @staticmethod
+    def _move(values: np.ndarray, source, target) -> np.ndarray:
+        output = np.zeros((len(target), ) + values.shape[1:], dtype=values.dtype)
+        output[target] = values[source]
+        return output
+
+    def items(self):
+        """Return intervals in time order in format [(number, count, total duration, histogram counts, errors), ...]"""
+        if self._last is None:
+            return []
+        return [(number,
+                 self._counts[number % self._slots],
+                 self._durations[number % self._slots],
+                 self._histograms[number % self._slots],
+                 self._errors[number % self._slots]) for number in range(self._first, self._last + 1)]
+
+    @staticmethod
+    def merge(series_list: list) -> dict:
+        """Merge time series from more executors
+
+        :param series_list: time series with the same interval
+        :return:            merged intervals in format {'interval', 'start', 'calls', 'avrg', 'errors', 'histograms'},
+                            where 'start' is timestamp of the first interval and other values are lists
+        """
+        series_list = [series for series in series_list if series and series._last is not None]
+        if len(series_list) == 0:
+            return None
+
+        interval = series_list[0].interval
+        first = min([series._first for series in series_list])
+        last = max([series._last for series in series_list])
+        calls = np.zeros(last - first + 1, dtype=np.int64)
+        durations = np.zeros(last - first + 1, dtype=np.float64)
+        errors = np.zeros(last - first + 1, dtype=np.int64)
+        histograms = np.zeros((last - first + 1, len(series_list[0]._template.counts)), dtype=np.int64)
+        for series in series_list:
+            for number, count, duration, histogram, error in series.items():
+                calls[number - first] += count
+                durations[number - first] += duration
+                histograms[number - first] += histogram
+                errors[number - first] += error
+
+        return {'interval': interval,
+                'start': first * interval,
+                'calls': calls,
+                'avrg': np.divide(durations, calls, out=np.zeros_like(durations), where=calls > 0),
+                'errors': errors,
+                'histograms': histograms}
+
+    @staticmethod
+    def percentiles(merged: dict, percent) -> list:
+        """Return percentile of latency for each interval of merged time series (see 'merge()')
+
+        :param merged:      merged time series
+        :param percent:     percentile e.g. 99
+        :return:            list of latencies in seconds (zero for interval without calls)
+        """
+        output = []
+        for counts in merged['histograms']:
+            histogram = TimeSeries.histogram()
+            histogram.counts[:len(counts)] += counts
+            histogram.total = int(counts.sum())
+            histogram.max = TimeSeries.HISTOGRAM_MAX_SECONDS
+            output.append(histogram.percentile(percent))
+        return output
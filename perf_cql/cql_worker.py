@@ -0,0 +1,156 @@
+import time, multiprocessing, socket, ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+from qgate_perf.parallel_executor import ParallelExecutor
+from qgate_perf.parallel_probe import ParallelProbe
+from qgate_perf.run_setup import RunSetup
+
+
+class CQLWorker:
+    """Worker for distributed run, it listens for steps from coordinator (see 'CQLCoordinator')
+    and executes them locally (processes and threads as in 'ParallelExecutor'), the probes are
+    sent back to the coordinator. The messages are pickled, use the worker only in trusted
+    network and with own key.
+
+        example::
+
+            CQLWorker("localhost", 7001, "my-secret-key", {'prf_read': prf_read}).serve()
+    """
+
+    def __init__(self, host, port, key, functions: dict):
+        """
+        :param host:        address for listening
+        :param port:        port for listening
+        :param key:         shared key with coordinator (authentication of connection)
+        :param functions:   functions for executors in format {name: function}
+        """
+        if not key:
+            raise ValueError("Missing shared key for worker")
+        self._host = host
+        self._port = port
+        self._key = key
+        self._functions = functions
+
+    @staticmethod
+    def is_loopback(host) -> bool:
+        """Return True, if the address (or host name) is loopback e.g. 'localhost', '127.0.0.1'"""
+        try:
+            return ipaddress.ip_address(socket.gethostbyname(host)).is_loopback
+        except (OSError, ValueError):
+            return False
+
+    def serve(self):
+        """Serve the coordinator (steps are executed one by one, till the interruption)"""
+        with Listener((self._host, self._port), authkey = self._key.encode("utf-8")) as listener:
+            while True:
+                with listener.accept() as connection:
+                    self._handle(connection)
+
+    def _handle(self, connection):
+        while True:
+            try:
+                message = connection.recv()
+            except EOFError:
+                return
+
+            if message['op'] == "time":
+                # clock of worker (for synchronized start)
+                connection.send(time.time())
+            elif message['op'] == "step":
+                try:
+                    connection.send({'probes': self._step(message)})
+                except Exception as ex:
+                    connection.send({'error': f"{type(ex).__name__}: {str(ex)}"})
+
+    def _step(self, message) -> dict:
+        print(f"Step '{message['func']}', bulk {message['bulk'][0]}/{message['bulk'][1]}, "
+              f"plan {message['processes']}x{message['threads']} ...")
+        executor = ParallelExecutor(self._functions[message['func']], detail_output = False)
+        with multiprocessing.Manager() as manager:
+            return_dict = manager.dict()
+            # synchronized start, the start time is in clock of worker
+            run_setup = RunSetup(duration_second = message['duration'],
+                                 start_delay = max(message['start'] - time.time(), 0),
+                                 parameters = message['parameters'])
+            run_setup.set_bulk(message['bulk'][0], message['bulk'][1])
+            executor._executeCore(run_setup, return_dict, message['processes'], message['threads'])
+            return dict(return_dict)
+
+class CQLCoordinator:
+    """Coordinator of distributed run, each step is dispatched to all workers with synchronized
+    start (the clock offset of each worker is measured before the step) and the probes from all
+    workers are returned together (as from local executors).
+
+        example::
+
+            coordinator = CQLCoordinator(["localhost:7001", "localhost:7002"], "my-secret-key")
+            coordinator.execute("prf_read", run_setup, parameters, return_dict, processes = 2, threads = 1)
+    """
+
+    START_DELAY = 3     # min. delay for synchronized start of workers in seconds
+    TIMEOUT = 120       # max. time for the end of step on worker (above duration and warm-up) in seconds
+
+    def __init__(self, workers: list, key, start_delay = 0):
+        """
+        :param workers:     list of workers in format ['host:port', ...]
+        :param key:         shared key with workers (authentication of connection)
+        :param start_delay: delay for synchronized start of executors in seconds (see 'EXECUTOR_START_DELAY'),
+                            min. value is 'START_DELAY'
+        """
+        if not key:
+            raise ValueError("Missing shared key for workers")
+        self._workers = workers
+        self._key = key
+        self._start_delay = max(start_delay, CQLCoordinator.START_DELAY)
+
+    @property
+    def count(self):
+        return len(self._workers)
+
+    def execute(self, func_name, run_setup: RunSetup, parameters: dict, return_dict, processes, threads):
+        """Execute the step on all workers, the probes are stored to 'return_dict' with key
+        'worker-index/executor-key' (or 'worker-index' in case of worker error)
+
+        :param func_name:   name of function for executors (see 'CQLWorker')
+        :param run_setup:   setup for step (duration and bulk)
+        :param parameters:  parameters of run setup (sent to the workers)
+        :param return_dict: output for probes
+        :param processes:   number of processes on each worker
+        :param threads:     number of threads on each worker
+        """
+        message = {'op': "step",
+                   'func': func_name,
+                   'parameters': parameters,
+                   'duration': run_setup.duration_second,
+                   'bulk': [run_setup.bulk_row, run_setup.bulk_col],
+                   'processes': processes,
+                   'threads': threads}
+        start = time.time() + self._start_delay
+        timeout = run_setup.duration_second + run_setup.param('warmup_seconds', 0) + \
+                  self._start_delay + CQLCoordinator.TIMEOUT
+
+        with ThreadPoolExecutor(max_workers = len(self._workers)) as executor:
+            futures = [executor.submit(self._execute, worker, message, start, timeout) for worker in self._workers]
+            for index, future in enumerate(futures):
+                try:
+                    for key, probe in future.result().items():
+                        return_dict[f"{index}/{key}"] = probe
+                except Exception as ex:
+                    return_dict[f"{index}"] = ParallelProbe(None, f"Worker '{self._workers[index]}' - {type(ex).__name__}: {str(ex)}")
+
+    def _execute(self, worker, message, start, timeout) -> dict:
+        host, port = worker.rsplit(":", 1)
+        with Client((host, int(port)), authkey = self._key.encode("utf-8")) as connection:
+            # offset of worker clock (the request is in the middle of round trip)
+            before = time.time()
+            connection.send({'op': "time"})
+            worker_time = connection.recv()
+            offset = worker_time - (before + time.time()) / 2
+
+            connection.send(dict(message, start = start + offset))
+            if not connection.poll(timeout):
+                raise TimeoutError(f"Step without response after {round(timeout)} seconds")
+            response = connection.recv()
+            if 'error' in response:
+                raise RuntimeError(response['error'])
+            return response['probes']
@@ -1,150 +1,559 @@
-import datetime, time
+import datetime, time, multiprocessing, sys
+import numpy as np
 from os import path
-from cassandra.query import BatchStatement, BoundStatement
+from cassandra.query import BoundStatement
 from qgate_perf.parallel_executor import ParallelExecutor
 from qgate_perf.parallel_probe import ParallelProbe
 from qgate_perf.executor_helper import GraphScope
+from qgate_perf.file_format import FileFormat
 from qgate_perf.run_setup import RunSetup
 from dotenv import dotenv_values
-from cql_config import CQLConfig, CQLType
+from cql_config import CQLConfig, CQLConfigSetting, CQLType
 from cql_access import CQLAccess, Setting
 from colorama import Fore, Style
 from cql_helper import get_rng_generator
+from cql_data import DataPool
+from cql_distribution import KeyDistribution
+from cql_batch import CQLBatchBuilder, BatchGrouping
 from cql_health import CQLHealth, CQLDiagnosePrint
+from cql_monitor import CQLHealthMonitor
+from cql_graph import GraphIndex
+from cql_results import CQLResults
+from cql_file_format import CQLFileFormat
+from cql_async import CQLAsyncWindow, TIMEOUT_ERRORS
+from cql_probe import CQLProbe
+from cql_executor import CQLExecutor
+from cql_search import SaturationSearch, SearchMode
+from cql_compare import ResultsComparison
+from cql_stub import CQLStubServer
+from cql_bench import ClientBenchmark, OfflineAccess, OfflineSession
+from cql_profiler import CQLProfiler, ProfileMode
+from cql_metrics import CQLDriverMetrics, METRICS_SUPPORTED
+from cql_worker import CQLWorker, CQLCoordinator
+from cassandra import ConsistencyLevel
+from cassandra.query import BatchType
 from glob import glob
+from ast import literal_eval
+from contextlib import contextmanager
+from functools import partial
 import click
 
 
-def prf_readwrite(run_setup: RunSetup) -> ParallelProbe:
-    # TODO: Add readwrite operations
-    pass
+def probe_completed(probe: CQLProbe, window: CQLAsyncWindow) -> bool:
+    """Include completed asynchronous requests to the probe
+
+    :return:   True - stop execution, False - continue in execution
+    """
+    for start_time, stop_time, operation, host, error in window.completed():
+        if error:
+            if probe.error(start_time, stop_time, operation):
+                return True
+        elif probe.include(start_time, stop_time, operation, host):
+            return True
+    return False
+
+def execute_requests(run_setup: RunSetup, probe: CQLProbe, session, next_statement):
+    """Execute requests till the end of probe, the mode of execution is based on setting:
+        - closed loop with waiting for each response 'session.execute_async().result()', one request
+          in flight (default)
+        - closed loop with pipelined 'session.execute_async()', more requests in flight ('in_flight')
+        - open loop with constant rate ('target_rate'), the latency is measured from intended
+          send time (it is without coordinated omission)
+    The requests with timeout (see 'TIMEOUT_ERRORS') are counted as failed and the execution
+    continues, other errors stop the execution.
+
+    :param run_setup:       setup for run
+    :param probe:           probe for measurement
+    :param session:         session for execution
+    :param next_statement:  function, which returns new statement with new data and name
+                            of operation in format (statement, operation)
+    """
+    # profiler and driver metrics of executor (optional), the outputs are returned with probe
+    profiler = CQLProfiler.attach(ProfileMode[run_setup.param('profile', 'off')])
+    metrics = CQLDriverMetrics.attach(session.cluster)
+    try:
+        if run_setup['target_rate'] > 0:
+            # open loop, requests are scheduled on the fixed timeline (rate is split across executors)
+            interval = run_setup.param('executors', 1) * run_setup.bulk_row / run_setup['target_rate']
+            window = CQLAsyncWindow(session, run_setup['in_flight'], count_timeouts = True)
+            try:
+                intended_time = time.time()
+                while True:
+                    statement, operation = next_statement()
+
+                    # wait for intended send time (in case of delay, the request is sent immediately)
+                    delay = intended_time - time.time()
+                    if delay > 0:
+                        time.sleep(delay)
+
+                    window.submit(statement, intended_time, operation)
+                    intended_time += interval
+                    if probe_completed(probe, window):
+                        break
+            finally:
+                window.drain()
+
+        elif run_setup['in_flight'] > 1:
+            # pipelined requests, each completion is included to the probe
+            window = CQLAsyncWindow(session, run_setup['in_flight'], count_timeouts = True)
+            try:
+                while True:
+                    statement, operation = next_statement()
+                    window.submit(statement, operation = operation)
+                    if probe_completed(probe, window):
+                        break
+            finally:
+                window.drain()
+
+        else:
+            while True:
+                statement, operation = next_statement()
+
+                # START - probe, only for this specific code part
+                probe.start()
+
+                # list of statements are executed concurrently
+                statements = statement if isinstance(statement, list) else [statement]
+                futures = [session.execute_async(item) for item in statements]
+                error = None
+                for future in futures:
+                    try:
+                        future.result()
+                    except TIMEOUT_ERRORS as ex:
+                        error = ex
+
+                if error:
+                    # failed request, only counted
+                    if probe.error(probe.start_time_one_shot, time.time(), operation):
+                        break
+                # STOP - probe (with coordinator of the last statement)
+                elif probe.stop(operation, futures[-1].coordinator_host):
+                    break
+    finally:
+        probe.driver_metrics = metrics.detach()
+        probe.profile = profiler.detach()
 
-def prf_read(run_setup: RunSetup) -> ParallelProbe:
+def init_model(run_setup: RunSetup):
+    """Create schema for write data (with own connection, the init is in the main process
+    before the fork of executors)"""
+    cql = CQLAccess(run_setup)
+    try:
+        cql.open()
+        cql.create_model(run_setup)
+    finally:
+        cql.close()
+
+def prepare_read(run_setup: RunSetup, cql: CQLAccess, generator, bulk = None):
+    """Prepare select statement and pool of synthetic data for read
+
+    :param bulk:    bulk for read in format [rows, columns] (default is bulk from run setup)
+    :return:        function, which returns new select statement with new data
+    """
+    columns, items = "", ""
+    bulk_row, bulk_col = bulk if bulk else (run_setup.bulk_row, run_setup.bulk_col)
+
+    # prepare select statement
+    for i in range(0, bulk_col):
+        columns+=f"fn{i},"
+
+    for i in range(0, bulk_row):
+        items+="?,"
+
+    select_statement = cql.prepare(f"SELECT {columns[:-1]} FROM {run_setup['keyspace']}.{Setting.TABLE_NAME} WHERE fn0 IN ({items[:-1]}) and fn1 IN ({items[:-1]})",
+                                   keyspace=run_setup['keyspace'])
+
+    # pre-generated synthetic data
+    #  NOTE: It will generate only values for two columns (as primary keys), not for all columns
+    partitions, clustering = run_setup['prefill_rows']
+    if partitions > 0:
+        # sample only keys, which exist in the prefilled data (see command 'load')
+        max_value = [partitions, clustering]
+    else:
+        max_value = Setting.MAX_GNR_VALUE
+    pool = DataPool((bulk_row, 2),
+                    max_value,
+                    run_setup['data_pool'],
+                    generator = generator,
+                    distribution = KeyDistribution(run_setup['key_distribution']))
+
+    def next_read():
+        # synthetic data (view to the pool, rows with keys 'fn0' and 'fn1')
+        synthetic_data = pool.next()
+
+        # prepare data (new statement, it can be in flight together with others), the values
+        # are in order of 'IN' lists (all 'fn0' and all 'fn1')
+        bound = BoundStatement(select_statement, consistency_level=run_setup['consistency_level'])
+        return bound.bind(synthetic_data.T.ravel())
+
+    return next_read
+
+def prepare_write(run_setup: RunSetup, cql: CQLAccess, generator):
+    """Prepare insert statement and pool of synthetic data for write
+
+    :return:    function, which returns new batch (or list of statements) with new data
+    """
+    columns, items = "", ""
+
+    # prepare insert statement for batch
+    for i in range(0, run_setup.bulk_col):
+        columns+=f"fn{i},"
+        items+="?,"
+    insert_statement = cql.prepare(f"INSERT INTO {run_setup['keyspace']}.{Setting.TABLE_NAME} ({columns[:-1]}) VALUES ({items[:-1]})",
+                                   keyspace=run_setup['keyspace'])
+
+    # pre-generated synthetic data (keys 'fn0' and 'fn1' are regenerated after each round of the pool)
+    pool = DataPool((run_setup.bulk_row, run_setup.bulk_col),
+                    Setting.MAX_GNR_VALUE,
+                    run_setup['data_pool'],
+                    key_columns = 2,
+                    generator = generator,
+                    distribution = KeyDistribution(run_setup['key_distribution']))
+
+    # batch (or single statements) based on batch type and grouping
+    builder = CQLBatchBuilder(insert_statement,
+                              run_setup['consistency_level'],
+                              run_setup['batch_type'],
+                              BatchGrouping[run_setup['batch_grouping']],
+                              cql.cluster,
+                              run_setup['keyspace'],
+                              run_setup['local_dc'])
+
+    def next_write():
+        # synthetic data (view to the pool)
+        synthetic_data = pool.next()
+
+        # prepare data (new batch, it can be in flight together with others)
+        return builder.build(synthetic_data)
+
+    return next_write
+
+def read_bulk(run_setup: RunSetup):
+    """Return bulk for read operations in mixed workload in format [rows, columns], it is the item
+    from 'read_bulk_list' on the same position as the current bulk in 'bulk_list' (the last item
+    is reused), the columns are limited by the columns of table"""
+    bulk_list, read_bulk_list = run_setup['bulk_list'], run_setup['read_bulk_list']
+    position = 0
+    for index, bulk in enumerate(bulk_list):
+        if bulk[0] == run_setup.bulk_row and bulk[1] == run_setup.bulk_col:
+            position = index
+            break
+    rows, columns = read_bulk_list[min(position, len(read_bulk_list) - 1)]
+    return [max(rows, 1), max(min(columns, run_setup.bulk_col), 1)]
+
+def prf_readwrite(run_setup: RunSetup) -> ParallelProbe:
     generator = get_rng_generator()
-    columns, items="", ""
-    cql = None
-    session = None
 
     if run_setup.is_init:
+        # the prefilled data set is kept (the reads sample only keys from the data set, see command 'load')
+        if run_setup['prefill_rows'][0] <= 0:
+            init_model(run_setup)
         return None
 
-    try:
-        cql = CQLAccess(run_setup)
-        cql.open()
-        session = cql.create_session()
+    # shared connection in the process (with cached prepared statements)
+    cql = CQLAccess.shared(run_setup)
 
-        # INIT - contains executor synchronization, if needed
-        probe = ParallelProbe(run_setup)
+    # both statements on the same session (the read has own bulk, see 'BULK_LIST_R')
+    bulk = read_bulk(run_setup)
+    next_read = prepare_read(run_setup, cql, generator, bulk)
+    next_write = prepare_write(run_setup, cql, generator)
 
-        # prepare select statement
-        for i in range(0, run_setup.bulk_col):
-            columns+=f"fn{i},"
+    # pre-generated sequence of operations based on read:write ratio
+    operations = generator.random(Setting.OPERATION_POOL) < run_setup['rw_ratio']
+    position = 0
 
-        for i in range(0, run_setup.bulk_row):
-            items+="?,"
+    def next_statement():
+        nonlocal position
+        is_read = operations[position]
+        position = position + 1 if position + 1 < len(operations) else 0
+        if is_read:
+            return next_read(), "read"
+        return next_write(), "write"
 
-        select_statement = session.prepare(f"SELECT {columns[:-1]} FROM {run_setup['keyspace']}.{Setting.TABLE_NAME} WHERE fn0 IN ({items[:-1]}) and fn1 IN ({items[:-1]})",
-                                           keyspace=run_setup['keyspace'])
-        bound = BoundStatement(select_statement, consistency_level=run_setup['consistency_level'])
+    # INIT - contains executor synchronization, if needed
+    #  NOTE: after preparation of statement and data pool, it is not part of measurement
+    probe = CQLProbe(run_setup)
+    probe.operation_rows = {"read": bulk[0], "write": run_setup.bulk_row}
 
-        while True:
+    execute_requests(run_setup, probe, cql.session, next_statement)
+    return probe
+
+def prf_read(run_setup: RunSetup) -> ParallelProbe:
+    generator = get_rng_generator()
 
-            # generate synthetic data
-            #  NOTE: It will generate only values for two columns (as primary keys), not for all columns
-            synthetic_data = generator.integers(Setting.MAX_GNR_VALUE, size=run_setup.bulk_row*2)
+    if run_setup.is_init:
+        return None
 
-            # prepare data
-            bound.bind(synthetic_data)
+    # shared connection in the process (with cached prepared statements)
+    cql = CQLAccess.shared(run_setup)
 
-            # START - probe, only for this specific code part
-            probe.start()
+    next_read = prepare_read(run_setup, cql, generator)
 
-            rows = session.execute(bound)
+    # INIT - contains executor synchronization, if needed
+    #  NOTE: after preparation of statement and data pool, it is not part of measurement
+    probe = CQLProbe(run_setup)
 
-            # STOP - probe
-            if probe.stop():
-                break
-    finally:
-        if session:
-            session.shutdown()
-        if cql:
-            cql.close()
+    execute_requests(run_setup, probe, cql.session, lambda: (next_read(), None))
     return probe
 
 def prf_write(run_setup: RunSetup) -> ParallelProbe:
     generator = get_rng_generator()
-    columns, items = "", ""
-    cql = None
-    session = None
 
     if run_setup.is_init:
-        # create schema for write data
-        try:
-            cql = CQLAccess(run_setup)
-            cql.open()
-            cql.create_model()
-        finally:
-            if cql:
-                cql.close()
+        init_model(run_setup)
         return None
 
+    # shared connection in the process (with cached prepared statements)
+    cql = CQLAccess.shared(run_setup)
+
+    next_write = prepare_write(run_setup, cql, generator)
+
+    # INIT - contains executor synchronization, if needed
+    #  NOTE: after preparation of statement and data pool, it is not part of measurement
+    probe = CQLProbe(run_setup)
+
+    execute_requests(run_setup, probe, cql.session, lambda: (next_write(), None))
+    return probe
+
+def bench_stages(bulk) -> dict:
+    """Return stages of workload hot loops for client benchmark (see 'ClientBenchmark'),
+    the statements are prepared without cluster (see 'OfflineAccess')
+
+    :param bulk:    bulk in format [rows, columns]
+    :return:        stages in format {name: function}
+    """
+    def setup(duration = 0, **changes) -> RunSetup:
+        parameters = {'keyspace': "prftest",
+                      'prefill_rows': [0, 0],
+                      'key_distribution': "uniform",
+                      'consistency_level': ConsistencyLevel.ONE,
+                      'data_pool': Setting.OPERATION_POOL,
+                      'batch_type': BatchType.LOGGED,
+                      'batch_grouping': "off",
+                      'local_dc': None}
+        parameters.update(changes)
+        run_setup = RunSetup(duration_second = duration, parameters = parameters)
+        run_setup.set_bulk(bulk[0], bulk[1])
+        run_setup.set_start_time()
+        return run_setup
+
+    cql = OfflineAccess()
+    generator = get_rng_generator()
+    stages = {}
+
+    # read, data from pool with bind and materialization of result
+    stages['read.next'] = prepare_read(setup(), cql, generator)
+    stages['read.generate'] = prepare_read(setup(data_pool = 0), cql, generator)
+    statement = stages['read.next']().prepared_statement
+    body = OfflineAccess.result(statement, bulk[0])
+    stages['read.result'] = lambda: OfflineAccess.materialize(body)
+
+    # write, data from pool with batch or single statements
+    stages['write.next'] = prepare_write(setup(), cql, generator)
+    stages['write.generate'] = prepare_write(setup(data_pool = 0), cql, generator)
+    stages['write.single'] = prepare_write(setup(batch_type = None), cql, generator)
+    stages['write.partition'] = prepare_write(setup(batch_grouping = "partition"), cql, generator)
+
+    # asynchronous execution with window of requests, callbacks and probe (the requests
+    # are completed immediately by session without cluster, the probe is without end)
+    window = CQLAsyncWindow(OfflineSession(OfflineAccess.materialize(body)), Setting.LOAD_IN_FLIGHT)
+    probe = CQLProbe(setup(duration = 24 * 3600))
+    next_read = stages['read.next']
+
+    def read_execute():
+        window.submit(next_read(), operation = "read")
+        probe_completed(probe, window)
+
+    stages['read.execute'] = read_execute
+    return stages
+
+def load_rows(partition, clustering, columns) -> np.ndarray:
+    """Return deterministic rows for one partition (the same data for each load)
+
+    :param partition:   value of partition key 'fn0'
+    :param clustering:  amount of rows in partition (values of clustering key 'fn1')
+    :param columns:     amount of columns
+    """
+    rows = np.empty((clustering, columns), dtype=np.int32)
+    rows[:, 0] = partition
+    rows[:, 1] = np.arange(clustering)
+    if columns > 2:
+        sequence = partition * clustering + np.arange(clustering, dtype=np.int64)
+        rows[:, 2:] = (sequence[:, None] * np.arange(3, columns + 1)) % Setting.MAX_GNR_VALUE
+    return rows
+
+def load_partitions(run_setup: RunSetup, first, last) -> int:
+    """Insert prefilled data for partitions in range <first, last), the inserts are asynchronous
+
+    :return:    amount of inserted rows
+    """
+    count = 0
+
+    # shared connection in the process (with cached prepared statements)
+    cql = CQLAccess.shared(run_setup)
+
+    columns, items = "", ""
+    for i in range(0, run_setup.bulk_col):
+        columns+=f"fn{i},"
+        items+="?,"
+    insert_statement = cql.prepare(f"INSERT INTO {run_setup['keyspace']}.{Setting.TABLE_NAME} ({columns[:-1]}) VALUES ({items[:-1]})",
+                                   keyspace=run_setup['keyspace'])
+
+    window = CQLAsyncWindow(cql.session, max(run_setup['in_flight'], Setting.LOAD_IN_FLIGHT))
     try:
-        cql = CQLAccess(run_setup)
-        cql.open()
-        session = cql.create_session()
+        clustering = run_setup['prefill_rows'][1]
+        for partition in range(first, last):
+            for row in load_rows(partition, clustering, run_setup.bulk_col):
+                window.submit(BoundStatement(insert_statement, consistency_level=run_setup['consistency_level']).bind(row))
+                count += 1
+            window.completed()
+    finally:
+        window.drain()
+    window.completed()
+    return count
+
+def load_data(run_setup: RunSetup, columns):
+    """Load deterministic data set ('PREFILL_ROWS' partitions x clustering rows) with
+    concurrent asynchronous inserts across processes. The model is created before the load.
+
+    :param run_setup:   setup for load
+    :param columns:     amount of columns in table
+    """
+    partitions, clustering = run_setup['prefill_rows']
+    if partitions <= 0 or clustering <= 0:
+        print(Fore.LIGHTRED_EX + "!!! Missing 'PREFILL_ROWS' configuration !!!" + Style.RESET_ALL)
+        return
 
-        # INIT - contains executor synchronization, if needed
-        probe = ParallelProbe(run_setup)
+    # create model with all columns
+    run_setup.set_bulk(1, columns)
+    init_model(run_setup)
 
-        # prepare insert statement for batch
-        for i in range(0, run_setup.bulk_col):
-            columns+=f"fn{i},"
-            items+="?,"
-        insert_statement = session.prepare(f"INSERT INTO {run_setup['keyspace']}.{Setting.TABLE_NAME} ({columns[:-1]}) VALUES ({items[:-1]})",
-                                           keyspace=run_setup['keyspace'])
-        batch = BatchStatement(consistency_level=run_setup['consistency_level'])
+    # split partitions to the chunks for processes
+    processes = min(multiprocessing.cpu_count(), partitions)
+    bounds = np.linspace(0, partitions, processes + 1, dtype=int)
 
-        while True:
-            batch.clear()
+    print(f"Load {partitions}x{clustering} rows ({columns} columns, {processes} processes) ...")
+    start = time.time()
+    with multiprocessing.Pool(processes) as pool:
+        counts = pool.starmap(load_partitions, [(run_setup, int(bounds[i]), int(bounds[i + 1])) for i in range(processes)])
+    duration = time.time() - start
 
-            # generate synthetic data
-            synthetic_data = generator.integers(Setting.MAX_GNR_VALUE, size=(run_setup.bulk_row, run_setup.bulk_col))
+    print(Fore.LIGHTGREEN_EX + f"Loaded {sum(counts)} rows in {round(duration, 2)} sec "
+          f"({round(sum(counts) / duration, 2)} rows/sec)" + Style.RESET_ALL)
 
-            # prepare data
-            for row in synthetic_data:
-                batch.add(insert_statement, row)
+def cluster_diagnose(run_setup, level, ttl = 0):
 
-            # START - probe, only for this specific code part
-            probe.start()
+    level = CQLDiagnosePrint[level.lower()]
+    if level == CQLDiagnosePrint.off:
+        return
 
-            session.execute(batch)
+    # status from cache (e.g. from previous environment with the same cluster)
+    cache_key = CQLAccess.connection_key(run_setup)
+    status = CQLHealth.cached_status(cache_key, ttl)
+    if status:
+        CQLHealth.print_status(status, level)
+        return
 
-            # STOP - probe
-            if probe.stop():
-                break
-    finally:
-        if session:
-            session.shutdown()
-        if cql:
-            cql.close()
+    cql = CQLAccess.shared(run_setup)
+    health = CQLHealth(cql.cluster, cql.session)
+    health.diagnose(level, cache_key)
 
-    return probe
+def keyspace_size(run_setup: RunSetup, keyspaces = None):
+    """Print size of keyspaces (all keyspaces or selected keyspaces)"""
+    cql = CQLAccess.shared(run_setup)
+    health = CQLHealth(cql.cluster, cql.session)
+    CQLHealth.print_sizes(health.get_sizes(keyspaces))
 
-def cluster_diagnose(run_setup, level):
+def record_size(run_setup: RunSetup, generator: CQLExecutor, phase):
+    """Record size of keyspace for test to the output file (record type 'size')
 
-    cql = None
+    :param run_setup:   setup for run
+    :param generator:   executor with output file
+    :param phase:       phase of run e.g. 'before', 'after'
+    """
     try:
-        level = CQLDiagnosePrint[level.lower()]
-        if level == CQLDiagnosePrint.off:
-            return
+        cql = CQLAccess.shared(run_setup)
+        health = CQLHealth(cql.cluster, cql.session)
+        size = health.get_sizes([run_setup['keyspace']])[run_setup['keyspace']]
+    except Exception as ex:
+        print(Fore.LIGHTRED_EX + f"Size of keyspace '{run_setup['keyspace']}' is not available: {type(ex).__name__}" + Style.RESET_ALL)
+        return
+
+    out = {
+        FileFormat.PRF_TYPE: CQLFileFormat.PRF_SIZE_TYPE,
+        CQLFileFormat.PRF_SIZE_PHASE: phase,
+        CQLFileFormat.PRF_SIZE_KEYSPACE: run_setup['keyspace'],
+        CQLFileFormat.PRF_SIZE_TABLES: size['tables'],
+        CQLFileFormat.PRF_SIZE_PARTITIONS: size['partitions'],
+        CQLFileFormat.PRF_SIZE_MEAN_PARTITION: size['mean_partition_size'],
+        CQLFileFormat.PRF_SIZE_MB: size['size_mb'],
+        CQLFileFormat.PRF_SIZE_NOW: datetime.datetime.utcnow().isoformat(' ')
+    }
+    print(f"Size ({phase}): {size['size_mb']} MB, {size['partitions']} partitions, "
+          f"mean partition {size['mean_partition_size']} B")
+    generator.write_record(out)
+
+def results_store(run_setup: RunSetup, generator: CQLExecutor, global_param, parameters: dict, name):
+    """Create columnar store of results for the run (see 'CQLResults')
+
+    :param name:    name of test without unique id (for comparison of runs, see 'compare')
+    """
+    version = ""
+    try:
+        cql = CQLAccess.shared(run_setup)
+        version = CQLHealth(cql.cluster, cql.session).get_version()
+    except Exception:
+        pass
+
+    generator.results = CQLResults({'env': global_param.get('env', ""),
+                                    'label': generator.label,
+                                    'name': name,
+                                    'cql': str(parameters['cql']),
+                                    'cluster_version': version,
+                                    'test_type': parameters['test_type'],
+                                    'keyspace': parameters['keyspace'],
+                                    'bulk_list': parameters['bulk_list'],
+                                    'executors': global_param['executors'],
+                                    'duration': global_param['executor_duration'],
+                                    'warmup': global_param['warmup_seconds'],
+                                    'in_flight': parameters['in_flight'],
+                                    'target_rate': parameters['target_rate'],
+                                    'consistency_level': parameters['consistency_level'],
+                                    'tuning': {name: parameters.get(name, None) for name in ['protocol_version', 'compression',
+                                                                                             'sessions', 'max_requests',
+                                                                                             'token_aware', 'speculative']},
+                                    'now': datetime.datetime.utcnow().isoformat(' ')})
+
+def save_results(generator: CQLExecutor):
+    """Save columnar results beside the performance output file e.g. 'res_*-HHMMSS/'"""
+    if generator.results is None or generator.results.steps == 0 or generator.output_file is None:
+        return
+
+    directory = CQLFileFormat.related_file(generator.output_file, CQLFileFormat.RES_FILE_PREFIX)
+    directory = f"{path.splitext(directory)[0]}-{datetime.datetime.now().strftime('%H%M%S')}"
+    generator.results.save(directory)
+    print(f"Results: {directory}")
+
+@contextmanager
+def health_monitor(run_setup: RunSetup, generator: CQLExecutor, interval):
+    """Background monitor of cluster health for the run, the health records are
+    in output file 'hlt_*.txt' beside the performance output file 'prf_*.txt'. The
+    monitor has own connection (it is open during the whole run)."""
+
+    if interval <= 0 or generator.output_file is None:
+        yield None
+        return
 
-        cql = CQLAccess(run_setup)
+    cql = CQLAccess(run_setup)
+    try:
         cql.open()
-        status = CQLHealth(cql.cluster)
-        status.diagnose(level)
+        with CQLHealthMonitor(cql.cluster,
+                              cql.session,
+                              CQLFileFormat.related_file(generator.output_file, CQLFileFormat.HLT_FILE_PREFIX),
+                              generator.label,
+                              interval) as monitor:
+            yield monitor
     finally:
-        if cql:
-            cql.close()
+        cql.close()
 
 def generate_graphs(generator: ParallelExecutor, generate_graph_scope, output_dir):
     """Generate graph based on setting"""
@@ -158,51 +567,138 @@ def generate_graphs(generator: ParallelExecutor, generate_graph_scope, output_di
         print("Generate graph: execution...")
         generator.create_graph_exec(output_dir, suppress_error = True)
 
+def search_saturation(generator: CQLExecutor, global_param, parameters: dict, setup: RunSetup):
+    """Search max. sustainable throughput for each bulk, the load (amount of executors
+    or target rate) is ramped adaptively, see 'SaturationSearch'"""
+
+    mode = SearchMode[global_param['search_mode']]
+    executor = global_param['executors'][0]
+    group = executor[2] if len(executor) > 2 else ''
+
+    def run_step(value):
+        if mode == SearchMode.rate:
+            parameters['target_rate'] = value
+            generator.run_executor([[executor[0], executor[1], group]], setup)
+        else:
+            generator.run_executor([[value, executor[1], group]], setup)
+
+        result = generator.last_result
+        if not result:
+            return 0, 0
+        return result['total_call_per_sec'], result['percentiles']['p99']
+
+    for bulk in parameters['bulk_list']:
+        print(Fore.LIGHTGREEN_EX + f"Search ({mode.name}), bulk {bulk[0]}/{bulk[1]} ..." + Style.RESET_ALL)
+        setup.set_bulk(bulk[0], bulk[1])
+        generator.init_run(setup)
+
+        search = SaturationSearch(run_step,
+                                  global_param['search_start'],
+                                  global_param['search_max'],
+                                  global_param['search_min_gain'],
+                                  global_param['search_sla_p99'],
+                                  global_param['search_steps'])
+        best = search.search()
+        search.print_steps(best, "Executors" if mode == SearchMode.executors else "Target rate")
+
 def perf_test(cql: CQLType, unique_id, global_param, parameters: dict, only_cluster_diagnose = False):
 
     lbl = str(cql).split('.')[1]
     lbl_suffix = f"{parameters['label']}" if parameters.get('label', None) else ""
+    tuning = CQLAccess.tuning_label(parameters.get)
+    if tuning:
+        # client tuning (changes against default) is part of label
+        lbl_suffix = f"{lbl_suffix}-{tuning}" if lbl_suffix else tuning
 
     generator = None
     if parameters['test_type']=='w':    # WRITE perf test
-        generator = ParallelExecutor(prf_write,
-                                     label=f"{lbl}{unique_id}-W{lbl_suffix}",
-                                     detail_output=global_param['detail_output'],
-                                     output_file=path.join(global_param['perf_dir'], "..", "output", f"prf_{lbl.lower()}-W{lbl_suffix.lower()}-{datetime.date.today()}.txt"),
-                                     init_each_bulk=True)
+        generator = CQLExecutor(prf_write,
+                                label=f"{lbl}{unique_id}-W{lbl_suffix}",
+                                detail_output=global_param['detail_output'],
+                                output_file=path.join(global_param['perf_dir'], "..", "output", f"prf_{lbl.lower()}-W{lbl_suffix.lower()}-{datetime.date.today()}.txt"),
+                                init_each_bulk=not global_param['search'],
+                                parameters=parameters)
     elif parameters['test_type']=='r':  # READ perf test
-        generator = ParallelExecutor(prf_read,
-                                     label=f"{lbl}{unique_id}-R{lbl_suffix}",
-                                     detail_output=global_param['detail_output'],
-                                     output_file=path.join(global_param['perf_dir'], "..", "output", f"prf_{lbl.lower()}-R{lbl_suffix.lower()}-{datetime.date.today()}.txt"),
-                                     init_each_bulk=True)
-    # TODO: Add read & write
-    # elif parameters['test_type']=='rw' or parameters['test_type']=='wr':    # READ & WRITE perf test
-    #     generator = ParallelExecutor(prf_cql_readwrite(),
-    #                                  label=f"{lbl}-read{lbl_suffix}",
-    #                                  detail_output=True,
-    #                                  output_file=f"../output/prf_{lbl.lower()}-write{lbl_suffix.lower()}-{datetime.date.today()}.txt",
-    #                                  init_each_bulk=True)
+        generator = CQLExecutor(prf_read,
+                                label=f"{lbl}{unique_id}-R{lbl_suffix}",
+                                detail_output=global_param['detail_output'],
+                                output_file=path.join(global_param['perf_dir'], "..", "output", f"prf_{lbl.lower()}-R{lbl_suffix.lower()}-{datetime.date.today()}.txt"),
+                                init_each_bulk=not global_param['search'],
+                                parameters=parameters)
+    elif parameters['test_type']=='rw' or parameters['test_type']=='wr':    # READ & WRITE perf test
+        generator = CQLExecutor(prf_readwrite,
+                                label=f"{lbl}{unique_id}-RW{lbl_suffix}",
+                                detail_output=global_param['detail_output'],
+                                output_file=path.join(global_param['perf_dir'], "..", "output", f"prf_{lbl.lower()}-RW{lbl_suffix.lower()}-{datetime.date.today()}.txt"),
+                                init_each_bulk=not global_param['search'],
+                                parameters=parameters)
+
+    # distributed run on workers (the output is merged from all workers)
+    if global_param['workers']:
+        if not global_param['worker_key']:
+            print(Fore.LIGHTRED_EX + "!!! Missing 'WORKER_KEY' configuration (required for 'WORKERS') !!!" + Style.RESET_ALL)
+            return
+        generator.coordinator = CQLCoordinator(global_param['workers'],
+                                               global_param['worker_key'],
+                                               global_param['executor_start_delay'])
 
     parameters["cql"] = cql
+    parameters["warmup_seconds"] = global_param['warmup_seconds']
+    parameters["timeseries_interval"] = global_param['timeseries_interval']
+    parameters["profile"] = global_param['profile']
+    parameters["driver_metrics"] = global_param['driver_metrics'] and METRICS_SUPPORTED
+    if global_param['driver_metrics'] and not METRICS_SUPPORTED:
+        print(Fore.LIGHTRED_EX + "Driver metrics are not available, missing library 'scales'" + Style.RESET_ALL)
 
     # run tests & generate graphs
     setup = RunSetup(duration_second = global_param['executor_duration'],
                      start_delay = global_param['executor_start_delay'],
                      parameters = parameters)
 
-    cluster_diagnose(setup, global_param['cluster_diagnose'])
-    if global_param['cluster_diagnose_only']:
-        return
+    try:
+        cluster_diagnose(setup, global_param['cluster_diagnose'], global_param['cluster_diagnose_ttl'])
+        if global_param['cluster_diagnose_only']:
+            return
+
+        if global_param['size'] is not None:
+            keyspace_size(setup, global_param['size'])
+            return
+
+        if global_param['load']:
+            load_data(setup, max([bulk[1] for bulk in parameters['bulk_list']]))
+            return
+
+        if global_param['search']:
+            # the executors are new processes for each step (without inherited connections)
+            CQLAccess.close_shared()
+            search_saturation(generator, global_param, parameters, setup)
+            return
+
+        # data volume next to the results of write
+        if parameters['test_type'] != 'r':
+            record_size(setup, generator, "before")
+
+        if global_param['results_store']:
+            results_store(setup, generator, global_param, parameters, generator.label.replace(unique_id, ""))
+
+        # the executors are new processes for each step (without inherited connections)
+        CQLAccess.close_shared()
+        with health_monitor(setup, generator, global_param['health_interval']):
+            generator.run_bulk_executor(parameters['bulk_list'],
+                                        global_param['executors'],
+                                        run_setup = setup)
+        save_results(generator)
 
-    generator.run_bulk_executor(parameters['bulk_list'],
-                                global_param['executors'],
-                                run_setup = setup)
+        if parameters['test_type'] != 'r':
+            record_size(setup, generator, "after")
 
-    # generate graphs
-    generate_graphs(generator,
-                    global_param['generate_graph'],
-                    path.join(global_param['perf_dir'], "..", "output"))
+        # generate graphs
+        generate_graphs(generator,
+                        global_param['generate_graph'],
+                        path.join(global_param['perf_dir'], "..", "output"))
+    finally:
+        # close connections shared in the main process (e.g. from init or diagnose)
+        CQLAccess.close_shared()
 
 def exec_config(config, unique_id, global_param):
 
@@ -234,7 +730,16 @@ def exec_config(config, unique_id, global_param):
                   global_param,
                   param)
 
-def main_execute(env="cass.env", perf_dir=".", only_cluster_diagnose = False, level = "short"):
+    param = CQLConfig(config).get_params('STUB', global_param)
+    if param:
+        # local stub server without database (measurement of client side)
+        with CQLStubServer(param['ip'][0], param['port'], param['stub_latency'], param['stub_rows'], param['local_dc']):
+            perf_test(CQLType.Stub,
+                      unique_id,
+                      global_param,
+                      param)
+
+def main_execute(env="cass.env", perf_dir=".", only_cluster_diagnose = False, level = "short", search = False, load = False, size = None):
 
     global_param = CQLConfig(dotenv_values(path.join(perf_dir, "config", env))).get_global_params()
     if global_param:
@@ -253,6 +758,10 @@ def main_execute(env="cass.env", perf_dir=".", only_cluster_diagnose = False, le
             if only_cluster_diagnose:
                 global_param['cluster_diagnose'] = level
                 global_param['cluster_diagnose_only'] = True
+            global_param['search'] = search
+            global_param['load'] = load
+            global_param['size'] = size
+            global_param['env'] = env
             exec_config(dotenv_values(path.join(perf_dir, "config", env)),
                         unique_id,
                         global_param)
@@ -263,19 +772,143 @@ def main_execute(env="cass.env", perf_dir=".", only_cluster_diagnose = False, le
 def graph_group():
     pass
 
+def graph_file(file, output_dir, scope):
+    """Generate graphs for one performance file (it is called in process pool)"""
+    return file, CQLExecutor.create_graph_static(file,
+                                                 output_dir,
+                                                 GraphScope[scope],
+                                                 suppress_error=True)
+
 @graph_group.command()
 @click.option("-s", "--scope", help="scope of generation, can be 'Perf' (as default), 'Exe' or 'All'", default="perf")
 @click.option("-d", "--perf_dir", help="directory with perf_cql (default '.')", default=".")
 @click.option("-i", "--input_files", help="filter for performance files (default 'prf_*.txt')", default="prf_*.txt")
-def graph(scope, perf_dir, input_files):
+@click.option("-j", "--jobs", help="amount of parallel processes (default 0, it means amount of CPU)", default=0, type=int)
+@click.option("-f", "--force", help="generate all graphs (default is only for changed files)", is_flag=True, default=False)
+def graph(scope, perf_dir, input_files, jobs, force):
     """Generate graphs based on performance file(s)."""
-    for file in glob(path.join(perf_dir, "..", "output", input_files)):
-        print(file)
-        for output in ParallelExecutor.create_graph_static(file,
-                                             path.join(perf_dir, "..", "output"),
-                                             GraphScope[scope.lower()],
-                                             suppress_error=True):
-            print(" ", output)
+    output_dir = path.join(perf_dir, "..", "output")
+    scope = scope.lower()
+    index = GraphIndex(output_dir)
+
+    # incremental generation, only for changed files
+    files = []
+    for file in sorted(glob(path.join(output_dir, input_files))):
+        related_files = [CQLFileFormat.related_file(file, prefix) for prefix in [CQLFileFormat.HST_FILE_PREFIX,
+                                                                                 CQLFileFormat.TMS_FILE_PREFIX]]
+        if not force and index.is_current(file, scope, related_files):
+            print(f"{file} (without change)")
+            continue
+        files.append(file)
+    if len(files) == 0:
+        return
+
+    processes = min(jobs if jobs > 0 else multiprocessing.cpu_count(), len(files))
+    with multiprocessing.Pool(processes) as pool:
+        for file, outputs in pool.imap_unordered(partial(graph_file, output_dir=output_dir, scope=scope), files):
+            print(file)
+            for output in outputs:
+                print(" ", output)
+            index.update(file, scope, outputs)
+    index.save()
+
+@click.group()
+def compare_group():
+    pass
+
+@compare_group.command()
+@click.argument("results", nargs=-1, required=True)
+@click.option("-d", "--perf_dir", help="directory with perf_cql (default '.')", default=".")
+@click.option("-t", "--threshold", help="relative change of throughput or p99 for regression (default 0.05 = 5%)", default=0.05, type=float)
+@click.option("-a", "--alpha", help="significance level of the statistical test (default 0.05)", default=0.05, type=float)
+def compare(results, perf_dir, threshold, alpha):
+    """Compare results 'res_*' of runs, the first is baseline (exit code 1 for regression)."""
+    output_dir = path.join(perf_dir, "..", "output")
+
+    directories = []
+    for result in results:
+        items = sorted(glob(result if path.isabs(result) else path.join(output_dir, result)))
+        directories.extend([item for item in items if path.isdir(item) and item not in directories])
+    if len(directories) < 2:
+        print(f"Missing results for comparison (found {len(directories)})")
+        sys.exit(2)
+
+    comparison = ResultsComparison(directories, threshold, alpha)
+    regressions = comparison.compare()
+    print(f"Baseline: {directories[0]}")
+    comparison.print_table()
+    if regressions > 0:
+        print(Fore.LIGHTRED_EX + f"Regressions: {regressions}" + Style.RESET_ALL)
+        sys.exit(1)
+
+@click.group()
+def bench_group():
+    pass
+
+@bench_group.command()
+@click.option("-d", "--perf_dir", help="directory with perf_cql (default '.')", default=".")
+@click.option("-b", "--bulk_list", help="list of bulks (default '[[1, 10], [10, 10], [200, 10], [1000, 50]]')",
+              default="[[1, 10], [10, 10], [200, 10], [1000, 50]]")
+@click.option("-t", "--threshold", help="relative slowdown against baseline for regression (default 0.2 = 20%)", default=0.2, type=float)
+@click.option("-s", "--save", help="save the measurement as new baseline", is_flag=True, default=False)
+def bench(perf_dir, bulk_list, threshold, save):
+    """Benchmark of client side without database (exit code 1 for regression)."""
+    output_dir = path.join(perf_dir, "..", "output")
+    benchmark = ClientBenchmark(path.join(output_dir, "bench-baseline.json"), threshold)
+    for bulk in literal_eval(bulk_list):
+        for name, func in bench_stages(bulk).items():
+            benchmark.measure(name, bulk, func)
+    regressions = benchmark.compare()
+    benchmark.print_table()
+    if save:
+        benchmark.save()
+        print(f"Baseline: {path.join(output_dir, 'bench-baseline.json')}")
+    if regressions > 0:
+        print(Fore.LIGHTRED_EX + f"Regressions: {regressions}" + Style.RESET_ALL)
+        sys.exit(1)
+
+@click.group()
+def stub_group():
+    pass
+
+@stub_group.command()
+@click.option("-i", "--ip", help="address for listening (default 'localhost')", default="localhost")
+@click.option("-p", "--port", help="port for listening (default 9042)", default=9042, type=int)
+@click.option("-l", "--latency", help="artificial latency of request in seconds (default 0)", default=0.0, type=float)
+@click.option("-r", "--rows", help="amount of rows in result of select (default 1)", default=1, type=int)
+@click.option("-c", "--datacenter", help="name of data center (default 'datacenter1')", default="datacenter1")
+def stub(ip, port, latency, rows, datacenter):
+    """Run local CQL stub server without database (CQL protocol v4)."""
+    print(f"Stub server '{ip}:{port}', latency {latency} sec (stop with Ctrl+C) ...")
+    try:
+        CQLStubServer(ip, port, latency, rows, datacenter).serve()
+    except KeyboardInterrupt:
+        pass
+
+@click.group()
+def worker_group():
+    pass
+
+@worker_group.command()
+@click.option("-i", "--ip", help="address for listening (default 'localhost')", default="localhost")
+@click.option("-p", "--port", help="port for listening (default 7001)", default=7001, type=int)
+@click.option("-k", "--key", help="shared key with coordinator, the same as 'WORKER_KEY' (required, "
+                                   "default from environment variable 'WORKER_KEY')", envvar="WORKER_KEY", default=CQLConfigSetting.WORKER_KEY)
+def worker(ip, port, key):
+    """Run worker for distributed run (see 'WORKERS' in ENV file)."""
+    if not key:
+        print(Fore.LIGHTRED_EX + "!!! Missing shared key, use '-k' or environment variable 'WORKER_KEY' !!!" + Style.RESET_ALL)
+        sys.exit(2)
+    if not CQLWorker.is_loopback(ip):
+        print(Fore.LIGHTRED_EX + f"Worker listens on non-loopback address '{ip}', the messages are pickled "
+                                 f"(use it only in trusted network)" + Style.RESET_ALL)
+    print(f"Worker '{ip}:{port}' (stop with Ctrl+C) ...")
+    try:
+        CQLWorker(ip, port, key, {'prf_read': prf_read,
+                                  'prf_write': prf_write,
+                                  'prf_readwrite': prf_readwrite}).serve()
+    except KeyboardInterrupt:
+        pass
 
 @click.group()
 def version_group():
@@ -335,7 +968,41 @@ def run(env, perf_dir):
     """Run performance tests based on ENV file(s)."""
     main_execute(env, perf_dir)
 
-cli = click.CommandCollection(sources=[run_group, diagnose_group, graph_group, version_group])
+@click.group()
+def search_group():
+    pass
+
+@search_group.command()
+@click.option("-e", "--env", help="name of ENV file (default 'cass.env')", default="cass.env")
+@click.option("-d", "--perf_dir", help="directory with perf_cql (default '.')", default=".")
+def search(env, perf_dir):
+    """Search maximal sustainable throughput based on ENV file(s)."""
+    main_execute(env, perf_dir, search = True)
+
+@click.group()
+def load_group():
+    pass
+
+@load_group.command()
+@click.option("-e", "--env", help="name of ENV file (default 'cass.env')", default="cass.env")
+@click.option("-d", "--perf_dir", help="directory with perf_cql (default '.')", default=".")
+def load(env, perf_dir):
+    """Load data set for read tests based on ENV file(s)."""
+    main_execute(env, perf_dir, load = True)
+
+@click.group()
+def size_group():
+    pass
+
+@size_group.command()
+@click.option("-e", "--env", help="name of ENV file (default 'cass.env')", default="cass.env")
+@click.option("-d", "--perf_dir", help="directory with perf_cql (default '.')", default=".")
+@click.option("-k", "--keyspaces", help="list of keyspaces separated by comma (default all keyspaces)", default="")
+def size(env, perf_dir, keyspaces):
+    """Size of keyspaces based on ENV file(s)."""
+    main_execute(env, perf_dir, size = [keyspace.strip() for keyspace in keyspaces.split(",") if keyspace.strip()])
+
+cli = click.CommandCollection(sources=[run_group, search_group, load_group, size_group, diagnose_group, graph_group, compare_group, stub_group, bench_group, worker_group, version_group])
 
 if __name__ == '__main__':
     cli()
@@ -0,0 +1,5 @@
+import sys
+from os import path
+
+# the modules of perf_cql are flat (e.g. 'from cql_histogram import LatencyHistogram')
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
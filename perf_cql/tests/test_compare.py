@@ -0,0 +1,38 @@
+import unittest
+from cql_compare import welch_test
+
+
+class TestCaseWelch(unittest.TestCase):
+    """Welch's t-test for the reference examples (https://en.wikipedia.org/wiki/Welch%27s_t-test#Examples),
+    the expected p-values are from numerical integration of Student's t-distribution (the same as
+    'scipy.stats.ttest_ind(a, b, equal_var=False)')"""
+
+    def test_equal_sizes(self):
+        a = [27.5, 21.0, 19.0, 23.6, 17.0, 17.9, 16.9, 20.1, 21.9, 22.6, 23.1, 19.6, 19.0, 21.7, 21.4]
+        b = [27.1, 22.0, 20.8, 23.4, 23.4, 23.5, 25.8, 22.0, 24.8, 20.2, 21.9, 22.1, 22.9, 20.5, 24.4]
+        self.assertAlmostEqual(welch_test(a, b), 0.021378, places = 6)
+
+    def test_different_sizes(self):
+        a = [17.2, 20.9, 22.6, 18.1, 21.7, 21.4, 23.5, 24.2, 14.7, 21.8]
+        b = [21.5, 22.8, 21.0, 23.0, 21.6, 23.6, 22.5, 20.7, 23.4, 21.8,
+             20.7, 21.7, 21.5, 22.5, 23.6, 21.5, 22.5, 23.5, 21.5, 21.8]
+        self.assertAlmostEqual(welch_test(a, b), 0.148842, places = 6)
+
+    def test_different_variances(self):
+        a = [19.8, 20.4, 19.6, 17.8, 18.5, 18.9, 18.3, 18.9, 19.5, 22.0]
+        b = [28.2, 26.6, 20.1, 23.3, 25.2, 22.1, 17.7, 27.6, 20.6, 13.7,
+             23.2, 17.5, 20.6, 18.0, 23.9, 21.6, 24.3, 20.4, 23.9, 13.3]
+        self.assertAlmostEqual(welch_test(a, b), 0.035485, places = 6)
+
+    def test_symmetry(self):
+        a, b = [1.0, 2.0, 3.0, 4.0], [2.0, 3.5, 4.0, 6.0, 7.0]
+        self.assertAlmostEqual(welch_test(a, b), 0.113972, places = 6)
+        self.assertAlmostEqual(welch_test(a, b), welch_test(b, a))
+
+    def test_without_test(self):
+        self.assertIsNone(welch_test([1.0], [1.0, 2.0]))
+        self.assertEqual(welch_test([2.0, 2.0], [2.0, 2.0]), 1.0)
+        self.assertEqual(welch_test([2.0, 2.0], [3.0, 3.0]), 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
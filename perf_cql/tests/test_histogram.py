@@ -0,0 +1,60 @@
+import unittest
+from cql_histogram import LatencyHistogram
+
+
+class TestCaseHistogram(unittest.TestCase):
+
+    @staticmethod
+    def _histogram(values) -> LatencyHistogram:
+        histogram = LatencyHistogram()
+        for value in values:
+            histogram.record(value)
+        return histogram
+
+    def test_percentiles(self):
+        # 1 ms ... 1000 ms
+        histogram = self._histogram([index / 1000 for index in range(1, 1001)])
+        percentiles = histogram.percentiles()
+        self.assertEqual(histogram.total, 1000)
+        for name, expected in [("p50", 0.5), ("p95", 0.95), ("p99", 0.99), ("p99.9", 0.999)]:
+            # relative precision of buckets (7 bits) is under 1%
+            self.assertAlmostEqual(percentiles[name], expected, delta = expected * 0.01)
+        self.assertEqual(percentiles["max"], 1.0)
+
+    def test_small_values(self):
+        # values under 128 us are in exact buckets
+        histogram = self._histogram([0.000010] * 90 + [0.000100] * 10)
+        self.assertAlmostEqual(histogram.percentile(50), 0.000010)
+        self.assertAlmostEqual(histogram.percentile(95), 0.000100)
+
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0)
+        self.assertEqual(histogram.percentiles(), {"p50": 0, "p95": 0, "p99": 0, "p99.9": 0, "max": 0})
+
+    def test_saturation(self):
+        histogram = LatencyHistogram(max_seconds = 1)
+        histogram.record(5)
+        histogram.record(-1)
+        self.assertEqual(histogram.total, 2)
+        self.assertEqual(histogram.max, 5)
+        self.assertAlmostEqual(histogram.percentile(100), 1, delta = 0.01)
+
+    def test_merge(self):
+        first = self._histogram([index / 1000 for index in range(1, 501)])
+        second = self._histogram([index / 1000 for index in range(501, 1001)])
+        first.merge(second)
+        first.merge(None)
+        expected = self._histogram([index / 1000 for index in range(1, 1001)])
+        self.assertEqual(first.total, expected.total)
+        self.assertEqual(first.percentiles(), expected.percentiles())
+
+    def test_dict(self):
+        histogram = self._histogram([0.001, 0.002, 0.002, 0.25])
+        restored = LatencyHistogram.from_dict(histogram.to_dict())
+        self.assertEqual(restored.total, histogram.total)
+        self.assertEqual(restored.max, histogram.max)
+        self.assertEqual(restored.percentiles(), histogram.percentiles())
+
+if __name__ == '__main__':
+    unittest.main()
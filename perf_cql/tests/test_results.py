@@ -0,0 +1,70 @@
+import datetime, tempfile, unittest
+from os import path
+from types import SimpleNamespace
+from qgate_perf.run_setup import RunSetup
+from cql_histogram import LatencyHistogram
+from cql_timeseries import TimeSeries
+from cql_results import CQLResults
+
+
+class TestCaseResults(unittest.TestCase):
+
+    @staticmethod
+    def _probe(pid, counter, start: datetime.datetime):
+        return SimpleNamespace(pid = pid, counter = counter, total_duration = counter * 0.002,
+                               min_duration = 0.001, max_duration = 0.004, standard_deviation = 0.0005,
+                               elapsed = 2.0, track_start = start, track_end = start + datetime.timedelta(seconds = 2))
+
+    def test_save_load(self):
+        run_setup = RunSetup(duration_second = 2, parameters = {'target_rate': 500})
+        run_setup.set_bulk(200, 10)
+        start = datetime.datetime(2024, 9, 4, 7, 24, 28)
+
+        histogram = LatencyHistogram()
+        for index in range(1, 101):
+            histogram.record(index / 10000)
+        series = TimeSeries(interval = 1, duration = 2)
+        series.record(1000.5, 0.002)
+        series.record(1001.5, 0.004)
+        series.record_error(1001.6)
+        timeseries = TimeSeries.merge([series])
+
+        results = CQLResults({'label': "test"})
+        results.add_step(run_setup, 2, 1, "1x", [self._probe(10, 100, start), self._probe(11, 50, start)],
+                         {'total_calls': 150, 'total_call_per_sec': 15000.0, 'avrg': 0.002, 'std': 0.0005, 'errors': 1},
+                         histogram, timeseries)
+        results.add_step(run_setup, 4, 1, "1x", [], {'total_calls': 0, 'total_call_per_sec': 0, 'avrg': 0, 'std': 0},
+                         LatencyHistogram())
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = path.join(directory, "res_test", "nested")
+            results.save(output)
+            for mmap in [True, False]:
+                meta, tables = CQLResults.load(output, mmap)
+                self.assertEqual(meta['label'], "test")
+                self.assertEqual(meta['groups'], ["1x"])
+
+                steps = tables['steps']
+                self.assertEqual(len(steps), 2)
+                self.assertEqual(steps[0]['bulk_row'], 200)
+                self.assertEqual(steps[0]['total_calls'], 150)
+                self.assertEqual(steps[0]['total_call_per_sec'], 15000.0)
+                self.assertEqual(steps[0]['target_rate'], 500)
+                self.assertEqual(steps[0]['errors'], 1)
+                self.assertEqual(steps[1]['errors'], 0)
+                self.assertAlmostEqual(steps[0]['p99'], histogram.percentile(99))
+                self.assertEqual(steps[0]['end'] - steps[0]['start'], 2)
+
+                self.assertEqual(tables['executors']['pid'].tolist(), [10, 11])
+                self.assertEqual(tables['executors']['calls'].tolist(), [100, 50])
+
+                self.assertEqual(tables['timeseries']['calls'].tolist(), [1, 1])
+                self.assertEqual(tables['timeseries']['errors'].tolist(), [0, 1])
+                self.assertEqual(tables['timeseries']['call_per_sec'].tolist(), [200, 200])
+
+                restored = CQLResults.histogram(tables, 0, meta)
+                self.assertEqual(restored.total, histogram.total)
+                self.assertEqual(restored.percentiles(), histogram.percentiles())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from cql_search import SaturationSearch
+
+
+class TestCaseSearch(unittest.TestCase):
+
+    @staticmethod
+    def _knee(value):
+        """Throughput grows linearly till 20 executors and decreases after that"""
+        throughput = 100 * value if value <= 20 else 2000 - 50 * (value - 20)
+        return throughput, 0.001
+
+    def test_bisection(self):
+        search = SaturationSearch(self._knee, start = 1, max_value = 128, max_steps = 20)
+        best = search.search()
+        # ramp 1 ... 32 (the throughput for 32 is under the expected growth) and bisection 16 ... 32
+        self.assertEqual([step['value'] for step in search.steps], [1, 2, 4, 8, 16, 32, 24, 28, 26, 25])
+        self.assertEqual(best['value'], 24)
+        self.assertEqual(best['throughput'], 1800)
+        self.assertEqual([step['reason'] for step in search.steps if not step['ok']], ["saturation"] * 4)
+
+    def test_sla(self):
+        search = SaturationSearch(lambda value: (100 * value, 0.001 * value), start = 1, max_value = 128, sla_p99 = 0.01)
+        best = search.search()
+        self.assertEqual([step['value'] for step in search.steps], [1, 2, 4, 8, 16, 12, 10, 11])
+        self.assertEqual(best['value'], 10)
+        self.assertEqual(search.steps[4]['reason'], "SLA p99")
+
+    def test_max_value(self):
+        # without knee, the last value under max. value is the best
+        search = SaturationSearch(lambda value: (100 * value, 0.001), start = 1, max_value = 10)
+        self.assertEqual(search.search()['value'], 8)
+        self.assertEqual(len(search.steps), 4)
+
+    def test_max_steps(self):
+        search = SaturationSearch(self._knee, start = 1, max_value = 128, max_steps = 3)
+        self.assertEqual(search.search()['value'], 4)
+        self.assertEqual(len(search.steps), 3)
+
+    def test_rate(self):
+        # float values (target rate) with resolution
+        search = SaturationSearch(lambda value: (min(value, 1000.0), 0.001 if value <= 1000 else 1.0),
+                                  start = 100.0, max_value = 10000.0, sla_p99 = 0.1, resolution = 50)
+        best = search.search()
+        self.assertEqual([step['value'] for step in search.steps], [100.0, 200.0, 400.0, 800.0, 1600.0, 1200.0, 1000.0, 1100.0, 1050.0])
+        self.assertEqual(best['value'], 1000.0)
+
+    def test_not_found(self):
+        search = SaturationSearch(lambda value: (100 * value, 1.0), start = 1, sla_p99 = 0.01)
+        self.assertIsNone(search.search())
+        self.assertEqual(len(search.steps), 1)
+
+if __name__ == '__main__':
+    unittest.main()
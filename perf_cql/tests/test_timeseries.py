@@ -0,0 +1,55 @@
+import unittest
+from cql_timeseries import TimeSeries
+
+
+class TestCaseTimeSeries(unittest.TestCase):
+
+    def test_merge(self):
+        first = TimeSeries(interval = 1, duration = 10)
+        first.record(1000.2, 0.010)
+        first.record(1000.7, 0.030)
+        first.record(1002.5, 0.020)
+        first.record_error(1002.9)
+
+        second = TimeSeries(interval = 1, duration = 10)
+        second.record(1001.1, 0.040)
+        second.record(1002.1, 0.040)
+        second.record_error(1003.0)
+
+        merged = TimeSeries.merge([first, None, second])
+        self.assertEqual(merged['interval'], 1)
+        self.assertEqual(merged['start'], 1000)
+        self.assertEqual(merged['calls'].tolist(), [2, 1, 2, 0])
+        self.assertEqual(merged['errors'].tolist(), [0, 0, 1, 1])
+        for value, expected in zip(merged['avrg'].tolist(), [0.020, 0.040, 0.030, 0]):
+            self.assertAlmostEqual(value, expected)
+
+        # latency for each interval (coarse histograms with relative error under 6.25%)
+        for value, expected in zip(TimeSeries.percentiles(merged, 50), [0.010, 0.040, 0.020, 0]):
+            self.assertAlmostEqual(value, expected, delta = expected * 0.0625)
+
+    def test_merge_compacted(self):
+        series = TimeSeries(interval = 2, duration = 10)
+        for index in range(5):
+            series.record(100 + index * 2, 0.001)
+        series.compact()
+        merged = TimeSeries.merge([series, series])
+        self.assertEqual(merged['start'], 100)
+        self.assertEqual(merged['calls'].tolist(), [2] * 5)
+
+    def test_ring_buffer(self):
+        # the oldest intervals are overwritten (ring buffer for 10 seconds)
+        series = TimeSeries(interval = 1, duration = 10)
+        for second in range(100):
+            series.record(second + 0.5, 0.001)
+        series.record(5.5, 0.001)
+        merged = TimeSeries.merge([series])
+        self.assertEqual(merged['start'], 100 - len(merged['calls']))
+        self.assertEqual(merged['calls'].tolist(), [1] * len(merged['calls']))
+
+    def test_merge_empty(self):
+        self.assertIsNone(TimeSeries.merge([]))
+        self.assertIsNone(TimeSeries.merge([None, TimeSeries()]))
+
+if __name__ == '__main__':
+    unittest.main()